@@ -0,0 +1,279 @@
+"""
+Apollo Asset Dedup
+Index par hash perceptuel (dHash + BK-tree) des visuels générés : un visuel quasi identique
+à un asset existant n'est ni réencodé ni stocké une seconde fois
+"""
+
+import os
+import sqlite3
+import threading
+from functools import lru_cache
+
+from PIL import Image, ImageChops
+
+from config import DEDUP_CONFIG
+
+# À incrémenter quand le calcul du hash change : les assets hachés autrement sont réindexés à leur prochain ajout
+HASH_VERSION = 2
+FOREGROUND_GRID = 8
+
+def dhash(image, hash_size=None):
+    """Hash de différence : compare chaque pixel à son voisin sur une vignette en niveaux de gris"""
+    hash_size = hash_size or DEDUP_CONFIG['hash_size']
+    thumbnail = image.convert('L').resize((hash_size + 1, hash_size), Image.Resampling.BILINEAR)
+    pixels = list(thumbnail.getdata())
+    
+    value = 0
+    for row in range(hash_size):
+        offset = row * (hash_size + 1)
+        for col in range(hash_size):
+            value = (value << 1) | (pixels[offset + col] > pixels[offset + col + 1])
+    return value
+
+def hamming_distance(a, b):
+    return bin(a ^ b).count('1')
+
+def _thumbnail(image):
+    size = DEDUP_CONFIG['verify_size']
+    return image.convert('L').resize((size, size), Image.Resampling.BILINEAR)
+
+def foreground(thumbnail):
+    """
+    Zone de la vignette qui se détache du fond (texte, sujet). Les bandes pleine largeur
+    ou pleine hauteur (bandeau de marque) sont ignorées ; vignette entière si rien ne ressort.
+    Les bords sont alignés sur une grille de FOREGROUND_GRID pixels : le bruit de réencodage
+    ne déplace pas le cadre (et donc le hash).
+    """
+    width, height = thumbnail.size
+    background = Image.new('L', thumbnail.size, thumbnail.getpixel((0, 0)))
+    threshold = DEDUP_CONFIG['foreground_threshold']
+    mask = ImageChops.difference(thumbnail, background).point(lambda v: 255 if v > threshold else 0)
+    
+    # Moyenne du masque par ligne puis par colonne : 255 = bande pleine, 0 = fond
+    rows = mask.resize((1, height), Image.Resampling.BOX).getdata()
+    ys = [y for y, value in enumerate(rows) if 0 < value < 230]
+    if not ys:
+        return thumbnail
+    top, bottom = min(ys), max(ys) + 1
+    columns = mask.crop((0, top, width, bottom)).resize((width, 1), Image.Resampling.BOX).getdata()
+    xs = [x for x, value in enumerate(columns) if 0 < value < 230]
+    if not xs:
+        return thumbnail
+    
+    grid = FOREGROUND_GRID
+    box = (min(xs) // grid * grid, top // grid * grid, -(-(max(xs) + 1) // grid) * grid, -(-bottom // grid) * grid)
+    return thumbnail.crop((box[0], box[1], min(width, box[2]), min(height, box[3])))
+
+def content_hash(image):
+    """
+    dHash de la zone de contenu : tous les visuels de marque partagent le même fond,
+    hacher l'image entière rendrait voisins deux slogans différents
+    """
+    return dhash(foreground(_thumbnail(image)))
+
+@lru_cache(maxsize=DEDUP_CONFIG['verify_cache_size'])
+def _stored_thumbnail(path, mtime):
+    """Vignette d'un asset stocké (décodé une fois tant que le fichier ne change pas)"""
+    with Image.open(path) as image:
+        return _thumbnail(image)
+
+def _identical_thumbnails(thumbnail, other):
+    difference = ImageChops.difference(thumbnail, other)
+    return difference.getextrema()[1] <= DEDUP_CONFIG['verify_max_pixel_diff']
+
+def visually_identical(image, other):
+    """
+    Vérification fine d'un candidat sur une vignette : aucun pixel nettement différent.
+    Tolère le bruit de réencodage mais pas un chiffre changé dans un prix.
+    """
+    return _identical_thumbnails(_thumbnail(image), _thumbnail(other))
+
+class BKTree:
+    """Arbre BK sur la distance de Hamming : recherche des voisins sans parcourir tout l'index"""
+    
+    def __init__(self):
+        self.root = None  # (hash, [éléments], {distance: sous-arbre})
+        self.size = 0
+    
+    def add(self, value, item):
+        self.size += 1
+        if self.root is None:
+            self.root = (value, [item], {})
+            return
+        
+        node = self.root
+        while True:
+            distance = hamming_distance(value, node[0])
+            if distance == 0:
+                node[1].append(item)
+                return
+            child = node[2].get(distance)
+            if child is None:
+                node[2][distance] = (value, [item], {})
+                return
+            node = child
+    
+    def search(self, value, max_distance):
+        """Éléments à distance <= max_distance, triés du plus proche au plus éloigné"""
+        if self.root is None:
+            return []
+        
+        results = []
+        stack = [self.root]
+        while stack:
+            node_value, items, children = stack.pop()
+            distance = hamming_distance(value, node_value)
+            if distance <= max_distance:
+                results.extend((distance, item) for item in items)
+            # Inégalité triangulaire : seuls les sous-arbres dans [d - max, d + max] peuvent contenir un voisin
+            for child_distance, child in children.items():
+                if distance - max_distance <= child_distance <= distance + max_distance:
+                    stack.append(child)
+        return sorted(results, key=lambda result: result[0])
+
+class AssetIndex:
+    """
+    Index des visuels (SQLite, partagé entre processus) + BK-tree en mémoire
+    rafraîchi au fil des ajouts des autres processus
+    """
+    
+    def __init__(self, path=None, max_distance=None):
+        self.path = path or DEDUP_CONFIG['index_path']
+        self.max_distance = DEDUP_CONFIG['max_distance'] if max_distance is None else max_distance
+        self.pid = os.getpid()
+        
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(self.path, check_same_thread=False, timeout=30)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.executescript("""
+            CREATE TABLE IF NOT EXISTS assets (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                path TEXT UNIQUE NOT NULL,
+                phash TEXT NOT NULL,
+                bytes INTEGER NOT NULL,
+                kind TEXT,
+                hash_version INTEGER NOT NULL DEFAULT 1
+            );
+            CREATE TABLE IF NOT EXISTS aliases (
+                key TEXT PRIMARY KEY,
+                path TEXT NOT NULL
+            );
+            CREATE TABLE IF NOT EXISTS savings (
+                kind TEXT PRIMARY KEY,
+                duplicates INTEGER NOT NULL DEFAULT 0,
+                bytes INTEGER NOT NULL DEFAULT 0
+            );
+        """)
+        # Index créés avant le hash de la zone de contenu : version du hash ajoutée à la volée
+        columns = {row[1] for row in self._conn.execute("PRAGMA table_info(assets)")}
+        if 'hash_version' not in columns:
+            self._conn.execute("ALTER TABLE assets ADD COLUMN hash_version INTEGER NOT NULL DEFAULT 1")
+        self._conn.commit()
+        
+        self._tree = BKTree()
+        self._last_id = 0
+    
+    def _refresh(self):
+        """Ajoute au BK-tree les assets indexés (ou réindexés) depuis le dernier rafraîchissement"""
+        rows = self._conn.execute(
+            "SELECT id, path, phash FROM assets WHERE id > ? AND hash_version = ? ORDER BY id",
+            (self._last_id, HASH_VERSION)
+        ).fetchall()
+        for asset_id, path, phash in rows:
+            self._tree.add(int(phash, 16), path)
+            self._last_id = asset_id
+    
+    def find(self, image, phash=None):
+        """
+        Chemin d'un asset existant quasi identique, ou None.
+        Le BK-tree fournit les candidats proches sur le hash de la zone de contenu ;
+        seuls les verify_max_candidates plus proches sont confirmés sur une vignette.
+        """
+        thumbnail = _thumbnail(image)
+        phash = dhash(foreground(thumbnail)) if phash is None else phash
+        with self._lock:
+            self._refresh()
+            candidates = self._tree.search(phash, self.max_distance)
+        
+        verified = 0
+        for _, path in candidates:
+            if verified >= DEDUP_CONFIG['verify_max_candidates']:
+                break
+            try:
+                existing = _stored_thumbnail(path, os.path.getmtime(path))
+            except OSError:
+                continue
+            verified += 1
+            if _identical_thumbnails(thumbnail, existing):
+                return path
+        return None
+    
+    def add(self, path, image=None, phash=None, kind=None):
+        """Indexe un nouvel asset stocké sur disque"""
+        phash = content_hash(image if image is not None else Image.open(path)) if phash is None else phash
+        with self._lock:
+            # Asset haché avec une ancienne version : réindexé sous un nouvel id (repris par _refresh)
+            self._conn.execute("DELETE FROM assets WHERE path = ? AND hash_version != ?", (path, HASH_VERSION))
+            self._conn.execute(
+                "INSERT OR IGNORE INTO assets (path, phash, bytes, kind, hash_version) VALUES (?, ?, ?, ?, ?)",
+                (path, format(phash, '016x'), os.path.getsize(path), kind, HASH_VERSION)
+            )
+            self._conn.commit()
+            self._refresh()
+    
+    def record_duplicate(self, existing_path, kind=None, key=None):
+        """Comptabilise un doublon évité (taille de l'asset réutilisé) et mémorise l'alias"""
+        saved = os.path.getsize(existing_path) if os.path.exists(existing_path) else 0
+        with self._lock:
+            self._conn.execute(
+                "INSERT INTO savings (kind, duplicates, bytes) VALUES (?, 1, ?) "
+                "ON CONFLICT(kind) DO UPDATE SET duplicates = duplicates + 1, bytes = bytes + excluded.bytes",
+                (kind or 'image', saved)
+            )
+            if key:
+                self._conn.execute(
+                    "INSERT OR REPLACE INTO aliases (key, path) VALUES (?, ?)", (key, existing_path)
+                )
+            self._conn.commit()
+    
+    def resolve_alias(self, key):
+        """Asset déjà associé à cette clé de rendu/concept (évite même le rendu)"""
+        with self._lock:
+            row = self._conn.execute("SELECT path FROM aliases WHERE key = ?", (key,)).fetchone()
+        if row and os.path.exists(row[0]):
+            return row[0]
+        return None
+    
+    def stats(self):
+        with self._lock:
+            assets, stored = self._conn.execute("SELECT COUNT(*), COALESCE(SUM(bytes), 0) FROM assets").fetchone()
+            savings = {
+                kind: {'duplicates': duplicates, 'bytes_saved': saved}
+                for kind, duplicates, saved in self._conn.execute("SELECT kind, duplicates, bytes FROM savings")
+            }
+        return {
+            'assets': assets,
+            'bytes_stored': stored,
+            'duplicates_avoided': sum(s['duplicates'] for s in savings.values()),
+            'bytes_saved': sum(s['bytes_saved'] for s in savings.values()),
+            'by_kind': savings
+        }
+    
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+_asset_index = None
+
+def get_asset_index():
+    """Index du processus courant (recréé après un fork : une connexion SQLite ne se partage pas)"""
+    global _asset_index
+    if not DEDUP_CONFIG['enabled']:
+        return None
+    if _asset_index is None or _asset_index.pid != os.getpid():
+        _asset_index = AssetIndex()
+    return _asset_index
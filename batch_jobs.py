@@ -0,0 +1,301 @@
+"""
+Apollo AI Batch Jobs
+Génération hors ligne à partir d'un fichier JSONL (format batch OpenAI) avec reprise après crash
+"""
+
+import json
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from datetime import datetime, timedelta
+
+from config import CONTENT_CONFIG, OLLAMA_CONFIG
+from content_generator import ApolloContentGenerator
+from gym_registry import get_gym_registry
+
+BATCH_ENDPOINT = '/v1/chat/completions'
+
+def make_custom_id(gym_id, platform, post_type, day):
+    """Identifiant d'une ligne : porte tout ce qu'il faut pour formater le post au retour"""
+    return f"apollo:{day}:{gym_id}:{platform}:{post_type}"
+
+def parse_custom_id(custom_id):
+    _, day, gym_id, platform, post_type = custom_id.split(':')
+    return {'day': day, 'gym_id': int(gym_id), 'platform': platform, 'post_type': post_type}
+
+def build_request_line(generator, gym_id, platform, post_type, day, custom_prompt=None):
+    """Ligne de requête batch OpenAI construite avec le prompt Apollo habituel"""
+    gym = generator.get_gym_by_id(gym_id)
+    return {
+        'custom_id': make_custom_id(gym_id, platform, post_type, day),
+        'method': 'POST',
+        'url': BATCH_ENDPOINT,
+        'body': generator.build_chat_request(gym, platform, post_type, custom_prompt)
+    }
+
+def build_weekly_calendar(generator, path, start_date=None, gym_ids=None, platforms=None):
+    """
+    Écrit le calendrier de la semaine : chaque salle × plateforme × type de post,
+    les types étant répartis sur les 7 jours (décalés d'une salle à l'autre)
+    """
+    start_date = start_date or datetime.now().date() + timedelta(days=1)
+    gym_ids = gym_ids or get_gym_registry().ids()
+    platforms = platforms or list(CONTENT_CONFIG['platforms'].keys())
+    
+    directory = os.path.dirname(path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    
+    count = 0
+    with open(path, 'w', encoding='utf-8') as f:
+        for gym_index, gym_id in enumerate(gym_ids):
+            for type_index, post_type in enumerate(CONTENT_CONFIG['post_types']):
+                day = (start_date + timedelta(days=(type_index + gym_index) % 7)).isoformat()
+                for platform in platforms:
+                    line = build_request_line(generator, gym_id, platform, post_type, day)
+                    f.write(json.dumps(line, ensure_ascii=False) + '\n')
+                    count += 1
+    
+    print(f"📅 Calendrier hebdomadaire: {count} requêtes écrites dans {path}")
+    return count
+
+def read_jsonl(path):
+    """Lignes JSON valides d'un fichier (une dernière ligne tronquée par un crash est ignorée)"""
+    if not os.path.exists(path):
+        return
+    with open(path, encoding='utf-8') as f:
+        for line in f:
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                yield json.loads(line)
+            except json.JSONDecodeError:
+                continue
+
+class BatchJobWriter:
+    """Sortie JSONL en ajout seul : chaque ligne est flushée sur disque (point de reprise)"""
+    
+    def __init__(self, path):
+        self.path = path
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        
+        self._repair_tail()
+        self.completed = {
+            line['custom_id'] for line in read_jsonl(path)
+            if not line.get('error')
+        }
+        self._file = open(path, 'a', encoding='utf-8')
+    
+    def _repair_tail(self):
+        """Supprime une dernière ligne incomplète laissée par un crash"""
+        if not os.path.exists(self.path):
+            return
+        with open(self.path, 'rb+') as f:
+            data = f.read()
+            if data and not data.endswith(b'\n'):
+                f.truncate(data.rfind(b'\n') + 1)
+    
+    def write(self, line):
+        self._file.write(json.dumps(line, ensure_ascii=False) + '\n')
+        self._file.flush()
+        os.fsync(self._file.fileno())
+        if not line.get('error'):
+            self.completed.add(line['custom_id'])
+    
+    def close(self):
+        self._file.close()
+
+class BatchJobRunner:
+    """Exécute un fichier de requêtes batch en local (Ollama) ou via l'API Batch d'OpenAI"""
+    
+    def __init__(self, input_path, output_path, backend='local', generator=None):
+        if backend not in ('local', 'openai'):
+            raise ValueError(f"Backend batch inconnu: {backend}")
+        
+        self.input_path = input_path
+        self.output_path = output_path
+        self.backend = backend
+        self.state_path = f"{output_path}.state.json"
+        self.generator = generator or ApolloContentGenerator(
+            ai_provider='ollama' if backend == 'local' else 'openai'
+        )
+    
+    def pending_lines(self, writer):
+        """Requêtes du fichier d'entrée pas encore présentes (avec succès) en sortie"""
+        return [line for line in read_jsonl(self.input_path) if line['custom_id'] not in writer.completed]
+    
+    def _output_line(self, custom_id, content=None, usage=None, error=None, metrics=None, batch_id=None):
+        """Ligne de sortie au format batch OpenAI, complétée par le post Apollo formaté"""
+        line = {
+            'id': batch_id or f"local_{custom_id}",
+            'custom_id': custom_id,
+            'response': None,
+            'error': None,
+            'post': None
+        }
+        if error:
+            line['error'] = {'message': error}
+            return line
+        
+        line['response'] = {
+            'status_code': 200,
+            'body': {
+                'choices': [{'index': 0, 'message': {'role': 'assistant', 'content': content}}],
+                'usage': usage
+            }
+        }
+        
+        request = parse_custom_id(custom_id)
+        gym = self.generator.get_gym_by_id(request['gym_id'])
+        post = self.generator.post_from_completion(
+            content, gym, request['platform'], request['post_type'],
+            provider='ollama' if self.backend == 'local' else 'openai', metrics=metrics
+        )
+        post['scheduled_day'] = request['day']
+        line['post'] = post
+        return line
+    
+    def run(self, max_workers=None, poll_interval=30):
+        """Traite les requêtes restantes ; relancer après un crash reprend où on s'était arrêté"""
+        writer = BatchJobWriter(self.output_path)
+        try:
+            pending = self.pending_lines(writer)
+            if writer.completed:
+                print(f"♻️ Reprise: {len(writer.completed)} requêtes déjà traitées")
+            print(f"📦 {len(pending)} requêtes à traiter ({self.backend})")
+            
+            if self.backend == 'local':
+                self._run_local(pending, writer, max_workers)
+            elif pending or os.path.exists(self.state_path):
+                self._run_openai(pending, writer, poll_interval)
+            
+            remaining = len(self.pending_lines(writer))
+            print(f"✅ Batch terminé: {len(writer.completed)} posts dans {self.output_path}"
+                  + (f", {remaining} en échec (relancer pour réessayer)" if remaining else ""))
+            return {'completed': len(writer.completed), 'failed': remaining}
+        finally:
+            writer.close()
+    
+    def _run_local(self, pending, writer, max_workers=None):
+        """Backend Ollama : requêtes envoyées en parallèle dans la limite du provider"""
+        if not pending:
+            return
+        
+        workers = min(max_workers or self.generator.get_concurrency_limit('ollama'), len(pending))
+        with ThreadPoolExecutor(max_workers=workers, thread_name_prefix='apollo-batch-job') as executor:
+            futures = {executor.submit(self._complete_local, line): line for line in pending}
+            for done, future in enumerate(as_completed(futures), 1):
+                line = futures[future]
+                try:
+                    output = future.result()
+                except Exception as e:
+                    output = self._output_line(line['custom_id'], error=str(e))
+                writer.write(output)
+                if done % 10 == 0 or done == len(futures):
+                    print(f"   {done}/{len(futures)} requêtes traitées")
+    
+    def _complete_local(self, line):
+        """Traduit une requête chat OpenAI en appel Ollama (même prompt système Apollo)"""
+        body = line['body']
+        request = parse_custom_id(line['custom_id'])
+        prompt = next(m['content'] for m in body['messages'] if m['role'] == 'user')
+        max_tokens = body.get('max_tokens') or self.generator.get_token_budget(request['platform'], request['post_type'])
+        
+        content, metrics = self.generator.complete_with('ollama', prompt, max_tokens)
+        if not content:
+            return self._output_line(line['custom_id'], error=f"Échec Ollama ({OLLAMA_CONFIG['model']})")
+        
+        usage = {
+            'prompt_tokens': metrics.get('prompt_tokens'),
+            'completion_tokens': metrics.get('completion_tokens')
+        }
+        return self._output_line(line['custom_id'], content, usage, metrics=metrics)
+    
+    def _result_line(self, result, batch_id):
+        """Ligne de sortie d'un résultat de l'API Batch (lève une exception si la ligne est malformée)"""
+        custom_id = result['custom_id']
+        response = result.get('response') or {}
+        if result.get('error') or response.get('status_code') != 200:
+            error = (result.get('error') or {}).get('message') or f"HTTP {response.get('status_code')}"
+            return self._output_line(custom_id, error=error, batch_id=batch_id)
+        
+        body = response['body']
+        content = body['choices'][0]['message']['content'].strip()
+        usage = body.get('usage') or {}
+        metrics = {
+            'prompt_tokens': usage.get('prompt_tokens'),
+            'completion_tokens': usage.get('completion_tokens')
+        }
+        return self._output_line(custom_id, content, usage, metrics=metrics, batch_id=batch_id)
+    
+    def _run_openai(self, pending, writer, poll_interval):
+        """Backend OpenAI Batch : un seul envoi, l'identifiant est conservé pour la reprise"""
+        client = self.generator.client
+        state = None
+        if os.path.exists(self.state_path):
+            with open(self.state_path) as f:
+                state = json.load(f)
+        
+        if not state:
+            submit_path = f"{self.output_path}.submit.jsonl"
+            with open(submit_path, 'w', encoding='utf-8') as f:
+                for line in pending:
+                    f.write(json.dumps(line, ensure_ascii=False) + '\n')
+            
+            with open(submit_path, 'rb') as f:
+                input_file = client.files.create(file=f, purpose='batch')
+            batch = client.batches.create(
+                input_file_id=input_file.id,
+                endpoint=BATCH_ENDPOINT,
+                completion_window='24h',
+                metadata={'source': 'apollo', 'input': os.path.basename(self.input_path)}
+            )
+            state = {'batch_id': batch.id, 'submitted_at': datetime.now().isoformat()}
+            with open(self.state_path, 'w') as f:
+                json.dump(state, f)
+            os.remove(submit_path)
+            print(f"🚀 Batch OpenAI soumis: {batch.id}")
+        
+        # Attente de la fin du batch (peut prendre jusqu'à 24h)
+        while True:
+            batch = client.batches.retrieve(state['batch_id'])
+            if batch.status in ('completed', 'failed', 'expired', 'cancelled'):
+                break
+            counts = batch.request_counts
+            print(f"⏳ Batch {batch.id}: {batch.status} ({counts.completed}/{counts.total})")
+            time.sleep(poll_interval)
+        
+        for file_id in (batch.output_file_id, batch.error_file_id):
+            if not file_id:
+                continue
+            for raw in client.files.content(file_id).text.splitlines():
+                if not raw.strip():
+                    continue
+                try:
+                    result = json.loads(raw)
+                    custom_id = result['custom_id']
+                except (json.JSONDecodeError, KeyError, TypeError) as e:
+                    # Sans custom_id la ligne ne peut être rattachée à aucune requête
+                    print(f"⚠️ Ligne de résultat illisible ignorée: {e}")
+                    continue
+                if custom_id in writer.completed:
+                    continue
+                
+                # Une ligne malformée devient une erreur de sa requête (réessayée à la relance)
+                try:
+                    output = self._result_line(result, batch.id)
+                except Exception as e:
+                    output = self._output_line(custom_id, error=f"Résultat invalide: {e}", batch_id=batch.id)
+                writer.write(output)
+        
+        # Batch consommé : une relance soumettra uniquement les requêtes encore en échec
+        os.remove(self.state_path)
+        if batch.status != 'completed':
+            print(f"⚠️ Batch OpenAI {batch.id} terminé avec le statut {batch.status}")
+
+def load_batch_posts(output_path):
+    """Posts formatés d'un fichier de sortie batch"""
+    return [line['post'] for line in read_jsonl(output_path) if line.get('post')]
@@ -21,6 +21,26 @@ OPENAI_CONFIG = {
     'temperature': 0.7
 }
 
+# Ollama Configuration (IA locale)
+OLLAMA_CONFIG = {
+    'url': os.getenv('OLLAMA_URL', 'http://localhost:11434'),
+    # Plusieurs serveurs : OLLAMA_URLS=http://gpu1:11434,http://gpu2:11434
+    'urls': [
+        url.strip()
+        for url in os.getenv('OLLAMA_URLS', os.getenv('OLLAMA_URL', 'http://localhost:11434')).split(',')
+        if url.strip()
+    ],
+    'probe_interval': float(os.getenv('OLLAMA_PROBE_INTERVAL', '15')),
+    'host_cooldown': float(os.getenv('OLLAMA_HOST_COOLDOWN', '60')),
+    'model': os.getenv('OLLAMA_MODEL', 'llama2:7b-chat'),
+    'pool_size': int(os.getenv('OLLAMA_POOL_SIZE', '10')),
+    'connect_timeout': float(os.getenv('OLLAMA_CONNECT_TIMEOUT', '3')),
+    'read_timeout': float(os.getenv('OLLAMA_READ_TIMEOUT', '60')),
+    'keep_alive': os.getenv('OLLAMA_KEEP_ALIVE', '30m'),  # Garde le modèle chargé entre deux posts
+    'endpoint': os.getenv('OLLAMA_ENDPOINT', 'chat'),  # 'chat' (préfixe système réutilisé) ou 'generate'
+    'temperature': 0.7
+}
+
 # Social Media APIs
 SOCIAL_MEDIA_CONFIG = {
     'instagram': {
@@ -45,6 +65,25 @@ SOCIAL_MEDIA_CONFIG = {
     }
 }
 
+# Quotas de publication : seau à jetons par plateforme et par compte (salle),
+# pool de workers borné par plateforme avec file d'attente
+PUBLISHING_CONFIG = {
+    # API HTTP de publication (ex. mock_platform_server.py) ; vide : méthodes publish_* du scheduler
+    'api_base_url': os.getenv('APOLLO_PUBLISH_API_URL', ''),
+    'timeout': 15,
+    'max_queue': 500,  # publications en attente par plateforme au-delà des workers
+    'queue_timeout': 300,  # attente max d'une place dans la file (secondes)
+    'rate_limit_retries': 3,  # nouvelles tentatives après une réponse 429
+    # Tentative 'pending' du registre plus ancienne : considérée comme interrompue (crash) et reprise
+    'lease_seconds': int(os.getenv('PUBLISH_LEASE_SECONDS', '900')),
+    'platforms': {
+        'instagram': {'rate_per_minute': 30, 'burst': 5, 'account_rate_per_minute': 2, 'account_burst': 1, 'workers': 4},
+        'facebook': {'rate_per_minute': 60, 'burst': 10, 'account_rate_per_minute': 4, 'account_burst': 2, 'workers': 4},
+        'linkedin': {'rate_per_minute': 20, 'burst': 5, 'account_rate_per_minute': 2, 'account_burst': 1, 'workers': 2},
+        'tiktok': {'rate_per_minute': 10, 'burst': 2, 'account_rate_per_minute': 1, 'account_burst': 1, 'workers': 2}
+    }
+}
+
 # =============================================================================
 # DONNÉES APOLLO SPORTING CLUB
 # =============================================================================
@@ -140,6 +179,12 @@ APOLLO_GYMS = [
     }
 ]
 
+# Registre des salles : fichier JSON externe (même format qu'APOLLO_GYMS),
+# APOLLO_GYMS sert de repli tant que le fichier n'existe pas
+GYM_REGISTRY_CONFIG = {
+    'gyms_file': os.getenv('APOLLO_GYMS_FILE', 'data/gyms.json')
+}
+
 # =============================================================================
 # CONFIGURATION CONTENT GENERATION
 # =============================================================================
@@ -160,30 +205,157 @@ CONTENT_CONFIG = {
         'instagram': {
             'max_char': 2200,
             'image_size': (1080, 1080),
+            'image_format': 'JPEG',
+            'max_image_bytes': 400 * 1024,
             'optimal_hashtags': 25,
             'best_times': ['07:00', '12:00', '19:00']
         },
         'facebook': {
             'max_char': 63206,
             'image_size': (1200, 630),
+            'image_format': 'WEBP',
+            'max_image_bytes': 250 * 1024,
             'optimal_hashtags': 3,
             'best_times': ['09:00', '13:00', '15:00']
         },
         'linkedin': {
             'max_char': 1300,
             'image_size': (1200, 627),
+            'image_format': 'JPEG',
+            'max_image_bytes': 300 * 1024,
             'optimal_hashtags': 5,
             'best_times': ['08:00', '12:00', '17:00']
         },
         'tiktok': {
             'max_char': 150,
             'video_duration': 60,
+            'video_size': (1080, 1920),
             'optimal_hashtags': 5,
             'best_times': ['06:00', '10:00', '19:00']
         }
     }
 }
 
+# Génération en lot : nombre max de requêtes simultanées par provider IA
+GENERATION_CONFIG = {
+    'concurrency': {
+        'openai': int(os.getenv('OPENAI_CONCURRENCY', '8')),
+        'ollama': int(os.getenv('OLLAMA_CONCURRENCY', '2'))  # par serveur Ollama
+    },
+    # Délai max accordé au LLM avant de basculer sur les templates
+    'llm_deadline': float(os.getenv('LLM_DEADLINE_SECONDS', '30')),
+    'template_fallback': os.getenv('TEMPLATE_FALLBACK', '1') == '1',
+    # Budget de tokens dérivé du max_char de chaque plateforme (~3.5 caractères/token en français)
+    'token_budget': {
+        'chars_per_token': 3.5,
+        'min_tokens': 48,
+        'max_tokens': 600,
+        'post_type_factor': {
+            'motivation': 0.8,
+            'special_offers': 0.9,
+            'member_success': 1.1,
+            'class_schedule': 1.2
+        }
+    },
+    'stop_sequences': ['\nUser:', '\nAssistant:', '\n\n\n\n'],
+    # Requête couverte (hedging) : si le provider principal dépasse son p95,
+    # une 2e requête part vers le provider alternatif et la 1re réponse l'emporte
+    'hedge_provider': os.getenv('AI_HEDGE_PROVIDER', 'auto'),  # 'auto', 'openai', 'ollama' ou 'none'
+    'hedge_percentile': 95,
+    'hedge_min_samples': 20,
+    'hedge_delay': float(os.getenv('AI_HEDGE_DELAY', '8')),  # délai tant que les mesures manquent
+    'hedge_min_delay': 1.0,
+    # Disjoncteur par provider
+    'breaker_failure_threshold': int(os.getenv('AI_BREAKER_FAILURES', '5')),
+    'breaker_reset_timeout': float(os.getenv('AI_BREAKER_RESET', '60'))
+}
+
+# Cache persistant des complétions IA (même prompt → réponse en quelques ms)
+CACHE_CONFIG = {
+    'enabled': os.getenv('CONTENT_CACHE_ENABLED', '1') == '1',
+    'path': os.getenv('CONTENT_CACHE_PATH', 'data/cache/completions.sqlite3'),
+    'ttl_seconds': int(os.getenv('CONTENT_CACHE_TTL', str(7 * 24 * 3600))),
+    'max_entries': int(os.getenv('CONTENT_CACHE_MAX_ENTRIES', '5000')),
+    'max_bytes': int(os.getenv('CONTENT_CACHE_MAX_BYTES', str(50 * 1024 * 1024)))
+}
+
+# Historique des contenus : journaux JSONL en ajout seul, segments tournants compressés
+CONTENT_LOG_CONFIG = {
+    'directory': os.getenv('CONTENT_LOG_DIR', 'data/generated_content'),
+    'max_segment_bytes': int(os.getenv('CONTENT_LOG_MAX_BYTES', str(20 * 1024 * 1024))),
+    'max_segment_age': int(os.getenv('CONTENT_LOG_MAX_AGE', str(24 * 3600))),  # rotation quotidienne
+    'compress': os.getenv('CONTENT_LOG_COMPRESS', '1') == '1',  # gzip des segments fermés
+    'buffer_records': 100,   # écriture groupée toutes les N entrées...
+    'flush_interval': 5.0    # ... ou au plus tard après N secondes
+}
+
+# Dépôt des posts générés/publiés (SQLite, requêtes paginées)
+CONTENT_DB_CONFIG = {
+    'path': os.getenv('CONTENT_DB_PATH', 'data/content.sqlite3'),
+    'page_size': 20
+}
+
+# Rendu des visuels de marque (polices et fonds mis en cache, sortie adressée par contenu)
+RENDER_CONFIG = {
+    'output_dir': os.getenv('APOLLO_IMAGES_DIR', 'data/images'),
+    'canvas_size': (1080, 1080),
+    'font_size': 60,
+    'text_color': 'white',
+    'text_width_ratio': 0.85,  # largeur max du texte avant retour à la ligne
+    # Encodage des déclinaisons plateforme : qualité cherchée entre ces bornes pour tenir max_image_bytes
+    'min_quality': 40,
+    'max_quality': 90,
+    'background_tint': 0.55,  # opacité de la couleur de marque posée sur une photo de fond
+    # Polices essayées dans l'ordre (nom de la police de marque en premier)
+    'font_candidates': ['arial.ttf', 'Arial.ttf', 'DejaVuSans-Bold.ttf', 'LiberationSans-Bold.ttf'],
+    'workers': int(os.getenv('RENDER_WORKERS', str(os.cpu_count() or 2)))
+}
+
+# Clips TikTok : scènes texte sur fond de marque ou photo de stock, rendues en parallèle
+VIDEO_CONFIG = {
+    'output_dir': os.getenv('APOLLO_VIDEOS_DIR', 'data/videos'),
+    'cache_dir': os.getenv('APOLLO_VIDEO_CACHE_DIR', 'data/cache/video'),
+    'stock_frames_dir': os.getenv('APOLLO_STOCK_FRAMES_DIR', 'assets/stock'),
+    'audio_beds_dir': os.getenv('APOLLO_AUDIO_BEDS_DIR', 'assets/audio'),
+    'fps': 30,
+    'scene_duration': 3.0,   # secondes par scène
+    'max_scenes': 6,
+    'fade': 0.3,
+    'codec': 'libx264',
+    'preset': 'veryfast',
+    'audio_codec': 'aac',
+    'workers': int(os.getenv('VIDEO_WORKERS', str(os.cpu_count() or 2))),
+    # Temps total accordé à un lot (une semaine de clips) ; les clips non démarrés sont reportés
+    'batch_wall_time': float(os.getenv('VIDEO_BATCH_WALL_TIME', '1800'))
+}
+
+# Déduplication perceptuelle des visuels générés (rendus de marque, images DALL·E)
+DEDUP_CONFIG = {
+    'enabled': os.getenv('ASSET_DEDUP_ENABLED', '1') == '1',
+    'index_path': os.getenv('ASSET_INDEX_PATH', 'data/cache/assets.sqlite3'),
+    'hash_size': 16,              # dHash 16x16 = 256 bits
+    'max_distance': 10,           # bits d'écart max pour qu'un asset soit candidat
+    'verify_size': 256,           # vignette de confirmation des candidats
+    'verify_max_pixel_diff': 48,  # écart max toléré sur un pixel (0-255)
+    'verify_max_candidates': 4,   # candidats les plus proches confirmés au pixel, au plus
+    'verify_cache_size': 128,     # vignettes d'assets stockés gardées en mémoire
+    'foreground_threshold': 64    # écart au fond (0-255) au-delà duquel un pixel est du contenu (au-dessus du bruit JPEG)
+}
+
+# Cache des images DALL·E : concept → image téléchargée (stockage adressé par contenu)
+IMAGE_CACHE_CONFIG = {
+    'enabled': os.getenv('IMAGE_CACHE_ENABLED', '1') == '1',
+    'blob_dir': os.getenv('IMAGE_BLOB_DIR', 'data/images/blobs'),
+    'index_path': os.getenv('IMAGE_CACHE_INDEX', 'data/cache/images.sqlite3'),
+    'download_workers': int(os.getenv('IMAGE_DOWNLOAD_WORKERS', '4')),
+    'download_timeout': float(os.getenv('IMAGE_DOWNLOAD_TIMEOUT', '30')),
+    # Endpoint compatible OpenAI pour les images (ex: serveur factice local de mock_image_server.py)
+    'api_base_url': os.getenv('OPENAI_IMAGES_BASE_URL', ''),
+    'model': 'dall-e-3',
+    'size': '1024x1024',
+    'quality': 'standard'
+}
+
 # =============================================================================
 # BRAND IDENTITY
 # =============================================================================
@@ -221,17 +393,191 @@ APOLLO_BRAND = {
 
 POST_TEMPLATES = {
     'motivation': [
-        "🔥 {motivation_quote}\n\n💪 Chez Apollo {gym_name}, on croit que {personal_message}\n\n📍 Rejoins-nous : {address}\n\n{hashtags}",
-        "⚡ Lundi = nouveau départ !\n\n{workout_motivation}\n\n🥊 Rendez-vous chez Apollo {gym_name} pour {activity}\n\n{hashtags}",
-        "🌟 {success_story}\n\n💯 C'est ça l'esprit Apollo !\n\n📲 Réserve ton cours : {phone}\n\n{hashtags}"
+        "🔥 {motivation_quote}\n\n💪 Chez Apollo {gym_name}, on croit que {personal_message}",
+        "⚡ Aujourd'hui = nouveau départ !\n\n{workout_motivation}\n\n🥊 Rendez-vous chez Apollo {gym_name} pour {activity}",
+        "🌟 {success_story}\n\n💯 C'est ça l'esprit Apollo !"
     ],
     'workout_tips': [
-        "💡 CONSEIL PRO : {tip_title}\n\n{tip_content}\n\n👨‍🏫 Par {coach_name}, coach chez Apollo {gym_name}\n\n{hashtags}",
-        "🎯 TECHNIQUE DU JOUR : {technique}\n\n{explanation}\n\n🥊 Viens l'apprendre avec nous !\n\n{hashtags}",
-        "⚠️ ERREUR À ÉVITER : {common_mistake}\n\n✅ LA BONNE FAÇON : {correct_way}\n\n📚 Plus de conseils chez Apollo {gym_name}\n\n{hashtags}"
+        "💡 CONSEIL PRO : {tip_title}\n\n{tip_content}\n\n👨‍🏫 Par {coach_name}, coach chez Apollo {gym_name}",
+        "🎯 TECHNIQUE DU JOUR : {technique}\n\n{explanation}\n\n🥊 Viens l'apprendre avec nous !",
+        "⚠️ ERREUR À ÉVITER : {common_mistake}\n\n✅ LA BONNE FAÇON : {correct_way}\n\n📚 Plus de conseils chez Apollo {gym_name}"
+    ],
+    'coach_spotlight': [
+        "🌟 FOCUS COACH : {coach_name}\n\n{coach_quality}\n\n🥊 Retrouve {coach_name} chez Apollo {gym_name} pour {activity}",
+        "👨‍🏫 Ton coach à l'honneur : {coach_name}\n\n💬 « {coach_quote} »\n\n📲 Réserve ta séance chez Apollo {gym_name}"
+    ],
+    'member_success': [
+        "🌟 {success_story}\n\n💯 C'est ça l'esprit Apollo !",
+        "🏆 BRAVO À NOS MEMBRES !\n\n{success_story}\n\n💪 Et toi, quel sera ton objectif ? Rendez-vous chez Apollo {gym_name}"
+    ],
+    'nutrition': [
+        "🥗 NUTRITION : {nutrition_title}\n\n{nutrition_content}\n\n💪 L'assiette fait la moitié du travail, Apollo {gym_name} s'occupe du reste !",
+        "🍌 LE CONSEIL NUTRITION : {nutrition_title}\n\n{nutrition_content}\n\n👨‍🏫 Signé {coach_name}, coach chez Apollo {gym_name}"
+    ],
+    'boxing_techniques': [
+        "🥊 TECHNIQUE DE BOXE : {technique}\n\n{explanation}\n\n👨‍🏫 À travailler avec {coach_name} chez Apollo {gym_name}",
+        "🎯 {technique} : mode d'emploi\n\n{explanation}\n\n🥊 Gants aux poings ? On t'attend chez Apollo {gym_name} !"
+    ],
+    'gym_atmosphere': [
+        "🔥 {atmosphere}\n\n🥊 On t'attend chez Apollo {gym_name} !",
+        "🎶 {atmosphere}\n\n👥 Une communauté qui te pousse à chaque séance : rejoins-la chez Apollo {gym_name} !"
+    ],
+    'class_schedule': [
+        "📅 TES HORAIRES chez Apollo {gym_name}\n\n🕕 En semaine : {weekday_hours}\n🕘 Le week-end : {weekend_hours}\n\n🥊 Au programme : {specialties}",
+        "⏰ Pas d'excuse côté horaires !\n\nApollo {gym_name} t'accueille en semaine ({weekday_hours}) pour {activity}."
+    ],
+    'special_offers': [
+        "🎁 {offer_title}\n\n{offer_details}\n\n📍 Rendez-vous à l'accueil d'Apollo {gym_name}"
     ]
 }
 
+# Versions courtes, retenues quand aucun template complet ne tient dans le max_char
+# de la plateforme (ex: TikTok) une fois la place des hashtags réservée
+POST_TEMPLATES_SHORT = {
+    'motivation': [
+        "🔥 {motivation_quote} 💪 Apollo {gym_name}",
+        "⚡ Nouveau départ aujourd'hui ! On t'attend chez Apollo {gym_name} 🥊"
+    ],
+    'workout_tips': [
+        "💡 {tip_title} : le conseil de {coach_name} 🥊",
+        "⚠️ {common_mistake} ? À éviter ! 🥊"
+    ],
+    'coach_spotlight': [
+        "🌟 Focus coach : {coach_name}, chez Apollo {gym_name} 🥊",
+        "💬 « {coach_quote} » {coach_name}"
+    ],
+    'member_success': [
+        "🏆 Bravo à nos membres d'Apollo {gym_name} ! Et toi, ton objectif ?"
+    ],
+    'nutrition': [
+        "🥗 {nutrition_title} : le conseil nutrition d'Apollo {gym_name}"
+    ],
+    'boxing_techniques': [
+        "🥊 {technique} : viens le travailler chez Apollo {gym_name} !"
+    ],
+    'gym_atmosphere': [
+        "🔥 Sacs, musique et énergie : bienvenue chez Apollo {gym_name} !"
+    ],
+    'class_schedule': [
+        "📅 Apollo {gym_name} : en semaine {weekday_hours} 🥊"
+    ],
+    'special_offers': [
+        "🎁 {offer_title} chez Apollo {gym_name} : demande à l'accueil !"
+    ]
+}
+
+# Banques de valeurs pour remplir les templates sans IA
+# Les 'groups' regroupent les slots qui doivent rester cohérents entre eux
+TEMPLATE_SLOT_BANKS = {
+    'motivation_quote': [
+        "La discipline bat la motivation, chaque jour.",
+        "Ton seul adversaire, c'est toi d'hier.",
+        "Chaque round compte, même les plus durs.",
+        "Le corps atteint ce que l'esprit croit possible.",
+        "Pas de raccourci vers un endroit qui vaut le détour."
+    ],
+    'personal_message': [
+        "chaque séance te rapproche de ta meilleure version",
+        "la progression se construit ensemble, entraînement après entraînement",
+        "il n'y a pas de niveau requis, seulement l'envie d'avancer",
+        "l'énergie du groupe te pousse plus loin que tu ne l'imagines"
+    ],
+    'workout_motivation': [
+        "Cette semaine, on vise la régularité : 3 séances, zéro excuse.",
+        "Oublie la perfection, vise le progrès. Un entraînement à la fois.",
+        "Ton futur toi te remerciera pour la séance d'aujourd'hui."
+    ],
+    'success_story': [
+        "Il y a 6 mois, Karim n'avait jamais enfilé de gants. Aujourd'hui, il enchaîne 5 rounds sans faiblir.",
+        "Léa s'est fixé un objectif : courir 10 km. Après 3 mois de cardio et de boxe, c'est chose faite !",
+        "Thomas a retrouvé confiance et énergie grâce à 3 séances par semaine avec nos coachs."
+    ],
+    'coach_quality': [
+        "Patience, exigence et bonne humeur : la recette d'une séance réussie.",
+        "Débutant ou confirmé, chaque membre repart avec un conseil sur mesure.",
+        "Technique irréprochable et énergie contagieuse du premier au dernier round."
+    ],
+    'coach_quote': [
+        "La régularité fait plus que l'intensité.",
+        "Une bonne garde, c'est déjà la moitié du combat.",
+        "Je ne veux pas que tu sois parfait, je veux que tu reviennes."
+    ],
+    'atmosphere': [
+        "Le bruit des sacs, la musique à fond et l'énergie du groupe : bienvenue dans l'ambiance Apollo.",
+        "Ici, personne ne s'entraîne seul : on s'encourage, on transpire et on progresse ensemble.",
+        "Premier cours ? Pas de pression : toute l'équipe est là pour t'accueillir."
+    ],
+    'groups': {
+        'nutrition': [
+            {'nutrition_title': "Mange avant de frapper", 'nutrition_content': "Une banane ou une poignée d'amandes 1 h avant la séance : de l'énergie sans lourdeur."},
+            {'nutrition_title': "Les protéines après l'effort", 'nutrition_content': "Dans les 2 heures qui suivent l'entraînement, mise sur œufs, poisson, légumineuses ou yaourt grec."},
+            {'nutrition_title': "L'hydratation d'abord", 'nutrition_content': "Une perte d'eau de 2 % suffit à faire baisser tes performances : garde ta gourde à portée de main."}
+        ],
+        'offer': [
+            {'offer_title': "SÉANCE D'ESSAI", 'offer_details': "Tu hésites encore ? Passe à l'accueil pour découvrir nos cours lors d'une séance d'essai."},
+            {'offer_title': "VIENS À DEUX", 'offer_details': "L'entraînement est plus motivant à plusieurs : demande à l'accueil les avantages du parrainage."}
+        ],
+        'tip': [
+            {'tip_title': "Respire pendant l'effort", 'tip_content': "Expire sur chaque frappe ou chaque poussée : tu gagnes en puissance et tu retardes la fatigue."},
+            {'tip_title': "Échauffe tes épaules", 'tip_content': "5 minutes de rotations et de shadow boxing léger réduisent fortement le risque de blessure."},
+            {'tip_title': "Hydrate-toi tôt", 'tip_content': "Bois 50 cl d'eau dans l'heure qui précède la séance, pas seulement pendant."}
+        ],
+        'technique': [
+            {'technique': "Le jab", 'explanation': "Pied avant légèrement tourné, poing qui tourne en fin de course, retour immédiat en garde."},
+            {'technique': "Le crochet", 'explanation': "Le coude reste à hauteur du poing, la rotation vient des hanches et du pied d'appui."},
+            {'technique': "L'esquive rotative", 'explanation': "Fléchis les genoux, garde les yeux sur l'adversaire et reviens en garde du côté opposé."}
+        ],
+        'mistake': [
+            {'common_mistake': "Baisser la garde après avoir frappé", 'correct_way': "Ramène toujours la main au menton aussi vite qu'elle est partie."},
+            {'common_mistake': "Arrondir le dos au soulevé de terre", 'correct_way': "Gaine les abdos, dos neutre, la barre reste collée aux tibias."},
+            {'common_mistake': "Frapper uniquement avec le bras", 'correct_way': "Engage les jambes et les hanches : la puissance part du sol."}
+        ]
+    }
+}
+
+# Hashtags : pools pré-calculés par (salle, type de post, plateforme) puis tirés
+# par poids, avec rotation entre plusieurs jeux pour ne pas répéter le même
+HASHTAG_CONFIG = {
+    'brand': ['#ApolloSportingClub', '#BoxingFitness', '#ParisSport', '#FitnessMotivation', '#BoxingTraining'],
+    'post_types': {
+        'motivation': ['#Motivation', '#FitnessGoals', '#MondayMotivation', '#NoPainNoGain', '#Discipline'],
+        'workout_tips': ['#WorkoutTips', '#FitnessTips', '#Training', '#Entrainement', '#Workout'],
+        'coach_spotlight': ['#Coach', '#Expert', '#PersonalTrainer', '#CoachSportif', '#TeamApollo'],
+        'member_success': ['#Transformation', '#FitnessJourney', '#Progress', '#AvantApres', '#Objectif'],
+        'nutrition': ['#Nutrition', '#HealthyEating', '#FitnessNutrition', '#MealPrep', '#Proteines'],
+        'boxing_techniques': ['#Boxing', '#BoxingTechnique', '#MartialArts', '#BoxeAnglaise', '#Sparring'],
+        'gym_atmosphere': ['#GymLife', '#SalleDeSport', '#GymVibes', '#Communaute', '#TeamSpirit'],
+        'class_schedule': ['#Planning', '#CoursCollectifs', '#Reservation', '#CetteSemaine', '#GroupFitness'],
+        'special_offers': ['#Offre', '#PromoSport', '#EssaiGratuit', '#Abonnement', '#BonPlan']
+    },
+    'specialties': {
+        'Boxe': ['#Boxe', '#BoxeParis', '#BoxingLife'],
+        'CrossFit': ['#CrossFit', '#WOD', '#CrossFitParis'],
+        'HIIT': ['#HIIT', '#Cardio', '#Interval'],
+        'Musculation': ['#Musculation', '#Muscu', '#Strength'],
+        'Fitness': ['#Fitness', '#FitnessParis', '#FitFam'],
+        'Yoga': ['#Yoga', '#YogaParis', '#Mindfulness'],
+        'Pilates': ['#Pilates', '#PilatesParis', '#Core'],
+        'Cardio': ['#Cardio', '#Endurance', '#CardioTraining'],
+        'TRX': ['#TRX', '#Suspension', '#FunctionalTraining'],
+        'Coaching Personnel': ['#CoachingPersonnel', '#PersonalTraining', '#CoachPrive']
+    },
+    'platforms': {
+        'instagram': ['#InstaFit', '#FitnessInstagram', '#ParisFitness'],
+        'facebook': [],
+        'linkedin': ['#BienEtreAuTravail', '#QVT', '#SportEntreprise'],
+        'tiktok': ['#FitTok', '#GymTok', '#BoxingTok']
+    },
+    # Poids de tirage par origine du hashtag
+    'weights': {'gym': 5.0, 'brand': 3.0, 'post_type': 2.5, 'specialty': 1.5, 'platform': 1.0},
+    # Toujours présents en tête : premier hashtag de la salle + hashtag de marque
+    'pinned': 2,
+    # Jeux pré-calculés par combinaison, servis à tour de rôle
+    'variants': 8,
+    # Nombre de hashtags d'une plateforme sans optimal_hashtags configuré
+    'default_limit': 5
+}
+
 # =============================================================================
 # CONFIGURATION ANALYTICS
 # =============================================================================
@@ -267,6 +613,29 @@ ANALYTICS_CONFIG = {
 # CONFIGURATION AUTOMATION
 # =============================================================================
 
+# Scheduler : jobs persistés (planning, posts personnalisés, nouvelles tentatives)
+SCHEDULER_CONFIG = {
+    'jobstore_url': os.getenv('SCHEDULER_JOBSTORE_URL', 'sqlite:///data/scheduler_jobs.sqlite3'),
+    'jobstore_table': 'apollo_jobs',
+    'coalesce': True,  # plusieurs exécutions manquées (arrêt, veille) → une seule
+    'misfire_grace_time': int(os.getenv('SCHEDULER_MISFIRE_GRACE', '900')),  # retard toléré (secondes)
+    'max_instances': 1,
+    # Échecs de publication : backoff exponentiel avec gigue complète, contenu déjà généré réutilisé
+    'retry_base_minutes': 2,
+    'retry_max_minutes': 120,
+    'retry_max_attempts': 5,
+    # Créneau du planning : un seul job publie pour toutes les salles
+    'fanout_workers': int(os.getenv('SCHEDULER_FANOUT_WORKERS', '0')) or None,  # None : concurrence des providers IA
+    'publish_stagger_seconds': float(os.getenv('SCHEDULER_PUBLISH_STAGGER', '2')),
+    # Pré-génération : posts des prochains créneaux prêts en base avant leur déclenchement
+    'pregeneration_hours': int(os.getenv('SCHEDULER_PREGENERATION_HOURS', '12')),
+    'pregeneration_interval_minutes': 30,
+    # Premier passage différé : un redémarrage (CLI, dashboard) ne relance pas aussitôt toute la génération
+    'pregeneration_start_delay_minutes': int(os.getenv('SCHEDULER_PREGENERATION_START_DELAY', '10')),
+    'pregeneration_wait_seconds': 120,    # attente max d'un créneau sur sa pré-génération en cours
+    'pregeneration_expiry_minutes': 60    # posts prêts jamais publiés d'un créneau passé : expirés
+}
+
 AUTOMATION_CONFIG = {
     'posting_schedule': {
         'monday': [
@@ -0,0 +1,154 @@
+"""
+Apollo AI Content Cache
+Cache persistant prompt → complétion (SQLite) avec éviction TTL + LRU
+"""
+
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+
+from config import CACHE_CONFIG
+
+class ContentCache:
+    def __init__(self, path=None, ttl_seconds=None, max_entries=None, max_bytes=None):
+        self.path = path or CACHE_CONFIG['path']
+        self.ttl_seconds = ttl_seconds or CACHE_CONFIG['ttl_seconds']
+        self.max_entries = max_entries or CACHE_CONFIG['max_entries']
+        self.max_bytes = max_bytes or CACHE_CONFIG['max_bytes']
+        
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        
+        # Une seule connexion partagée, sérialisée par un verrou (lectures/écritures très courtes)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(self.path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("""
+            CREATE TABLE IF NOT EXISTS completions (
+                key TEXT PRIMARY KEY,
+                completion TEXT NOT NULL,
+                size INTEGER NOT NULL,
+                created_at REAL NOT NULL,
+                last_access REAL NOT NULL
+            )
+        """)
+        self._conn.execute(
+            "CREATE INDEX IF NOT EXISTS idx_completions_last_access ON completions(last_access)"
+        )
+        self._conn.commit()
+    
+    @staticmethod
+    def make_key(provider, model, system_prompt, prompt, temperature, **options):
+        """Hash stable des entrées qui déterminent la complétion"""
+        payload = json.dumps({
+            'provider': provider,
+            'model': model,
+            'system': system_prompt,
+            'prompt': prompt,
+            'temperature': temperature,
+            'options': options
+        }, sort_keys=True, ensure_ascii=False)
+        return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+    
+    def get(self, key, min_freshness=None):
+        """
+        Retourne la complétion en cache ou None.
+        min_freshness : âge maximum (secondes) accepté pour cette lecture.
+        """
+        now = time.time()
+        max_age = self.ttl_seconds
+        if min_freshness is not None:
+            max_age = min(max_age, min_freshness)
+        
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT completion, created_at FROM completions WHERE key = ?", (key,)
+            ).fetchone()
+            
+            if row is None or now - row[1] > max_age:
+                self.misses += 1
+                if row is not None and now - row[1] > self.ttl_seconds:
+                    self._conn.execute("DELETE FROM completions WHERE key = ?", (key,))
+                    self._conn.commit()
+                    self.evictions += 1
+                return None
+            
+            self._conn.execute("UPDATE completions SET last_access = ? WHERE key = ?", (now, key))
+            self._conn.commit()
+            self.hits += 1
+            return row[0]
+    
+    def set(self, key, completion):
+        """Enregistre une complétion puis applique les limites de taille"""
+        now = time.time()
+        size = len(completion.encode('utf-8'))
+        
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO completions (key, completion, size, created_at, last_access) "
+                "VALUES (?, ?, ?, ?, ?)",
+                (key, completion, size, now, now)
+            )
+            self._evict(now)
+            self._conn.commit()
+    
+    def _evict(self, now):
+        """Supprime les entrées expirées puis les moins récemment utilisées (LRU)"""
+        expired = self._conn.execute(
+            "DELETE FROM completions WHERE created_at < ?", (now - self.ttl_seconds,)
+        ).rowcount
+        self.evictions += expired
+        
+        entries, total_bytes = self._conn.execute(
+            "SELECT COUNT(*), COALESCE(SUM(size), 0) FROM completions"
+        ).fetchone()
+        if entries <= self.max_entries and total_bytes <= self.max_bytes:
+            return
+        
+        stale_keys = []
+        for key, size in self._conn.execute(
+            "SELECT key, size FROM completions ORDER BY last_access ASC"
+        ):
+            if entries <= self.max_entries and total_bytes <= self.max_bytes:
+                break
+            stale_keys.append((key,))
+            entries -= 1
+            total_bytes -= size
+        
+        self._conn.executemany("DELETE FROM completions WHERE key = ?", stale_keys)
+        self.evictions += len(stale_keys)
+    
+    def stats(self):
+        """Compteurs hit/miss et occupation du cache"""
+        with self._lock:
+            entries, total_bytes = self._conn.execute(
+                "SELECT COUNT(*), COALESCE(SUM(size), 0) FROM completions"
+            ).fetchone()
+        
+        lookups = self.hits + self.misses
+        return {
+            'hits': self.hits,
+            'misses': self.misses,
+            'evictions': self.evictions,
+            'hit_rate': self.hits / lookups if lookups else 0.0,
+            'entries': entries,
+            'bytes': total_bytes
+        }
+    
+    def clear(self):
+        """Vide entièrement le cache"""
+        with self._lock:
+            self._conn.execute("DELETE FROM completions")
+            self._conn.commit()
+    
+    def close(self):
+        with self._lock:
+            self._conn.close()
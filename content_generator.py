@@ -6,113 +6,704 @@ Support OpenAI + Ollama (IA locale gratuite)
 
 from openai import OpenAI
 import requests
+from requests.adapters import HTTPAdapter
 import random
 import json
+import math
 import os
+import threading
+import time
+import uuid
+from collections import deque
+from concurrent.futures import Future, ThreadPoolExecutor, as_completed, TimeoutError as FutureTimeout
 from datetime import datetime
-from PIL import Image, ImageDraw, ImageFont
 
 from config import (
-    OPENAI_CONFIG, APOLLO_GYMS, CONTENT_CONFIG, 
-    APOLLO_BRAND, POST_TEMPLATES
+    OPENAI_CONFIG, OLLAMA_CONFIG, CONTENT_CONFIG, 
+    APOLLO_BRAND, POST_TEMPLATES, GENERATION_CONFIG, CACHE_CONFIG, IMAGE_CACHE_CONFIG
 )
+from content_cache import ContentCache
+from content_repository import get_content_repository
+from content_store import get_content_log
+from gym_registry import get_gym_registry
+from hashtags import HashtagEngine
+from template_engine import TemplatePostGenerator
+from ollama_pool import OllamaBackendPool
+from resilience import CircuitBreaker, LatencyTracker
+from metrics import GENERATION_METRICS
+from rendering import render_to_file, render_platform_variants
+from image_cache import ImageCache
+
+LLM_PROVIDERS = ('openai', 'ollama')
+
+# Bloc 'metrics' présent dans chaque post généré (None si non applicable)
+METRIC_FIELDS = (
+    'queue_wait_ms', 'ttft_ms', 'llm_ms', 'total_ms', 'load_ms', 'prompt_eval_ms', 'eval_ms',
+    'prompt_tokens', 'completion_tokens', 'tokens_per_s', 'host'
+)
+
+def elapsed_ms(start):
+    """Millisecondes écoulées depuis un time.monotonic()"""
+    return (time.monotonic() - start) * 1000
+
+def build_http_session(pool_size=None, host_count=1):
+    """
+    Session HTTP partagée entre threads : connexions keep-alive réutilisées
+    via le pool urllib3 (les threads attendent une connexion libre plutôt que
+    d'en ouvrir une nouvelle à chaque post). pool_size s'entend par serveur.
+    """
+    pool_size = pool_size or OLLAMA_CONFIG['pool_size']
+    session = requests.Session()
+    adapter = HTTPAdapter(
+        pool_connections=max(host_count, 1), pool_maxsize=pool_size, pool_block=True
+    )
+    session.mount('http://', adapter)
+    session.mount('https://', adapter)
+    session.headers['Connection'] = 'keep-alive'
+    return session
 
 class ApolloContentGenerator:
-    def __init__(self):
-        # Configuration du provider IA (OpenAI ou Ollama)
-        self.ai_provider = os.getenv('AI_PROVIDER', 'ollama')  # Par défaut Ollama
+    def __init__(self, ai_provider=None, ollama_urls=None):
+        # Configuration du provider IA (OpenAI, Ollama ou templates sans IA)
+        self.ai_provider = ai_provider or os.getenv('AI_PROVIDER', 'ollama')  # Par défaut Ollama
+        self.gyms = get_gym_registry()
+        llm_deadline = GENERATION_CONFIG['llm_deadline']
+        
+        # Session HTTP poolée (keep-alive) partagée par tous les threads du générateur
+        ollama_urls = ollama_urls or OLLAMA_CONFIG['urls']
+        self.http = build_http_session(host_count=len(ollama_urls))
+        
+        # Serveurs Ollama : requête envoyée au serveur sain le moins chargé
+        self.ollama_model = OLLAMA_CONFIG['model']
+        self.ollama_pool = OllamaBackendPool(ollama_urls, session=self.http)
         
         if self.ai_provider == 'openai':
-            self.client = OpenAI(api_key=OPENAI_CONFIG['api_key'])
             print("🤖 Utilisation d'OpenAI GPT")
+        elif self.ai_provider == 'template':
+            print("⚡ Utilisation des templates Apollo (sans IA)")
         else:
-            self.ollama_url = os.getenv('OLLAMA_URL', 'http://localhost:11434')
-            self.ollama_model = os.getenv('OLLAMA_MODEL', 'llama2:7b-chat')
-            print(f"🦙 Utilisation d'Ollama - Modèle: {self.ollama_model}")
+            print(f"🦙 Utilisation d'Ollama - Modèle: {self.ollama_model} "
+                  f"({len(self.ollama_pool)} serveur(s))")
+        
+        # Provider alternatif pour les requêtes couvertes (hedging) et la bascule
+        self.hedge_provider = self._resolve_hedge_provider()
+        if self.hedge_provider:
+            print(f"🛡️ Provider de secours: {self.hedge_provider}")
+        
+        active_providers = {self.ai_provider, self.hedge_provider}
+        self.client = None
+        self._images_client = None
+        if 'openai' in active_providers:
+            self.client = OpenAI(api_key=OPENAI_CONFIG['api_key'], timeout=llm_deadline)
+        if 'ollama' in active_providers:
+            self.ollama_pool.start()
+        
+        # Disjoncteur et latences par provider
+        self.breakers = {
+            provider: CircuitBreaker(
+                provider,
+                GENERATION_CONFIG['breaker_failure_threshold'],
+                GENERATION_CONFIG['breaker_reset_timeout']
+            )
+            for provider in LLM_PROVIDERS
+        }
+        self.latencies = {provider: LatencyTracker() for provider in LLM_PROVIDERS}
+        self.hedge_stats = {'launched': 0, 'won': 0, 'failovers': 0}
+        self._stats_lock = threading.Lock()
+        
+        self.http_timeout = (
+            OLLAMA_CONFIG['connect_timeout'],
+            min(OLLAMA_CONFIG['read_timeout'], llm_deadline)
+        )
+        
+        # Budgets de tokens pré-calculés par (plateforme, type de post)
+        self._token_budgets = {
+            (platform, post_type): self._compute_token_budget(platform, post_type)
+            for platform in CONTENT_CONFIG['platforms']
+            for post_type in CONTENT_CONFIG['post_types']
+        }
+        
+        # Génération instantanée par templates : provider 'template' et secours si le LLM échoue
+        self.template_engine = TemplatePostGenerator()
+        self.hashtag_engine = HashtagEngine(self.gyms)
         
         self.brand = APOLLO_BRAND
         self.templates = POST_TEMPLATES
+        self._system_prompt = None
+        
+        # Durées renvoyées par Ollama (évaluation du prompt, décodage...)
+        self.ollama_timings = deque(maxlen=500)
+        
+        # Cache persistant prompt → complétion
+        self.cache = ContentCache() if CACHE_CONFIG['enabled'] else None
+        
+        # Images DALL·E téléchargées et réutilisées par concept
+        self.image_cache = ImageCache(session=self.http) if IMAGE_CACHE_CONFIG['enabled'] else None
+        self._video_generator = None
+        
+        # Limite de requêtes simultanées par provider (partagée entre tous les threads)
+        self._provider_slots = {
+            provider: threading.BoundedSemaphore(self.get_concurrency_limit(provider))
+            for provider in GENERATION_CONFIG['concurrency']
+        }
+        
+        # Threads portant les requêtes couvertes (la requête perdante se termine en arrière-plan)
+        self._hedge_executor = None
+        if self.hedge_provider:
+            self._hedge_executor = ThreadPoolExecutor(
+                max_workers=2 * (self.get_concurrency_limit() + self.get_concurrency_limit(self.hedge_provider)),
+                thread_name_prefix='apollo-hedge'
+            )
+    
+    def close(self):
+        """Libère les threads et connexions du générateur (health checks, hedging, images, HTTP)"""
+        self.ollama_pool.close()
+        if self._hedge_executor:
+            self._hedge_executor.shutdown(wait=False, cancel_futures=True)
+        if self.image_cache:
+            self.image_cache.close()
+        if self._video_generator:
+            self._video_generator.close()
+        self.http.close()
         
-    def generate_post_content(self, gym_id, platform, post_type, custom_prompt=None):
+    def generate_post_content(self, gym_id, platform, post_type, custom_prompt=None,
+                              bypass_cache=False, min_freshness=None):
         """
         Génère le contenu d'un post personnalisé pour une salle Apollo
+        bypass_cache : ignore le cache en lecture (la nouvelle réponse y est stockée).
+        Le cache ne sert qu'aux aperçus interactifs : tout chemin menant à une
+        publication passe bypass_cache=True, sinon le même texte serait republié.
+        min_freshness : âge max (secondes) d'une réponse en cache acceptée
         """
+        started = time.monotonic()
         gym = self.get_gym_by_id(gym_id)
         platform_config = CONTENT_CONFIG['platforms'][platform]
         
+        if self.ai_provider == 'template':
+            return self._generate_with_templates(gym, platform, post_type, started=started)
+        
         # Construction du prompt personnalisé
         prompt = self.build_content_prompt(gym, platform, post_type, custom_prompt)
         
         try:
-            # Génération selon le provider configuré
-            if self.ai_provider == 'openai':
-                content = self._generate_with_openai(prompt)
-            else:
-                content = self._generate_with_ollama(prompt)
+            max_tokens = self.get_token_budget(platform, post_type)
+            cache_key = self._cache_key(prompt, max_tokens)
+            content = None
+            if self.cache and not bypass_cache:
+                content = self.cache.get(cache_key, min_freshness)
+            cache_hit = content is not None
+            
+            provider, metrics = self.ai_provider, {}
+            if not cache_hit:
+                # Génération : provider principal, secours si lent ou en panne
+                content, provider, metrics = self._complete(prompt, max_tokens)
+                
+                if content and self.cache:
+                    self.cache.set(self._cache_key(prompt, max_tokens, provider), content)
             
             if not content:
-                return None
+                return self._template_fallback(gym, platform, post_type, metrics, started)
             
-            # Post-processing selon la plateforme
-            content = self.format_for_platform(content, platform, gym)
+            return self._build_post_result(content, gym, platform, post_type, cache_hit, provider,
+                                           metrics, started)
             
-            return {
-                'content': content,
-                'gym': gym,
-                'platform': platform,
-                'type': post_type,
-                'generated_at': datetime.now().isoformat(),
-                'hashtags': self.generate_hashtags(gym, post_type, platform),
-                'optimal_time': self.get_optimal_posting_time(platform),
-                'image_suggestion': self.suggest_image_concept(post_type, gym),
-                'ai_provider': self.ai_provider
-            }
+        except Exception as e:
+            print(f"Erreur génération contenu: {e}")
+            return None
+    
+    def generate_post_content_stream(self, gym_id, platform, post_type, custom_prompt=None,
+                                     bypass_cache=False, min_freshness=None):
+        """
+        Variante streaming de generate_post_content.
+        Produit des dicts {'delta': texte} au fil de la génération, puis un dernier
+        {'done': True, 'post': post formaté ou None}. Interrompre l'itération
+        (break, close() ou Ctrl+C) coupe la requête en cours.
+        """
+        started = time.monotonic()
+        gym = self.get_gym_by_id(gym_id)
+        prompt = self.build_content_prompt(gym, platform, post_type, custom_prompt)
+        
+        if self.ai_provider == 'template':
+            post = self._generate_with_templates(gym, platform, post_type, started=started)
+            if post:
+                yield {'delta': post['content']}
+            yield {'done': True, 'post': post}
+            return
+        
+        provider = self.ai_provider
+        streaming_provider = None
+        metrics = {}
+        try:
+            max_tokens = self.get_token_budget(platform, post_type)
+            cache_key = self._cache_key(prompt, max_tokens)
+            content = None
+            if self.cache and not bypass_cache:
+                content = self.cache.get(cache_key, min_freshness)
+            cache_hit = content is not None
+            
+            if cache_hit:
+                yield {'delta': content}
+            else:
+                # Pas de hedging en streaming : on choisit un provider dont le disjoncteur est fermé
+                provider = streaming_provider = self._select_provider()
+                chunks = []
+                wait_start = time.monotonic()
+                with self._provider_slot(provider):
+                    metrics['queue_wait_ms'] = elapsed_ms(wait_start)
+                    llm_start = time.monotonic()
+                    if provider == 'openai':
+                        stream = self._stream_with_openai(prompt, max_tokens, metrics)
+                    else:
+                        stream = self._stream_with_ollama(prompt, max_tokens, metrics)
+                    
+                    for delta in stream:
+                        if not chunks:
+                            metrics['ttft_ms'] = elapsed_ms(llm_start)
+                        chunks.append(delta)
+                        yield {'delta': delta}
+                    metrics['llm_ms'] = elapsed_ms(llm_start)
+                
+                content = ''.join(chunks).strip()
+                streaming_provider = None
+                self._record_provider_result(provider, content)
+                if metrics.get('completion_tokens') and not metrics.get('tokens_per_s'):
+                    metrics['tokens_per_s'] = metrics['completion_tokens'] / (metrics['llm_ms'] / 1000)
+                if content and self.cache:
+                    self.cache.set(self._cache_key(prompt, max_tokens, provider), content)
             
+        except requests.exceptions.ConnectionError:
+            print("❌ Ollama non disponible. Lancez: ollama serve")
+            content = None
         except Exception as e:
             print(f"Erreur génération contenu: {e}")
+            content = None
+        except BaseException:
+            # Annulation (client déconnecté, close(), Ctrl+C pendant la lecture) : pas un échec du provider
+            if streaming_provider:
+                self.breakers[streaming_provider].release()
+                streaming_provider = None
+            raise
+        finally:
+            # Stream en erreur : le disjoncteur doit le savoir
+            if streaming_provider:
+                if content is None:
+                    self.breakers[streaming_provider].record_failure()
+                else:
+                    self.breakers[streaming_provider].release()
+        
+        if not content:
+            post = self._template_fallback(gym, platform, post_type, metrics, started)
+            if post:
+                yield {'delta': post['content']}
+            yield {'done': True, 'post': post}
+            return
+        
+        # Mise en forme plateforme + hashtags une fois le texte complet reçu
+        yield {'done': True, 'post': self._build_post_result(content, gym, platform, post_type, cache_hit, provider,
+                                                             metrics, started)}
+    
+    def _generate_with_templates(self, gym, platform, post_type, metrics=None, started=None):
+        """Génération sans IA : template rempli avec les pools de la salle (None si type sans template)"""
+        if not self.template_engine.supports(post_type):
+            print(f"⚠️ Aucun template pour le type de post: {post_type}")
+            return None
+        max_chars = CONTENT_CONFIG['platforms'][platform]['max_char']
+        hashtags = self.generate_hashtags(gym, post_type, platform)
+        # Place des hashtags réservée avant le choix du template (le texte garde au moins la moitié
+        # de la limite) ; ceux qui ne tiennent plus sont retirés en fin de jeu
+        budget = max(max_chars - len(' '.join(hashtags)) - 2, max_chars // 2)
+        content = self.template_engine.render(gym['id'], post_type, budget)
+        room = max_chars - min(len(content), budget) - 2
+        while hashtags and len(' '.join(hashtags)) > room:
+            hashtags = hashtags[:-1]
+        return self._build_post_result(content, gym, platform, post_type, provider='template',
+                                       metrics=metrics, started=started, hashtags=hashtags)
+    
+    def _template_fallback(self, gym, platform, post_type, metrics=None, started=None):
+        """Bascule sur les templates quand le LLM est indisponible ou trop lent"""
+        if not GENERATION_CONFIG['template_fallback'] or not self.template_engine.supports(post_type):
             return None
+        
+        print(f"⚡ LLM indisponible, post généré par template ({post_type})")
+        # On garde les mesures de la tentative LLM (attente, durée avant abandon)
+        metrics = dict(metrics or {}, fallback=True)
+        post = self._generate_with_templates(gym, platform, post_type, metrics, started)
+        post['fallback'] = True
+        return post
+    
+    def _build_post_result(self, content, gym, platform, post_type, cache_hit=False, provider=None,
+                           metrics=None, started=None, hashtags=None):
+        """
+        Post-processing plateforme et métadonnées d'un post généré.
+        hashtags : posts par template, ajoutés au texte après la troncature (le LLM écrit les siens)
+        """
+        content = self.format_for_platform(content, platform, gym, hashtags)
+        
+        metrics = {**dict.fromkeys(METRIC_FIELDS), **(metrics or {})}
+        metrics.update(
+            provider=provider or self.ai_provider,
+            cache_hit=cache_hit,
+            total_ms=elapsed_ms(started) if started is not None else metrics['total_ms']
+        )
+        GENERATION_METRICS.observe(metrics)
+        
+        return {
+            'post_id': uuid.uuid4().hex,
+            'content': content,
+            'gym': gym.to_dict(),
+            'platform': platform,
+            'type': post_type,
+            'generated_at': datetime.now().isoformat(),
+            # Copie en liste seulement ici : le post est sérialisé (JSON, dépôt)
+            'hashtags': list(hashtags if hashtags is not None else self.generate_hashtags(gym, post_type, platform)),
+            'optimal_time': self.get_optimal_posting_time(platform),
+            'image_suggestion': self.suggest_image_concept(post_type, gym),
+            'ai_provider': provider or self.ai_provider,
+            'cache_hit': cache_hit,
+            'metrics': metrics
+        }
+    
+    def _cache_key(self, prompt, max_tokens, provider=None):
+        """
+        Clé de cache : provider, modèle, prompts, température et budget.
+        provider : celui qui a réellement répondu (principal par défaut) ; seules les
+        réponses du principal sont donc relues, une réponse du secours n'est jamais
+        présentée comme venant du principal.
+        """
+        provider = provider or self.ai_provider
+        if provider == 'openai':
+            model, temperature = OPENAI_CONFIG.get('model'), OPENAI_CONFIG.get('temperature', 0.7)
+        else:
+            model, temperature = self.ollama_model, OLLAMA_CONFIG['temperature']
+        
+        return ContentCache.make_key(
+            provider, model, self.get_system_prompt(), prompt, temperature,
+            max_tokens=max_tokens
+        )
+    
+    def _compute_token_budget(self, platform, post_type):
+        """Tokens nécessaires pour remplir max_char, ajustés selon le type de post"""
+        budget_config = GENERATION_CONFIG['token_budget']
+        max_char = CONTENT_CONFIG['platforms'][platform]['max_char']
+        factor = budget_config['post_type_factor'].get(post_type, 1.0)
+        
+        tokens = math.ceil(max_char * factor / budget_config['chars_per_token'])
+        return max(budget_config['min_tokens'], min(tokens, budget_config['max_tokens']))
+    
+    def get_token_budget(self, platform, post_type):
+        """Nombre max de tokens à générer pour ce couple plateforme/type"""
+        budget = self._token_budgets.get((platform, post_type))
+        return budget if budget is not None else self._compute_token_budget(platform, post_type)
+    
+    def _resolve_hedge_provider(self):
+        """Provider alternatif ('auto' : l'autre LLM s'il est configuré)"""
+        setting = GENERATION_CONFIG['hedge_provider']
+        if self.ai_provider not in LLM_PROVIDERS or setting == 'none':
+            return None
+        if setting in LLM_PROVIDERS:
+            return setting if setting != self.ai_provider else None
+        
+        if self.ai_provider == 'ollama' and OPENAI_CONFIG.get('api_key'):
+            return 'openai'
+        if self.ai_provider == 'openai' and (os.getenv('OLLAMA_URLS') or os.getenv('OLLAMA_URL')):
+            return 'ollama'
+        return None
+    
+    def get_hedge_delay(self, provider):
+        """Délai avant d'envoyer la requête couverte : p95 observé du provider"""
+        tracker = self.latencies[provider]
+        if len(tracker) >= GENERATION_CONFIG['hedge_min_samples']:
+            delay = tracker.percentile(GENERATION_CONFIG['hedge_percentile'])
+        else:
+            delay = GENERATION_CONFIG['hedge_delay']
+        return min(max(delay, GENERATION_CONFIG['hedge_min_delay']), GENERATION_CONFIG['llm_deadline'])
+    
+    def _count_hedge(self, counter):
+        with self._stats_lock:
+            self.hedge_stats[counter] += 1
+    
+    def _record_provider_result(self, provider, content, elapsed=None):
+        """Met à jour disjoncteur et latences après un appel"""
+        if content:
+            self.breakers[provider].record_success()
+            if elapsed is not None:
+                self.latencies[provider].observe(elapsed)
+        else:
+            self.breakers[provider].record_failure()
+    
+    def _call_provider(self, provider, prompt, max_tokens, slot_acquired=None):
+        """
+        Appel d'un LLM sous sa limite de concurrence → (texte, mesures).
+        slot_acquired (Event) est levé dès que l'appel obtient son créneau.
+        """
+        metrics = {}
+        wait_start = time.monotonic()
+        with self._provider_slot(provider):
+            metrics['queue_wait_ms'] = elapsed_ms(wait_start)
+            if slot_acquired is not None:
+                slot_acquired.set()
+            start = time.monotonic()
+            if provider == 'openai':
+                content = self._generate_with_openai(prompt, max_tokens, metrics)
+            else:
+                content = self._generate_with_ollama(prompt, max_tokens, metrics=metrics)
+            metrics['llm_ms'] = elapsed_ms(start)
+        
+        if metrics.get('completion_tokens') and not metrics.get('tokens_per_s'):
+            metrics['tokens_per_s'] = metrics['completion_tokens'] / (metrics['llm_ms'] / 1000)
+        
+        self._record_provider_result(provider, content, metrics['llm_ms'] / 1000)
+        return content, metrics
+    
+    def _select_provider(self):
+        """Provider principal, ou l'alternatif si le disjoncteur principal est ouvert"""
+        primary, alternate = self.ai_provider, self.hedge_provider
+        if self.breakers[primary].allow_request():
+            return primary
+        if alternate and self.breakers[alternate].allow_request():
+            self._count_hedge('failovers')
+            return alternate
+        raise RuntimeError(f"Disjoncteur ouvert pour {primary}")
+    
+    def _complete(self, prompt, max_tokens):
+        """
+        Génère le texte et renvoie (texte, provider, mesures).
+        - disjoncteur principal ouvert → provider alternatif directement
+        - principal plus lent que son p95 → requête couverte vers l'alternatif,
+          la première réponse valide l'emporte
+        - échec rapide du principal → bascule immédiate
+        """
+        primary, alternate = self.ai_provider, self.hedge_provider
+        try:
+            provider = self._select_provider()
+        except RuntimeError:
+            return None, primary, {}
+        
+        if provider != primary or not alternate:
+            content, metrics = self._call_provider(provider, prompt, max_tokens)
+            return content, provider, metrics
+        
+        slot_acquired = threading.Event()
+        primary_future = self._hedge_executor.submit(self._call_provider, primary, prompt, max_tokens, slot_acquired)
+        primary_future.add_done_callback(lambda _: slot_acquired.set())
+        # Le délai de couverture se compare au temps d'appel du LLM :
+        # l'attente du créneau et de la file de l'executor n'en font pas partie
+        slot_acquired.wait()
+        try:
+            content, metrics = primary_future.result(timeout=self.get_hedge_delay(primary))
+        except FutureTimeout:
+            pass
+        else:
+            if content or not self.breakers[alternate].allow_request():
+                return content, primary, metrics
+            self._count_hedge('failovers')
+            content, metrics = self._call_provider(alternate, prompt, max_tokens)
+            return content, alternate, metrics
+        
+        # Principal trop lent : requête couverte
+        if not self.breakers[alternate].allow_request():
+            content, metrics = primary_future.result()
+            return content, primary, metrics
+        
+        self._count_hedge('launched')
+        alternate_future = self._hedge_executor.submit(self._call_provider, alternate, prompt, max_tokens)
+        providers = {primary_future: primary, alternate_future: alternate}
+        metrics = {}
+        for future in as_completed(providers):
+            content, metrics = future.result()
+            metrics['hedged'] = True
+            if content:
+                if future is alternate_future:
+                    self._count_hedge('won')
+                return content, providers[future], metrics
+        return None, primary, metrics
+    
+    def get_resilience_stats(self):
+        """État des disjoncteurs, compteurs de hedging et p95 par provider"""
+        with self._stats_lock:
+            hedges = dict(self.hedge_stats)
+        return {
+            'primary': self.ai_provider,
+            'hedge_provider': self.hedge_provider,
+            'breakers': {provider: breaker.snapshot() for provider, breaker in self.breakers.items()},
+            'hedges': hedges,
+            'latency_p95': {
+                provider: tracker.percentile(95) for provider, tracker in self.latencies.items()
+            }
+        }
+    
+    def _provider_slot(self, provider):
+        """Sémaphore limitant les requêtes simultanées vers un provider"""
+        return self._provider_slots.setdefault(provider, threading.BoundedSemaphore(1))
+    
+    def get_concurrency_limit(self, provider=None):
+        """Nombre max de générations simultanées pour le provider"""
+        provider = provider or self.ai_provider
+        limit = GENERATION_CONFIG['concurrency'].get(provider, 1)
+        if provider == 'ollama':
+            # La limite Ollama s'entend par serveur : la capacité croît avec le pool
+            limit *= len(self.ollama_pool)
+        return limit
+    
+    def build_chat_request(self, gym, platform, post_type, custom_prompt=None):
+        """Corps de requête chat OpenAI d'un post (prompt Apollo et budget de tokens habituels)"""
+        prompt = self.build_content_prompt(gym, platform, post_type, custom_prompt)
+        return self._openai_request(prompt, self.get_token_budget(platform, post_type))
+    
+    def complete_with(self, provider, prompt, max_tokens):
+        """Texte brut d'un provider donné, sans cache ni hedging → (texte, mesures)"""
+        return self._call_provider(provider, prompt, max_tokens)
     
-    def _generate_with_openai(self, prompt):
+    def post_from_completion(self, content, gym, platform, post_type, provider=None, metrics=None):
+        """Post Apollo formaté à partir d'un texte généré ailleurs (ex: sortie de l'API Batch)"""
+        return self._build_post_result(content, gym, platform, post_type, provider=provider, metrics=metrics)
+    
+    def _openai_request(self, prompt, max_tokens):
+        """Paramètres de la requête chat OpenAI"""
+        return {
+            'model': OPENAI_CONFIG.get('model', 'gpt-4o-mini'),  # Modèle moins cher par défaut
+            'messages': [
+                {"role": "system", "content": self.get_system_prompt()},
+                {"role": "user", "content": prompt}
+            ],
+            'max_tokens': min(max_tokens, OPENAI_CONFIG.get('max_tokens', 500)),
+            'temperature': OPENAI_CONFIG.get('temperature', 0.7),
+            'stop': GENERATION_CONFIG['stop_sequences'][:4]  # 4 séquences max côté OpenAI
+        }
+    
+    @staticmethod
+    def _openai_usage(usage, metrics):
+        """Tokens consommés d'après le bloc usage d'OpenAI"""
+        if usage is not None and metrics is not None:
+            metrics['prompt_tokens'] = usage.prompt_tokens
+            metrics['completion_tokens'] = usage.completion_tokens
+    
+    def _generate_with_openai(self, prompt, max_tokens, metrics=None):
         """Génération avec OpenAI GPT"""
         try:
-            response = self.client.chat.completions.create(
-                model=OPENAI_CONFIG.get('model', 'gpt-4o-mini'),  # Modèle moins cher par défaut
-                messages=[
-                    {"role": "system", "content": self.get_system_prompt()},
-                    {"role": "user", "content": prompt}
-                ],
-                max_tokens=OPENAI_CONFIG.get('max_tokens', 500),
-                temperature=OPENAI_CONFIG.get('temperature', 0.7)
-            )
+            response = self.client.chat.completions.create(**self._openai_request(prompt, max_tokens))
+            self._openai_usage(response.usage, metrics)
             return response.choices[0].message.content.strip()
         except Exception as e:
             print(f"Erreur OpenAI: {e}")
             return None
     
-    def _generate_with_ollama(self, prompt):
+    def _stream_with_openai(self, prompt, max_tokens, metrics=None):
+        """Génération OpenAI en streaming : fragments de texte au fil de l'eau"""
+        stream = self.client.chat.completions.create(
+            stream=True, stream_options={'include_usage': True},
+            **self._openai_request(prompt, max_tokens)
+        )
+        try:
+            for chunk in stream:
+                # Le dernier fragment (sans choices) porte le décompte des tokens
+                self._openai_usage(chunk.usage, metrics)
+                if chunk.choices and chunk.choices[0].delta.content:
+                    yield chunk.choices[0].delta.content
+        finally:
+            stream.response.close()
+    
+    def _ollama_request(self, prompt, max_tokens, stream=False, endpoint=None):
+        """
+        Corps de la requête Ollama. Sur /api/chat, le prompt système est envoyé
+        à l'identique en tête de chaque requête : Ollama réutilise alors le cache
+        KV de ce préfixe au lieu de le réévaluer (modèle gardé chargé via keep_alive).
+        """
+        endpoint = endpoint or OLLAMA_CONFIG['endpoint']
+        system_prompt = self.get_system_prompt()
+        request = {
+            'model': self.ollama_model,
+            'stream': stream,
+            'keep_alive': OLLAMA_CONFIG['keep_alive'],
+            'options': {
+                'temperature': OLLAMA_CONFIG['temperature'],
+                'top_p': 0.9,
+                'num_predict': max_tokens,  # Ollama ignore 'max_tokens'
+                'stop': GENERATION_CONFIG['stop_sequences']
+            }
+        }
+        
+        if endpoint == 'chat':
+            request['messages'] = [
+                {'role': 'system', 'content': system_prompt},
+                {'role': 'user', 'content': prompt}
+            ]
+        else:
+            # Ancien format /api/generate : tout le prompt est réévalué à chaque appel
+            request['prompt'] = f"{system_prompt}\n\nUser: {prompt}\n\nAssistant:"
+        return request
+    
+    @staticmethod
+    def _ollama_text(data):
+        """Texte d'une réponse (ou d'un fragment) Ollama, chat ou generate"""
+        if 'message' in data:
+            return data['message'].get('content', '')
+        return data.get('response', '')
+    
+    def _record_ollama_timings(self, data, endpoint):
+        """Conserve les durées renvoyées par Ollama (nanosecondes → ms)"""
+        self.ollama_timings.append({
+            'endpoint': endpoint,
+            'prompt_eval_count': data.get('prompt_eval_count', 0),
+            'prompt_eval_ms': data.get('prompt_eval_duration', 0) / 1e6,
+            'eval_count': data.get('eval_count', 0),
+            'eval_ms': data.get('eval_duration', 0) / 1e6,
+            'load_ms': data.get('load_duration', 0) / 1e6,
+            'total_ms': data.get('total_duration', 0) / 1e6
+        })
+    
+    @staticmethod
+    def _ollama_metrics(data):
+        """Mesures du bloc final d'une réponse Ollama (ns → ms, débit en tokens/s)"""
+        eval_ns = data.get('eval_duration', 0)
+        load_ms = data.get('load_duration', 0) / 1e6
+        prompt_eval_ms = data.get('prompt_eval_duration', 0) / 1e6
+        return {
+            'load_ms': load_ms,
+            'prompt_eval_ms': prompt_eval_ms,
+            'eval_ms': eval_ns / 1e6,
+            'ttft_ms': load_ms + prompt_eval_ms,
+            'prompt_tokens': data.get('prompt_eval_count', 0),
+            'completion_tokens': data.get('eval_count', 0),
+            'tokens_per_s': data.get('eval_count', 0) / (eval_ns / 1e9) if eval_ns else None
+        }
+    
+    def get_prompt_eval_report(self):
+        """Durées moyennes d'évaluation du prompt par endpoint Ollama"""
+        report = {}
+        for endpoint in ('generate', 'chat'):
+            timings = [t for t in self.ollama_timings if t['endpoint'] == endpoint]
+            if not timings:
+                continue
+            # Le premier appel charge le modèle et remplit le cache du préfixe
+            warm = timings[1:] or timings
+            report[endpoint] = {
+                'calls': len(timings),
+                'first_prompt_eval_ms': timings[0]['prompt_eval_ms'],
+                'avg_prompt_eval_ms': sum(t['prompt_eval_ms'] for t in warm) / len(warm),
+                'avg_prompt_eval_count': sum(t['prompt_eval_count'] for t in warm) / len(warm)
+            }
+        return report
+    
+    def _generate_with_ollama(self, prompt, max_tokens, endpoint=None, metrics=None):
         """Génération avec Ollama (gratuit, local)"""
+        endpoint = endpoint or OLLAMA_CONFIG['endpoint']
         try:
-            system_prompt = self.get_system_prompt()
-            full_prompt = f"{system_prompt}\n\nUser: {prompt}\n\nAssistant:"
-            
-            response = requests.post(
-                f'{self.ollama_url}/api/generate',
-                json={
-                    'model': self.ollama_model,
-                    'prompt': full_prompt,
-                    'stream': False,
-                    'options': {
-                        'temperature': 0.7,
-                        'top_p': 0.9,
-                        'max_tokens': 500
-                    }
-                },
-                timeout=60
-            )
+            with self.ollama_pool.lease() as host:
+                if metrics is not None:
+                    metrics['host'] = host.url
+                response = self.http.post(
+                    f'{host.url}/api/{endpoint}',
+                    json=self._ollama_request(prompt, max_tokens, endpoint=endpoint),
+                    timeout=self.http_timeout
+                )
             
             if response.status_code == 200:
                 result = response.json()
-                return result.get('response', '').strip()
+                self._record_ollama_timings(result, endpoint)
+                if metrics is not None:
+                    metrics.update(self._ollama_metrics(result))
+                return self._ollama_text(result).strip()
             else:
                 print(f"Erreur Ollama: {response.status_code} - {response.text}")
                 return None
@@ -124,8 +715,50 @@ class ApolloContentGenerator:
             print(f"Erreur Ollama: {e}")
             return None
     
+    def _stream_with_ollama(self, prompt, max_tokens, metrics=None):
+        """Génération Ollama en streaming (NDJSON) : fragments de texte au fil de l'eau"""
+        endpoint = OLLAMA_CONFIG['endpoint']
+        with self.ollama_pool.lease() as host:
+            if metrics is not None:
+                metrics['host'] = host.url
+            response = self.http.post(
+                f'{host.url}/api/{endpoint}',
+                json=self._ollama_request(prompt, max_tokens, stream=True, endpoint=endpoint),
+                timeout=self.http_timeout,
+                stream=True
+            )
+            try:
+                if response.status_code != 200:
+                    raise RuntimeError(f"Ollama {response.status_code} - {response.text}")
+                
+                for line in response.iter_lines():
+                    if not line:
+                        continue
+                    data = json.loads(line)
+                    if data.get('error'):
+                        raise RuntimeError(data['error'])
+                    text = self._ollama_text(data)
+                    if text:
+                        yield text
+                    if data.get('done'):
+                        self._record_ollama_timings(data, endpoint)
+                        if metrics is not None:
+                            # Le TTFT est mesuré côté client en streaming
+                            server_metrics = self._ollama_metrics(data)
+                            server_metrics.pop('ttft_ms')
+                            metrics.update(server_metrics)
+                        break
+            finally:
+                # Fermer la réponse interrompt la génération si le consommateur abandonne
+                response.close()
+    
     def get_system_prompt(self):
-        """Prompt système pour définir le rôle de l'IA"""
+        """Prompt système pour définir le rôle de l'IA (construit une seule fois)"""
+        if self._system_prompt is None:
+            self._system_prompt = self._build_system_prompt()
+        return self._system_prompt
+    
+    def _build_system_prompt(self):
         return f"""Tu es le responsable marketing digital d'Apollo Sporting Club, un réseau premium de 13 salles de boxe et fitness à Paris.
 
 IDENTITÉ DE MARQUE:
@@ -183,12 +816,15 @@ TYPE DE POST: {post_type}"""
         
         return base_prompt
     
-    def format_for_platform(self, content, platform, gym):
-        """Adapte le contenu selon les spécificités de la plateforme"""
+    def format_for_platform(self, content, platform, gym, hashtags=None):
+        """Adapte le contenu selon les spécificités de la plateforme (hashtags ajoutés après troncature)"""
         max_chars = CONTENT_CONFIG['platforms'][platform]['max_char']
+        suffix = f"\n\n{' '.join(hashtags)}" if hashtags else ""
+        max_chars -= len(suffix)
         
         if len(content) > max_chars:
             content = content[:max_chars-3] + "..."
+        content += suffix
         
         if platform == 'instagram':
             content += f"\n\n📍 {gym['address']}"
@@ -204,26 +840,14 @@ TYPE DE POST: {post_type}"""
         return content
     
     def generate_hashtags(self, gym, post_type, platform):
-        """Génère des hashtags optimisés pour chaque plateforme"""
-        base_hashtags = gym['hashtags'].copy()
-        apollo_tags = [
-            "#ApolloSportingClub", "#BoxingFitness", 
-            "#ParisSport", "#FitnessMotivation", "#BoxingTraining"
-        ]
-        type_hashtags = {
-            'motivation': ["#Motivation", "#FitnessGoals", "#MondayMotivation"],
-            'workout_tips': ["#WorkoutTips", "#FitnessTips", "#Training"],
-            'coach_spotlight': ["#Coach", "#Expert", "#PersonalTrainer"],
-            'boxing_techniques': ["#Boxing", "#BoxingTechnique", "#MartialArts"],
-            'nutrition': ["#Nutrition", "#HealthyEating", "#FitnessNutrition"]
-        }
-        
-        all_hashtags = base_hashtags + apollo_tags
-        if post_type in type_hashtags:
-            all_hashtags.extend(type_hashtags[post_type])
-        
-        max_hashtags = CONTENT_CONFIG['platforms'][platform]['optimal_hashtags']
-        return all_hashtags[:max_hashtags]
+        """Hashtags optimisés pour la plateforme : jeu pré-calculé suivant de la rotation"""
+        return self.hashtag_engine.get(gym, post_type, platform)
+    
+    def refresh_hashtags(self, gyms=None):
+        """Recalcule les pools de hashtags après un changement de salles ou de HASHTAG_CONFIG"""
+        rebuilt = self.hashtag_engine.refresh(gyms or self.gyms)
+        print(f"🏷️ Hashtags: {rebuilt} combinaisons recalculées")
+        return rebuilt
     
     def get_optimal_posting_time(self, platform):
         """Retourne l'heure optimale pour publier sur la plateforme"""
@@ -241,101 +865,193 @@ TYPE DE POST: {post_type}"""
         }
         return concepts.get(post_type, "Visuel Apollo avec logo et couleurs de marque")
     
+    def get_images_client(self):
+        """Client OpenAI pour les images (endpoint dédié si OPENAI_IMAGES_BASE_URL est défini)"""
+        if IMAGE_CACHE_CONFIG['api_base_url']:
+            if self._images_client is None:
+                self._images_client = OpenAI(
+                    api_key=OPENAI_CONFIG['api_key'] or 'local',
+                    base_url=IMAGE_CACHE_CONFIG['api_base_url']
+                )
+            return self._images_client
+        return self.client
+    
+    def _request_dalle_url(self, prompt):
+        """Appel DALL-E : URL (temporaire) de l'image générée"""
+        response = self.get_images_client().images.generate(
+            model=IMAGE_CACHE_CONFIG['model'],
+            prompt=prompt,
+            size=IMAGE_CACHE_CONFIG['size'],
+            quality=IMAGE_CACHE_CONFIG['quality'],
+            n=1
+        )
+        return response.data[0].url
+    
+    def generate_image_with_dalle_async(self, concept, style="modern fitness photography"):
+        """
+        Future du chemin local de l'image du concept : réutilisée si déjà en cache,
+        sinon générée puis téléchargée en arrière-plan (une seule fois par concept)
+        """
+        prompt = f"{concept}, {style}, high quality, professional, Apollo red and black colors"
+        key = ImageCache.make_key(prompt, style, IMAGE_CACHE_CONFIG['size'], IMAGE_CACHE_CONFIG['model'])
+        
+        if self.get_images_client() is None:
+            cached = self.image_cache.lookup(key) if self.image_cache else None
+            if not cached:
+                print("⚠️ Génération d'images disponible uniquement avec OpenAI")
+                return None
+            return self.image_cache.get_or_create(key, lambda: None)
+        
+        if not self.image_cache:
+            # Cache désactivé : URL distante telle que renvoyée par DALL-E (appel synchrone)
+            future = Future()
+            try:
+                future.set_result(self._request_dalle_url(prompt))
+            except Exception as e:
+                future.set_exception(e)
+            return future
+        
+        return self.image_cache.get_or_create(
+            key, lambda: self._request_dalle_url(prompt), prompt,
+            {'concept': concept, 'style': style}
+        )
+    
     def generate_image_with_dalle(self, concept, style="modern fitness photography"):
-        """Génère une image avec DALL-E basée sur le concept (OpenAI seulement)"""
-        if self.ai_provider != 'openai':
-            print("⚠️ Génération d'images disponible uniquement avec OpenAI")
+        """Génère une image avec DALL-E basée sur le concept et renvoie son chemin local"""
+        future = self.generate_image_with_dalle_async(concept, style)
+        if future is None:
             return None
-            
+        
         try:
-            prompt = f"{concept}, {style}, high quality, professional, Apollo red and black colors"
-            response = self.client.images.generate(
-                model="dall-e-3",
-                prompt=prompt,
-                size="1024x1024",
-                quality="standard",
-                n=1
-            )
-            return response.data[0].url
+            return future.result()
         except Exception as e:
             print(f"Erreur génération image: {e}")
             return None
     
     def create_branded_image(self, text, background_color=None):
-        """Crée une image de marque avec texte overlay"""
+        """Crée une image de marque avec texte overlay (chemin du PNG, réutilisé si déjà rendu)"""
         if not background_color:
             background_color = self.brand['colors']['primary']
-            
-        width, height = 1080, 1080
-        img = Image.new('RGB', (width, height), background_color)
-        draw = ImageDraw.Draw(img)
-        
-        try:
-            font = ImageFont.truetype("arial.ttf", 60)
-        except:
-            font = ImageFont.load_default()
-        
-        text_bbox = draw.textbbox((0, 0), text, font=font)
-        text_width = text_bbox[2] - text_bbox[0]
-        text_height = text_bbox[3] - text_bbox[1]
         
-        x = (width - text_width) // 2
-        y = (height - text_height) // 2
-        draw.text((x, y), text, fill='white', font=font)
+        return render_to_file(text, background_color)
+    
+    def create_platform_images(self, text, background_color=None, platforms=None):
+        """Visuel de marque décliné par plateforme, encodé en mémoire sous la taille cible"""
+        if not background_color:
+            background_color = self.brand['colors']['primary']
         
-        img_path = f"temp_image_{datetime.now().strftime('%Y%m%d_%H%M%S')}.png"
-        img.save(img_path)
-        return img_path
+        return render_platform_variants(text, background_color, platforms)
     
-    def generate_batch_content(self, gym_ids=None, platforms=None, count=10):
-        """Génère un lot de contenus pour plusieurs salles/plateformes"""
+    def create_post_media(self, post):
+        """Visuel joint à la publication d'un post, décliné pour sa plateforme (None si elle n'a pas d'image)"""
+        headline = post['content'].strip().splitlines()[0][:80] if post.get('content') else ''
+        variants = self.create_platform_images(f"{post['gym']['name']}\n{headline}", platforms=[post['platform']])
+        return variants.get(post['platform'])
+    
+    def get_video_generator(self):
+        """Générateur de clips TikTok et son pool de processus, partagés par tous les rendus"""
+        if self._video_generator is None:
+            from video_generator import TikTokVideoGenerator
+            self._video_generator = TikTokVideoGenerator()
+        return self._video_generator
+    
+    def create_tiktok_video(self, post):
+        """Clip TikTok (scènes de marque + fond sonore) d'un post généré, chemin du MP4"""
+        return self.get_video_generator().render_post(post)
+    
+    def submit_tiktok_video(self, post):
+        """Rendu du clip TikTok en arrière-plan : Future du chemin du MP4 (None si échec)"""
+        return self.get_video_generator().submit_post(post)
+    
+    def build_batch_requests(self, gym_ids=None, platforms=None, count=10):
+        """Tire au hasard les combinaisons salle/plateforme/type d'un lot (hors cache : posts à publier)"""
         if not gym_ids:
-            gym_ids = [gym['id'] for gym in APOLLO_GYMS]
+            gym_ids = list(self.gyms.ids())
         if not platforms:
             platforms = list(CONTENT_CONFIG['platforms'].keys())
         
-        generated_content = []
         post_types = CONTENT_CONFIG['post_types']
+        return [
+            {
+                'gym_id': random.choice(gym_ids),
+                'platform': random.choice(platforms),
+                'post_type': random.choice(post_types),
+                'bypass_cache': True
+            }
+            for _ in range(count)
+        ]
+    
+    def iter_batch_content(self, batch_requests, max_workers=None):
+        """
+        Génère un lot en parallèle et renvoie chaque résultat dès qu'il est prêt.
+        Chaque résultat est un dict {'index', 'request', 'content', 'error'}.
+        """
+        if not batch_requests:
+            return
         
-        for _ in range(count):
-            gym_id = random.choice(gym_ids)
-            platform = random.choice(platforms)
-            post_type = random.choice(post_types)
-            
-            content = self.generate_post_content(gym_id, platform, post_type)
-            if content:
-                generated_content.append(content)
+        workers = min(max_workers or self.get_concurrency_limit(), len(batch_requests))
+        executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='apollo-batch')
+        try:
+            futures = [
+                executor.submit(self._generate_batch_item, index, request)
+                for index, request in enumerate(batch_requests)
+            ]
+            for future in as_completed(futures):
+                yield future.result()
+        finally:
+            # Arrêt anticipé du consommateur : on abandonne les requêtes pas encore lancées
+            executor.shutdown(wait=False, cancel_futures=True)
+    
+    def _generate_batch_item(self, index, request):
+        """Génère un élément du lot en capturant son erreur éventuelle"""
+        try:
+            content = self.generate_post_content(**request)
+            error = None if content else "Échec génération contenu"
+        except Exception as e:
+            content, error = None, str(e)
         
-        return generated_content
+        return {'index': index, 'request': request, 'content': content, 'error': error}
+    
+    def run_batch(self, batch_requests, max_workers=None, on_result=None):
+        """Génère un lot en parallèle, résultats renvoyés dans l'ordre des requêtes"""
+        results = [None] * len(batch_requests)
+        for result in self.iter_batch_content(batch_requests, max_workers):
+            results[result['index']] = result
+            if on_result:
+                on_result(result)
+        return results
+    
+    def generate_batch_content(self, gym_ids=None, platforms=None, count=10,
+                               max_workers=None, on_result=None):
+        """Génère un lot de contenus pour plusieurs salles/plateformes"""
+        batch_requests = self.build_batch_requests(gym_ids, platforms, count)
+        results = self.run_batch(batch_requests, max_workers, on_result)
+        return [result['content'] for result in results if result['content']]
     
     def get_gym_by_id(self, gym_id):
-        """Récupère les données d'une salle par son ID"""
-        for gym in APOLLO_GYMS:
-            if gym['id'] == gym_id:
-                return gym
-        return APOLLO_GYMS[0]
+        """Récupère les données d'une salle par son ID (UnknownGymError si elle n'existe pas)"""
+        return self.gyms.get(gym_id)
     
     def save_content_batch(self, content_batch, filename=None):
-        """Sauvegarde un lot de contenus générés"""
-        if not filename:
-            filename = f"apollo_content_{datetime.now().strftime('%Y%m%d_%H%M%S')}.json"
-        
-        os.makedirs('data/generated_content', exist_ok=True)
-        filepath = f"data/generated_content/{filename}"
-        
-        with open(filepath, 'w', encoding='utf-8') as f:
-            json.dump(content_batch, f, indent=2, ensure_ascii=False)
-        
-        return filepath
+        """
+        Enregistre un lot dans le dépôt SQLite et l'ajoute au journal JSONL (renvoie le chemin du segment).
+        filename : journal distinct (ex: "demo_batch.json" → journal "demo_batch")
+        """
+        get_content_repository().add_many(content_batch)
+        log = get_content_log(os.path.splitext(filename)[0] if filename else 'generated')
+        log.extend(content_batch)
+        return log.flush()
 
 # =============================================================================
 # FONCTIONS D'INSTALLATION ET TEST OLLAMA
 # =============================================================================
 
-def check_ollama_status():
+def check_ollama_status(url=None, session=None):
     """Vérifie si Ollama est disponible et installé"""
+    url = url or OLLAMA_CONFIG['url']
+    http = session or requests
     try:
-        response = requests.get('http://localhost:11434/api/tags', timeout=5)
+        response = http.get(f'{url}/api/tags', timeout=(OLLAMA_CONFIG['connect_timeout'], 5))
         if response.status_code == 200:
             models = response.json().get('models', [])
             print(f"✅ Ollama disponible avec {len(models)} modèles")
@@ -349,14 +1065,14 @@ def check_ollama_status():
         print("❌ Ollama non installé ou non lancé")
         return False
 
-def install_ollama_model(model_name="llama2:7b-chat"):
+def install_ollama_model(model_name="llama2:7b-chat", url=None):
     """Installe un modèle Ollama"""
     print(f"📥 Installation du modèle {model_name}...")
     print("(Cela peut prendre plusieurs minutes)")
     
     try:
         response = requests.post(
-            'http://localhost:11434/api/pull',
+            f"{url or OLLAMA_CONFIG['url']}/api/pull",
             json={'name': model_name},
             stream=True,
             timeout=600
@@ -374,6 +1090,30 @@ def install_ollama_model(model_name="llama2:7b-chat"):
         print(f"❌ Erreur installation: {e}")
         return False
 
+def benchmark_ollama_prompt_eval(n=5):
+    """Compare le temps d'évaluation du prompt entre /api/generate et /api/chat"""
+    print("🦙 Apollo - BENCHMARK ÉVALUATION DU PROMPT OLLAMA")
+    print("=" * 50)
+    
+    generator = ApolloContentGenerator(ai_provider='ollama')
+    gym = generator.get_gym_by_id(1)
+    
+    for endpoint in ('generate', 'chat'):
+        for i in range(n):
+            post_type = CONTENT_CONFIG['post_types'][i % len(CONTENT_CONFIG['post_types'])]
+            prompt = generator.build_content_prompt(gym, 'instagram', post_type, None)
+            generator._generate_with_ollama(
+                prompt, generator.get_token_budget('instagram', post_type), endpoint=endpoint
+            )
+    
+    report = generator.get_prompt_eval_report()
+    for endpoint, stats in report.items():
+        print(f"\n/api/{endpoint} ({stats['calls']} appels)")
+        print(f"   1er appel: {stats['first_prompt_eval_ms']:.0f} ms")
+        print(f"   Moyenne suivante: {stats['avg_prompt_eval_ms']:.0f} ms "
+              f"pour {stats['avg_prompt_eval_count']:.0f} tokens évalués")
+    return report
+
 # =============================================================================
 # FONCTION DE DEMO
 # =============================================================================
@@ -0,0 +1,305 @@
+"""
+Apollo Content Repository
+Posts générés et publiés dans SQLite (WAL) : insertions en lot, index par salle,
+plateforme, type, statut et dates, requêtes paginées partagées CLI/dashboard/scheduler,
+registre des publications par clé d'idempotence
+"""
+
+import json
+import os
+import sqlite3
+import threading
+import uuid
+from datetime import datetime, timedelta
+
+from config import CONTENT_DB_CONFIG, PUBLISHING_CONFIG
+
+POST_STATUSES = ('generated', 'ready', 'claimed', 'published', 'failed', 'expired')
+
+class ContentRepository:
+    def __init__(self, path=None):
+        self.path = path or CONTENT_DB_CONFIG['path']
+        
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(self.path, check_same_thread=False, timeout=30)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.executescript("""
+            CREATE TABLE IF NOT EXISTS posts (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                post_id TEXT UNIQUE NOT NULL,
+                gym_id INTEGER NOT NULL,
+                gym_name TEXT,
+                platform TEXT NOT NULL,
+                type TEXT NOT NULL,
+                status TEXT NOT NULL,
+                content TEXT NOT NULL,
+                ai_provider TEXT,
+                generated_at TEXT NOT NULL,
+                published_at TEXT,
+                scheduled_for TEXT,
+                payload TEXT NOT NULL
+            );
+            CREATE INDEX IF NOT EXISTS idx_posts_gym_platform_date ON posts(gym_id, platform, generated_at);
+            CREATE INDEX IF NOT EXISTS idx_posts_platform_date ON posts(platform, generated_at);
+            CREATE INDEX IF NOT EXISTS idx_posts_type_date ON posts(type, generated_at);
+            CREATE INDEX IF NOT EXISTS idx_posts_status_date ON posts(status, generated_at);
+            CREATE INDEX IF NOT EXISTS idx_posts_generated_at ON posts(generated_at);
+            CREATE INDEX IF NOT EXISTS idx_posts_published_at ON posts(published_at);
+            CREATE TABLE IF NOT EXISTS publish_ledger (
+                idempotency_key TEXT PRIMARY KEY,
+                post_id TEXT NOT NULL,
+                platform TEXT NOT NULL,
+                status TEXT NOT NULL,
+                attempts INTEGER NOT NULL DEFAULT 0,
+                updated_at TEXT NOT NULL
+            );
+        """)
+        # Bases créées avant la pré-génération : colonne du créneau visé ajoutée à la volée
+        columns = {row[1] for row in self._conn.execute("PRAGMA table_info(posts)")}
+        if 'scheduled_for' not in columns:
+            self._conn.execute("ALTER TABLE posts ADD COLUMN scheduled_for TEXT")
+        self._conn.execute(
+            "CREATE INDEX IF NOT EXISTS idx_posts_slot ON posts(scheduled_for, platform, type)"
+        )
+        self._conn.commit()
+    
+    @staticmethod
+    def _row(post, status=None):
+        # Copie : le post de l'appelant n'est pas modifié (l'id attribué est renvoyé par add/add_many)
+        post = dict(post)
+        post.setdefault('post_id', uuid.uuid4().hex)
+        if status:
+            post['status'] = status
+        return (
+            post['post_id'], post['gym']['id'], post['gym']['name'], post['platform'], post['type'],
+            status or 'generated', post['content'], post.get('ai_provider'),
+            post.get('generated_at') or datetime.now().isoformat(),
+            post.get('published_at'), post.get('scheduled_for'), json.dumps(post, ensure_ascii=False, default=str)
+        )
+    
+    def add(self, post, status=None):
+        """
+        Enregistre un post et renvoie son post_id. Un post déjà enregistré garde son id
+        et son statut (sauf statut explicite) ; son contenu est mis à jour.
+        """
+        return self.add_many([post], status)[0]
+    
+    def add_many(self, posts, status=None):
+        """Insertion en lot dans une seule transaction (statut 'generated' par défaut) ; post_id dans l'ordre"""
+        rows = [self._row(post, status) for post in posts]
+        with self._lock:
+            with self._conn:
+                self._conn.executemany(
+                    "INSERT INTO posts (post_id, gym_id, gym_name, platform, type, status, content, "
+                    "ai_provider, generated_at, published_at, scheduled_for, payload) "
+                    "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?) "
+                    "ON CONFLICT(post_id) DO UPDATE SET content = excluded.content, "
+                    "ai_provider = excluded.ai_provider, payload = excluded.payload, "
+                    "published_at = COALESCE(excluded.published_at, posts.published_at), "
+                    "scheduled_for = COALESCE(excluded.scheduled_for, posts.scheduled_for)"
+                    + (", status = excluded.status" if status else ""),
+                    rows
+                )
+        return [row[0] for row in rows]
+    
+    def get(self, post_id):
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT payload, status, published_at FROM posts WHERE post_id = ?", (post_id,)
+            ).fetchone()
+        return self._load(row) if row else None
+    
+    def update_status(self, post_id, status, published_at=None):
+        """Change le statut d'un post (date de publication renseignée pour 'published')"""
+        if status not in POST_STATUSES:
+            raise ValueError(f"Statut inconnu: {status}")
+        if status == 'published' and published_at is None:
+            published_at = datetime.now().isoformat()
+        with self._lock:
+            with self._conn:
+                cursor = self._conn.execute(
+                    "UPDATE posts SET status = ?, published_at = COALESCE(?, published_at) WHERE post_id = ?",
+                    (status, published_at, post_id)
+                )
+        return cursor.rowcount > 0
+    
+    def attach(self, post_id, **fields):
+        """Ajoute des champs au contenu enregistré d'un post (ex: video_path), sans toucher à son statut"""
+        with self._lock:
+            with self._conn:
+                for name, value in fields.items():
+                    self._conn.execute(
+                        "UPDATE posts SET payload = json_set(payload, ?, ?) WHERE post_id = ?",
+                        (f"$.{name}", value, post_id)
+                    )
+    
+    def begin_publish(self, idempotency_key, post_id, platform, lease_seconds=None):
+        """
+        Inscrit une tentative de publication au registre, sauf si le post est déjà publié ou
+        si une autre tentative est en cours depuis moins de lease_seconds. Renvoie :
+        - None, 'failed' ou 'stale' (tentative 'pending' interrompue) : tentative inscrite, envoyer
+        - 'published' ou 'pending' : tentative non inscrite, ne pas envoyer
+        """
+        lease = PUBLISHING_CONFIG['lease_seconds'] if lease_seconds is None else lease_seconds
+        now = datetime.now()
+        stale_before = (now - timedelta(seconds=lease)).isoformat()
+        with self._lock:
+            with self._conn:
+                row = self._conn.execute(
+                    "SELECT status, updated_at FROM publish_ledger WHERE idempotency_key = ?", (idempotency_key,)
+                ).fetchone()
+                # Condition vérifiée dans l'écriture elle-même : deux processus ne prennent jamais la même tentative
+                cursor = self._conn.execute(
+                    "INSERT INTO publish_ledger (idempotency_key, post_id, platform, status, attempts, updated_at) "
+                    "VALUES (?, ?, ?, 'pending', 1, ?) ON CONFLICT(idempotency_key) DO UPDATE SET "
+                    "status = 'pending', attempts = attempts + 1, updated_at = excluded.updated_at "
+                    "WHERE publish_ledger.status = 'failed' "
+                    "OR (publish_ledger.status = 'pending' AND publish_ledger.updated_at < ?)",
+                    (idempotency_key, post_id, platform, now.isoformat(), stale_before)
+                )
+        if cursor.rowcount == 0:
+            return row[0] if row and row[0] != 'failed' else 'pending'
+        if row and row[0] == 'pending':
+            return 'stale'
+        return row[0] if row else None
+    
+    def finish_publish(self, idempotency_key, status):
+        """Résultat de la tentative en cours : 'published' ou 'failed'"""
+        with self._lock:
+            with self._conn:
+                self._conn.execute(
+                    "UPDATE publish_ledger SET status = ?, updated_at = ? WHERE idempotency_key = ?",
+                    (status, datetime.now().isoformat(), idempotency_key)
+                )
+    
+    def ledger_entry(self, idempotency_key):
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT post_id, platform, status, attempts, updated_at FROM publish_ledger WHERE idempotency_key = ?",
+                (idempotency_key,)
+            ).fetchone()
+        if not row:
+            return None
+        return dict(zip(('post_id', 'platform', 'status', 'attempts', 'updated_at'), row))
+    
+    def slot_posts(self, platform, post_type, scheduled_for):
+        """Posts (tous statuts) pré-générés pour un créneau du planning"""
+        scheduled_for = scheduled_for.isoformat() if isinstance(scheduled_for, datetime) else scheduled_for
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT payload, status, published_at FROM posts "
+                "WHERE scheduled_for = ? AND platform = ? AND type = ? ORDER BY id",
+                (scheduled_for, platform, post_type)
+            ).fetchall()
+        return [self._load(row) for row in rows]
+    
+    def claim_ready(self, platform, post_type, scheduled_for, gym_ids=None):
+        """
+        Réserve les posts prêts d'un créneau ('ready' → 'claimed') en une seule requête et les renvoie :
+        deux exécutions concurrentes du créneau ne reçoivent jamais le même post
+        """
+        scheduled_for = scheduled_for.isoformat() if isinstance(scheduled_for, datetime) else scheduled_for
+        query = ("UPDATE posts SET status = 'claimed' "
+                 "WHERE scheduled_for = ? AND platform = ? AND type = ? AND status = 'ready'")
+        params = [scheduled_for, platform, post_type]
+        if gym_ids is not None:
+            query += f" AND gym_id IN ({', '.join('?' * len(gym_ids))})"
+            params.extend(gym_ids)
+        with self._lock:
+            with self._conn:
+                rows = self._conn.execute(query + " RETURNING payload, status, published_at", params).fetchall()
+        return [self._load(row) for row in rows]
+    
+    def expire_stale(self, before):
+        """
+        Posts pré-générés jamais publiés des créneaux antérieurs à before ('ready' oubliés,
+        'claimed' d'une exécution interrompue) → 'expired' ; renvoie leur nombre
+        """
+        with self._lock:
+            with self._conn:
+                cursor = self._conn.execute(
+                    "UPDATE posts SET status = 'expired' WHERE status IN ('ready', 'claimed') AND scheduled_for < ?",
+                    (before.isoformat(),)
+                )
+        return cursor.rowcount
+    
+    @staticmethod
+    def _load(row):
+        payload, status, published_at = row
+        post = json.loads(payload)
+        post['status'] = status
+        post['published_at'] = published_at
+        return post
+    
+    @staticmethod
+    def _where(gym_id=None, platform=None, post_type=None, status=None, since=None, until=None):
+        clauses, params = [], []
+        for column, value in (('gym_id', gym_id), ('platform', platform), ('type', post_type), ('status', status)):
+            if value is not None:
+                clauses.append(f"{column} = ?")
+                params.append(value)
+        if since is not None:
+            clauses.append("generated_at >= ?")
+            params.append(since.isoformat() if isinstance(since, datetime) else since)
+        if until is not None:
+            clauses.append("generated_at < ?")
+            params.append(until.isoformat() if isinstance(until, datetime) else until)
+        return (" WHERE " + " AND ".join(clauses)) if clauses else "", params
+    
+    def query(self, gym_id=None, platform=None, post_type=None, status=None, since=None, until=None,
+              page=1, page_size=None, newest_first=True):
+        """
+        Page de posts filtrés, du plus récent au plus ancien par défaut.
+        Renvoie {'items', 'page', 'page_size', 'total', 'pages'}.
+        """
+        page_size = page_size or CONTENT_DB_CONFIG['page_size']
+        page = max(1, page)
+        where, params = self._where(gym_id, platform, post_type, status, since, until)
+        order = "DESC" if newest_first else "ASC"
+        
+        with self._lock:
+            total = self._conn.execute(f"SELECT COUNT(*) FROM posts{where}", params).fetchone()[0]
+            rows = self._conn.execute(
+                f"SELECT payload, status, published_at FROM posts{where} "
+                f"ORDER BY generated_at {order}, id {order} LIMIT ? OFFSET ?",
+                params + [page_size, (page - 1) * page_size]
+            ).fetchall()
+        
+        return {
+            'items': [self._load(row) for row in rows],
+            'page': page,
+            'page_size': page_size,
+            'total': total,
+            'pages': (total + page_size - 1) // page_size
+        }
+    
+    def count(self, **filters):
+        where, params = self._where(**filters)
+        with self._lock:
+            return self._conn.execute(f"SELECT COUNT(*) FROM posts{where}", params).fetchone()[0]
+    
+    def stats(self):
+        with self._lock:
+            by_status = dict(self._conn.execute("SELECT status, COUNT(*) FROM posts GROUP BY status"))
+            by_platform = dict(self._conn.execute("SELECT platform, COUNT(*) FROM posts GROUP BY platform"))
+        return {'total': sum(by_status.values()), 'by_status': by_status, 'by_platform': by_platform}
+    
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+_content_repository = None
+_content_repository_lock = threading.Lock()
+
+def get_content_repository():
+    """Dépôt partagé par le processus (CLI, dashboard, scheduler)"""
+    global _content_repository
+    with _content_repository_lock:
+        if _content_repository is None:
+            _content_repository = ContentRepository()
+        return _content_repository
@@ -0,0 +1,191 @@
+"""
+Apollo Content Store
+Journal JSONL en ajout seul : écritures groupées, segments tournants (taille/âge)
+compressés en gzip, lecture en flux filtrable sans tout charger en mémoire
+"""
+
+import atexit
+import glob
+import gzip
+import json
+import os
+import threading
+import time
+from datetime import datetime, timedelta
+
+from config import CONTENT_LOG_CONFIG
+
+SEGMENT_TIME_FORMAT = '%Y%m%dT%H%M%S%f'
+
+class ContentLog:
+    """
+    Journal <dossier>/<nom>-<début>.jsonl : le segment actif reçoit les ajouts,
+    les segments fermés sont compressés (.jsonl.gz) et restent lisibles
+    """
+    
+    def __init__(self, name='generated', directory=None, max_segment_bytes=None, max_segment_age=None,
+                 compress=None, buffer_records=None, flush_interval=None):
+        self.name = name
+        self.directory = directory or CONTENT_LOG_CONFIG['directory']
+        self.max_segment_bytes = max_segment_bytes or CONTENT_LOG_CONFIG['max_segment_bytes']
+        self.max_segment_age = max_segment_age or CONTENT_LOG_CONFIG['max_segment_age']
+        self.compress = CONTENT_LOG_CONFIG['compress'] if compress is None else compress
+        self.buffer_records = buffer_records or CONTENT_LOG_CONFIG['buffer_records']
+        self.flush_interval = CONTENT_LOG_CONFIG['flush_interval'] if flush_interval is None else flush_interval
+        
+        os.makedirs(self.directory, exist_ok=True)
+        self._lock = threading.RLock()
+        self._buffer = []
+        self._last_flush = time.monotonic()
+        self._file = None
+        self._segment_path = None
+        self._segment_started = None
+        self.appended = 0
+        self.rotations = 0
+        
+        # Reprise du dernier segment non compressé (redémarrage)
+        active = sorted(p for p in self._segments() if p.endswith('.jsonl'))
+        if active:
+            self._open_segment(active[-1])
+        atexit.register(self.close)
+    
+    def _segments(self):
+        """Segments du journal, du plus ancien au plus récent (le nom porte la date de début)"""
+        pattern = os.path.join(self.directory, f"{glob.escape(self.name)}-*.jsonl*")
+        return sorted(p for p in glob.glob(pattern) if p.endswith(('.jsonl', '.jsonl.gz')))
+    
+    def _open_segment(self, path=None):
+        if path is None:
+            started = datetime.now()
+            path = os.path.join(self.directory, f"{self.name}-{started.strftime(SEGMENT_TIME_FORMAT)}.jsonl")
+            while os.path.exists(path) or os.path.exists(f"{path}.gz"):
+                # Deux rotations dans la même microseconde
+                started += timedelta(microseconds=1)
+                path = os.path.join(self.directory, f"{self.name}-{started.strftime(SEGMENT_TIME_FORMAT)}.jsonl")
+        else:
+            stamp = os.path.basename(path)[len(self.name) + 1:].split('.')[0]
+            started = datetime.strptime(stamp, SEGMENT_TIME_FORMAT)
+        self._file = open(path, 'a', encoding='utf-8')
+        self._segment_path = path
+        self._segment_started = started.timestamp()
+    
+    def _rotate(self):
+        """Ferme le segment actif (compressé si demandé) ; le suivant s'ouvre au prochain ajout"""
+        path = self._segment_path
+        self._file.close()
+        self._file = None
+        self._segment_path = None
+        self.rotations += 1
+        if self.compress:
+            with open(path, 'rb') as source, gzip.open(f"{path}.gz.tmp", 'wb') as target:
+                while True:
+                    chunk = source.read(1024 * 1024)
+                    if not chunk:
+                        break
+                    target.write(chunk)
+            os.replace(f"{path}.gz.tmp", f"{path}.gz")
+            os.remove(path)
+    
+    def append(self, record):
+        """Ajoute une entrée (écrite par lot : flush() pour forcer l'écriture)"""
+        line = json.dumps(record, ensure_ascii=False, default=str) + '\n'
+        with self._lock:
+            self._buffer.append(line)
+            self.appended += 1
+            if (len(self._buffer) >= self.buffer_records
+                    or time.monotonic() - self._last_flush >= self.flush_interval):
+                self._flush_locked()
+    
+    def extend(self, records):
+        for record in records:
+            self.append(record)
+    
+    def flush(self):
+        """Écrit les entrées en attente et renvoie le chemin du segment actif"""
+        with self._lock:
+            self._flush_locked()
+            return self._segment_path
+    
+    def _flush_locked(self):
+        self._last_flush = time.monotonic()
+        if not self._buffer:
+            return
+        
+        if self._file is not None and (
+                self._file.tell() >= self.max_segment_bytes
+                or time.time() - self._segment_started >= self.max_segment_age):
+            self._rotate()
+        if self._file is None:
+            self._open_segment()
+        
+        self._file.write(''.join(self._buffer))
+        self._file.flush()
+        self._buffer.clear()
+    
+    def close(self):
+        with self._lock:
+            self._flush_locked()
+            if self._file is not None:
+                self._file.close()
+                self._file = None
+    
+    def iter_records(self, gym=None, platform=None, post_type=None, since=None, until=None):
+        """
+        Parcourt le journal en flux, du plus ancien au plus récent.
+        gym : ID ou nom de salle ; since/until : datetime ou chaîne ISO.
+        Une ligne tronquée (arrêt brutal) est ignorée.
+        """
+        self.flush()
+        since = since.isoformat() if isinstance(since, datetime) else since
+        until = until.isoformat() if isinstance(until, datetime) else until
+        
+        for path in self._segments():
+            opener = gzip.open if path.endswith('.gz') else open
+            try:
+                handle = opener(path, 'rt', encoding='utf-8')
+            except FileNotFoundError:
+                continue  # compressé entre-temps par une rotation
+            with handle:
+                for line in handle:
+                    try:
+                        record = json.loads(line)
+                    except json.JSONDecodeError:
+                        continue
+                    if platform and record.get('platform') != platform:
+                        continue
+                    if post_type and record.get('type') != post_type:
+                        continue
+                    if gym is not None and not _gym_matches(record, gym):
+                        continue
+                    timestamp = record.get('generated_at') or record.get('timestamp') or ''
+                    if (since and timestamp < since) or (until and timestamp >= until):
+                        continue
+                    yield record
+    
+    def stats(self):
+        with self._lock:
+            segments = self._segments()
+            return {
+                'segments': len(segments),
+                'bytes': sum(os.path.getsize(p) for p in segments if os.path.exists(p)),
+                'appended': self.appended,
+                'pending': len(self._buffer),
+                'rotations': self.rotations
+            }
+
+def _gym_matches(record, gym):
+    """La salle d'une entrée : dict de post, nom (log des publications) ou gym_id"""
+    value = record.get('gym')
+    if isinstance(value, dict):
+        return gym in (value.get('id'), value.get('name'))
+    return gym in (value, record.get('gym_id'))
+
+_content_logs = {}
+_content_logs_lock = threading.Lock()
+
+def get_content_log(name='generated'):
+    """Journal partagé par nom : un seul écrivain par fichier dans le processus"""
+    with _content_logs_lock:
+        if name not in _content_logs:
+            _content_logs[name] = ContentLog(name)
+        return _content_logs[name]
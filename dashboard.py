@@ -11,8 +11,11 @@ from datetime import datetime, timedelta
 import json
 import time
 
-from config import APOLLO_GYMS, APOLLO_BRAND
+from config import APOLLO_BRAND
 from content_generator import ApolloContentGenerator
+from content_repository import get_content_repository
+from gym_registry import get_gym_registry
+from metrics import GENERATION_METRICS
 from scheduler import ApolloScheduler
 from analytics import ApolloAnalytics
 
@@ -71,15 +74,23 @@ st.markdown(f"""
 </style>
 """, unsafe_allow_html=True)
 
+@st.cache_resource
+def get_dashboard_services():
+    """
+    Générateur, scheduler et analytics créés une seule fois par processus Streamlit :
+    pas de nouveaux threads ni de disjoncteurs remis à zéro à chaque rerun
+    """
+    content_generator = ApolloContentGenerator()
+    scheduler = ApolloScheduler(content_generator=content_generator)
+    return content_generator, scheduler, ApolloAnalytics()
+
 class ApolloDashboard:
     def __init__(self):
-        self.content_generator = ApolloContentGenerator()
-        self.scheduler = ApolloScheduler()
-        self.analytics = ApolloAnalytics()
+        self.content_generator, self.scheduler, self.analytics = get_dashboard_services()
+        # Posts générés persistés (partagés avec la CLI et le scheduler)
+        self.content_repository = get_content_repository()
         
         # Initialisation du state
-        if 'generated_content' not in st.session_state:
-            st.session_state.generated_content = []
         if 'scheduled_posts' not in st.session_state:
             st.session_state.scheduled_posts = []
     
@@ -112,11 +123,11 @@ class ApolloDashboard:
             st.markdown("### Sélection de salle")
             selected_gym = st.selectbox(
                 "Choisir une salle",
-                options=[gym['name'] for gym in APOLLO_GYMS],
+                options=[gym.name for gym in get_gym_registry()],
                 index=0
             )
             
-            gym_id = next(gym['id'] for gym in APOLLO_GYMS if gym['name'] == selected_gym)
+            gym_id = get_gym_registry().by_name(selected_gym).id
             
             # Période d'analyse
             st.markdown("### Période d'analyse")
@@ -280,19 +291,34 @@ class ApolloDashboard:
                     placeholder="Ex: Crée un post sur les bienfaits de la boxe pour les femmes..."
                 )
                 
+                bypass_cache = st.checkbox("Ignorer le cache (forcer une nouvelle génération)")
+                
                 submitted = st.form_submit_button("🚀 Générer le contenu")
                 
                 if submitted:
-                    with st.spinner("Génération du contenu IA en cours..."):
-                        content = self.content_generator.generate_post_content(
-                            gym_id=gym_id,
-                            platform=platform,
-                            post_type=post_type,
-                            custom_prompt=custom_prompt if custom_prompt else None
-                        )
+                    # Affichage progressif du texte pendant la génération
+                    preview = st.empty()
+                    preview.info("Génération du contenu IA en cours...")
+                    streamed_text = ""
+                    content = None
+                    
+                    for event in self.content_generator.generate_post_content_stream(
+                        gym_id=gym_id,
+                        platform=platform,
+                        post_type=post_type,
+                        custom_prompt=custom_prompt if custom_prompt else None,
+                        bypass_cache=bypass_cache
+                    ):
+                        if event.get('done'):
+                            content = event['post']
+                        else:
+                            streamed_text += event['delta']
+                            preview.markdown(streamed_text + "▌")
+                    
+                    preview.empty()
                     
                     if content:
-                        st.session_state.generated_content.append(content)
+                        self.content_repository.add(content)
                         st.success("✅ Contenu généré avec succès!")
         
         with col2:
@@ -301,26 +327,44 @@ class ApolloDashboard:
             count = st.number_input("Nombre de posts", 1, 50, 5)
             
             if st.button("📦 Générer un lot"):
-                with st.spinner(f"Génération de {count} posts..."):
-                    batch = self.content_generator.generate_batch_content(
-                        gym_ids=[gym_id],
-                        count=count
-                    )
+                progress = st.progress(0.0, text=f"Génération de {count} posts...")
+                errors = []
+                done = []
+                
+                def on_result(result):
+                    done.append(result)
+                    if result['error']:
+                        errors.append(result)
+                    progress.progress(len(done) / count, text=f"{len(done)}/{count} posts générés")
                 
-                st.session_state.generated_content.extend(batch)
+                batch = self.content_generator.generate_batch_content(
+                    gym_ids=[gym_id],
+                    count=count,
+                    on_result=on_result
+                )
+                
+                self.content_repository.add_many(batch)
                 st.success(f"✅ {len(batch)} posts générés!")
-        
-        # Affichage du contenu généré
-        if st.session_state.generated_content:
+                for result in sorted(errors, key=lambda r: r['index']):
+                    request = result['request']
+                    st.error(f"❌ Post {result['index'] + 1} ({request['platform']} - "
+                             f"{request['post_type']}): {result['error']}")
+        
+        # Affichage du contenu généré (paginé depuis le dépôt)
+        total = self.content_repository.count(gym_id=gym_id)
+        if total:
             st.markdown("### 📝 Contenu généré récemment")
+            pages = (total + 4) // 5
+            page = st.number_input(f"Page (sur {pages})", 1, pages, 1) if pages > 1 else 1
+            recent = self.content_repository.query(gym_id=gym_id, page=page, page_size=5)
             
-            for i, content in enumerate(reversed(st.session_state.generated_content[-5:])):
+            for content in recent['items']:
                 with st.expander(f"{content['platform'].capitalize()} - {content['type']} - {content['gym']['name']}"):
                     col1, col2 = st.columns([3, 1])
                     
                     with col1:
                         st.markdown("**Contenu:**")
-                        st.text_area("", content['content'], height=150, key=f"content_{i}", disabled=True)
+                        st.text_area("", content['content'], height=150, key=f"content_{content['post_id']}", disabled=True)
                     
                     with col2:
                         st.markdown("**Détails:**")
@@ -328,7 +372,7 @@ class ApolloDashboard:
                         st.write(f"🏷️ Hashtags: {len(content['hashtags'])}")
                         st.write(f"🖼️ Image: {content['image_suggestion'][:30]}...")
                         
-                        if st.button(f"📅 Programmer", key=f"schedule_{i}"):
+                        if st.button(f"📅 Programmer", key=f"schedule_{content['post_id']}"):
                             # Redirection vers scheduler
                             st.info("Fonctionnalité de programmation disponible dans l'onglet Scheduler")
     
@@ -530,6 +574,61 @@ class ApolloDashboard:
         
         with col3:
             st.metric("Analytics", "✅ Actif", "Real-time")
+        
+        # Disjoncteurs et hedging des providers IA
+        resilience = self.content_generator.get_resilience_stats()
+        providers = [p for p in (resilience['primary'], resilience['hedge_provider']) if p in resilience['breakers']]
+        if providers:
+            cols = st.columns(len(providers) + 1)
+            for col, provider in zip(cols, providers):
+                breaker = resilience['breakers'][provider]
+                p95 = resilience['latency_p95'][provider]
+                with col:
+                    st.metric(
+                        f"Disjoncteur {provider}",
+                        "✅ Fermé" if breaker['state'] == 'closed' else f"⛔ {breaker['state']}",
+                        f"p95 {p95:.1f}s" if p95 is not None else None
+                    )
+            with cols[-1]:
+                hedges = resilience['hedges']
+                st.metric("Requêtes couvertes", f"{hedges['won']}/{hedges['launched']} gagnées",
+                          f"{hedges['failovers']} bascules", delta_color="off")
+        
+        # Temps et tokens de génération (agrégés depuis le lancement)
+        st.markdown("### ⏱️ Métriques de Génération")
+        snapshot = GENERATION_METRICS.snapshot()
+        counters = snapshot['counters']
+        
+        col1, col2, col3, col4 = st.columns(4)
+        with col1:
+            st.metric("Posts générés", counters.get('generations', 0))
+        with col2:
+            st.metric("Depuis le cache", counters.get('cache_hits', 0))
+        with col3:
+            st.metric("Templates de secours", counters.get('fallbacks', 0))
+        with col4:
+            st.metric("Tokens générés", counters.get('completion_tokens', 0))
+        
+        rows = GENERATION_METRICS.summary_rows()
+        if rows:
+            st.dataframe(
+                pd.DataFrame(rows, columns=['Mesure', 'Nb', 'Moyenne', 'p50', 'p95', 'Max', 'Unité']),
+                use_container_width=True
+            )
+            
+            latency = snapshot['histograms']['total_ms']['buckets']
+            fig = px.bar(x=list(latency), y=list(latency.values()),
+                         labels={'x': 'Durée totale ≤ (ms)', 'y': 'Posts'}, title="Distribution des temps de génération")
+            st.plotly_chart(fig, use_container_width=True)
+            
+            st.download_button(
+                "📥 Exporter les métriques (JSON)",
+                data=json.dumps(snapshot, ensure_ascii=False, indent=2),
+                file_name=f"generation_metrics_{datetime.now().strftime('%Y%m%d_%H%M%S')}.json",
+                mime="application/json"
+            )
+        else:
+            st.info("Aucune génération depuis le lancement du dashboard")
 
 def main():
     """Fonction principale de l'application"""
@@ -0,0 +1,181 @@
+"""
+Apollo Gym Registry
+Registre immuable des salles : accès O(1) par ID, index secondaires
+(arrondissement, spécialité, coach), chargé depuis un fichier externe
+"""
+
+import json
+import os
+from types import MappingProxyType
+
+from config import APOLLO_GYMS, GYM_REGISTRY_CONFIG
+
+GYM_FIELDS = (
+    'id', 'name', 'address', 'arrondissement', 'phone', 'email', 'specialties',
+    'coaches', 'capacity', 'opening_hours', 'instagram_handle', 'hashtags'
+)
+
+GYM_DEFAULTS = {
+    'address': '', 'arrondissement': '', 'phone': '', 'email': '', 'specialties': [],
+    'coaches': [], 'capacity': 0, 'opening_hours': {}, 'instagram_handle': '', 'hashtags': []
+}
+
+class UnknownGymError(KeyError):
+    """Salle absente du registre"""
+
+def _freeze(value):
+    if isinstance(value, dict):
+        return MappingProxyType({key: _freeze(item) for key, item in value.items()})
+    if isinstance(value, (list, tuple)):
+        return tuple(_freeze(item) for item in value)
+    return value
+
+def _thaw(value):
+    if isinstance(value, MappingProxyType):
+        return {key: _thaw(item) for key, item in value.items()}
+    if isinstance(value, tuple):
+        return [_thaw(item) for item in value]
+    return value
+
+class GymRecord:
+    """Salle en lecture seule ; s'utilise comme les dicts de config (gym['name'])"""
+    
+    __slots__ = GYM_FIELDS
+    
+    def __init__(self, data):
+        if 'id' not in data or 'name' not in data:
+            raise ValueError(f"Salle invalide (id et name obligatoires): {data}")
+        for field in GYM_FIELDS:
+            value = data.get(field, GYM_DEFAULTS.get(field))
+            object.__setattr__(self, field, int(value) if field == 'id' else _freeze(value))
+    
+    def __setattr__(self, name, value):
+        raise AttributeError("GymRecord est immuable")
+    
+    def __delattr__(self, name):
+        raise AttributeError("GymRecord est immuable")
+    
+    def __getitem__(self, key):
+        if key not in GYM_FIELDS:
+            raise KeyError(key)
+        return getattr(self, key)
+    
+    def get(self, key, default=None):
+        return getattr(self, key) if key in GYM_FIELDS else default
+    
+    def keys(self):
+        return GYM_FIELDS
+    
+    def to_dict(self):
+        """Copie modifiable et sérialisable en JSON"""
+        return {field: _thaw(getattr(self, field)) for field in GYM_FIELDS}
+    
+    def __reduce__(self):
+        # Les MappingProxyType ne se picklent pas : on repasse par le dict
+        return GymRecord, (self.to_dict(),)
+    
+    def __eq__(self, other):
+        return isinstance(other, GymRecord) and self.to_dict() == other.to_dict()
+    
+    def __hash__(self):
+        return hash(self.id)
+    
+    def __repr__(self):
+        return f"GymRecord(id={self.id}, name={self.name!r})"
+
+class GymRegistry:
+    """Salles indexées par ID, nom, arrondissement, spécialité et coach (recherches insensibles à la casse)"""
+    
+    __slots__ = ('source', '_by_id', '_by_name', '_by_arrondissement', '_by_specialty', '_by_coach')
+    
+    def __init__(self, gyms, source=None):
+        by_id = {}
+        for gym in gyms:
+            record = gym if isinstance(gym, GymRecord) else GymRecord(gym)
+            if record.id in by_id:
+                raise ValueError(f"ID de salle en double: {record.id}")
+            by_id[record.id] = record
+        
+        by_name, by_arrondissement, by_specialty, by_coach = {}, {}, {}, {}
+        for record in by_id.values():
+            by_name[record.name.lower()] = record
+            by_arrondissement.setdefault(record.arrondissement.lower(), []).append(record)
+            for specialty in record.specialties:
+                by_specialty.setdefault(specialty.lower(), []).append(record)
+            for coach in record.coaches:
+                by_coach.setdefault(coach.lower(), []).append(record)
+        
+        object.__setattr__(self, 'source', source)
+        object.__setattr__(self, '_by_id', MappingProxyType(by_id))
+        object.__setattr__(self, '_by_name', MappingProxyType(by_name))
+        for name, index in (('_by_arrondissement', by_arrondissement), ('_by_specialty', by_specialty),
+                            ('_by_coach', by_coach)):
+            object.__setattr__(self, name, MappingProxyType({key: tuple(gyms) for key, gyms in index.items()}))
+    
+    def __setattr__(self, name, value):
+        raise AttributeError("GymRegistry est immuable")
+    
+    @classmethod
+    def from_file(cls, path):
+        """Fichier JSON : liste de salles (format APOLLO_GYMS) ou {'gyms': [...]}"""
+        with open(path, 'r', encoding='utf-8') as f:
+            data = json.load(f)
+        if isinstance(data, dict):
+            data = data.get('gyms', [])
+        return cls(data, source=path)
+    
+    @classmethod
+    def load(cls, path=None):
+        """Fichier externe s'il existe (APOLLO_GYMS_FILE), sinon les salles de config.py"""
+        path = path or GYM_REGISTRY_CONFIG['gyms_file']
+        if path and os.path.exists(path):
+            return cls.from_file(path)
+        return cls(APOLLO_GYMS, source='config')
+    
+    def get(self, gym_id):
+        """Salle par ID ; UnknownGymError si elle n'existe pas"""
+        try:
+            return self._by_id[int(gym_id)]
+        except (KeyError, TypeError, ValueError):
+            raise UnknownGymError(f"Salle inconnue: {gym_id!r}") from None
+    
+    __getitem__ = get
+    
+    def by_name(self, name):
+        try:
+            return self._by_name[name.lower()]
+        except (KeyError, AttributeError):
+            raise UnknownGymError(f"Salle inconnue: {name!r}") from None
+    
+    def by_arrondissement(self, arrondissement):
+        return self._by_arrondissement.get(arrondissement.lower(), ())
+    
+    def by_specialty(self, specialty):
+        return self._by_specialty.get(specialty.lower(), ())
+    
+    def by_coach(self, coach):
+        return self._by_coach.get(coach.lower(), ())
+    
+    def ids(self):
+        return tuple(self._by_id)
+    
+    def __contains__(self, gym_id):
+        try:
+            return int(gym_id) in self._by_id
+        except (TypeError, ValueError):
+            return False
+    
+    def __iter__(self):
+        return iter(self._by_id.values())
+    
+    def __len__(self):
+        return len(self._by_id)
+
+_gym_registry = None
+
+def get_gym_registry():
+    """Registre partagé, chargé au premier accès"""
+    global _gym_registry
+    if _gym_registry is None:
+        _gym_registry = GymRegistry.load()
+    return _gym_registry
@@ -0,0 +1,118 @@
+"""
+Apollo Hashtag Engine
+Pools de hashtags pré-calculés par (salle, type de post, plateforme) :
+tirage pondéré fait une fois au chargement (ou au premier usage d'une combinaison),
+jeux servis à tour de rôle
+"""
+
+import hashlib
+import itertools
+import json
+import random
+import threading
+
+from config import CONTENT_CONFIG, HASHTAG_CONFIG
+
+class HashtagEngine:
+    """Renvoie des tuples pré-calculés : aucun tri ni découpage de liste à chaque post"""
+    
+    def __init__(self, gyms, config=None, platforms=None):
+        self.config = config or HASHTAG_CONFIG
+        self.platforms = platforms or CONTENT_CONFIG['platforms']
+        self._variants = {}    # (gym_id, post_type, plateforme) → tuple de jeux de hashtags
+        self._rotation = {}    # même clé → itertools.count (next() atomique sous le GIL)
+        self._signatures = {}  # même clé → empreinte des entrées ayant produit les jeux
+        self._lock = threading.Lock()
+        self.refresh(gyms)
+    
+    def _limit(self, platform):
+        return self.platforms.get(platform, {}).get('optimal_hashtags', self.config['default_limit'])
+    
+    def _candidates(self, gym, post_type, platform):
+        """Hashtags candidats (dédoublonnés, ordre d'origine) avec leur poids"""
+        weights = self.config['weights']
+        sources = [('gym', gym['hashtags']), ('brand', self.config['brand']),
+                   ('post_type', self.config['post_types'].get(post_type, ())),
+                   ('platform', self.config['platforms'].get(platform, ()))]
+        sources.extend(('specialty', self.config['specialties'].get(s, ())) for s in gym['specialties'])
+        
+        candidates = {}
+        for origin, tags in sources:
+            for tag in tags:
+                candidates[tag] = max(candidates.get(tag, 0.0), weights[origin])
+        return candidates
+    
+    def _build_variants(self, key, gym, post_type, platform):
+        """Jeux de hashtags tirés sans remise par poids (clés aléatoires u^(1/poids))"""
+        limit = self._limit(platform)
+        candidates = self._candidates(gym, post_type, platform)
+        pinned = tuple(dict.fromkeys(tuple(gym['hashtags'][:1]) + tuple(self.config['brand'][:1])))
+        pinned = pinned[:min(self.config['pinned'], limit)]
+        others = [(tag, weight) for tag, weight in candidates.items() if tag not in pinned]
+        
+        # Graine stable : mêmes jeux d'un redémarrage à l'autre
+        rng = random.Random(str(key))
+        variants = []
+        for _ in range(max(1, self.config['variants'])):
+            ranked = sorted(others, key=lambda item: rng.random() ** (1.0 / item[1]), reverse=True)
+            variant = pinned + tuple(tag for tag, _ in ranked[:limit - len(pinned)])
+            if variant not in variants:
+                variants.append(variant)
+        return tuple(variants)
+    
+    def _signature(self, gym, post_type, platform):
+        payload = json.dumps([
+            list(gym['hashtags']), list(gym['specialties']), self._limit(platform),
+            self.config['brand'], self.config['post_types'].get(post_type), self.config['platforms'].get(platform),
+            {s: self.config['specialties'].get(s) for s in gym['specialties']},
+            self.config['weights'], self.config['pinned'], self.config['variants']
+        ], sort_keys=True, ensure_ascii=False)
+        return hashlib.sha1(payload.encode('utf-8')).hexdigest()
+    
+    def refresh(self, gyms):
+        """
+        (Re)calcule les pools après un changement de salles ou de config.
+        Seules les combinaisons dont les entrées ont changé sont recalculées ;
+        renvoie leur nombre.
+        """
+        rebuilt = 0
+        current = set()
+        with self._lock:
+            for gym in gyms:
+                for post_type, platform in itertools.product(CONTENT_CONFIG['post_types'], self.platforms):
+                    key = (gym['id'], post_type, platform)
+                    current.add(key)
+                    rebuilt += self._build(key, gym, post_type, platform)
+            
+            for key in set(self._variants) - current:
+                del self._variants[key], self._rotation[key], self._signatures[key]
+        return rebuilt
+    
+    def _build(self, key, gym, post_type, platform):
+        """Calcule les jeux d'une combinaison si ses entrées ont changé (renvoie 1 si recalculée)"""
+        signature = self._signature(gym, post_type, platform)
+        if self._signatures.get(key) == signature:
+            return 0
+        self._variants[key] = self._build_variants(key, gym, post_type, platform)
+        self._rotation.setdefault(key, itertools.count())
+        self._signatures[key] = signature
+        return 1
+    
+    def get(self, gym, post_type, platform):
+        """
+        Prochain jeu de hashtags (tuple pré-calculé partagé, sans copie).
+        Une combinaison absente des pools (nouvelle salle, type ou plateforme) est calculée au premier appel.
+        """
+        key = (gym['id'], post_type, platform)
+        variants, rotation = self._variants.get(key), self._rotation.get(key)
+        if variants is None or rotation is None:
+            with self._lock:
+                self._build(key, gym, post_type, platform)
+                variants, rotation = self._variants[key], self._rotation[key]
+        return variants[next(rotation) % len(variants)]
+    
+    def stats(self):
+        return {
+            'combinations': len(self._variants),
+            'variants': sum(len(v) for v in self._variants.values())
+        }
@@ -0,0 +1,190 @@
+"""
+Apollo Image Cache
+Concept DALL·E → image locale : stockage adressé par contenu, index SQLite,
+téléchargements asynchrones dédupliqués en vol
+"""
+
+import hashlib
+import io
+import json
+import os
+import sqlite3
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+
+import requests
+from PIL import Image
+
+from asset_dedup import get_asset_index
+from config import IMAGE_CACHE_CONFIG
+
+CONTENT_TYPE_EXTENSIONS = {
+    'image/png': 'png',
+    'image/jpeg': 'jpg',
+    'image/webp': 'webp'
+}
+
+class BlobStore:
+    """Fichiers rangés par empreinte SHA-256 : <racine>/<h[:2]>/<h>.<ext>"""
+    
+    def __init__(self, root=None):
+        self.root = root or IMAGE_CACHE_CONFIG['blob_dir']
+    
+    def path_for(self, digest, extension):
+        return os.path.join(self.root, digest[:2], f"{digest}.{extension}")
+    
+    def put(self, data, extension='png'):
+        """Stocke les octets (une seule copie par contenu) et renvoie (empreinte, chemin)"""
+        digest = hashlib.sha256(data).hexdigest()
+        path = self.path_for(digest, extension)
+        if not os.path.exists(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            tmp_path = f"{path}.{threading.get_ident()}.tmp"
+            with open(tmp_path, 'wb') as f:
+                f.write(data)
+            os.replace(tmp_path, path)
+        return digest, path
+
+class ImageCache:
+    """Index concept → blob ; une même image n'est générée et téléchargée qu'une fois"""
+    
+    def __init__(self, session=None, blob_store=None, index_path=None, max_workers=None):
+        self.session = session or requests.Session()
+        self.blobs = blob_store or BlobStore()
+        self.index_path = index_path or IMAGE_CACHE_CONFIG['index_path']
+        self.timeout = IMAGE_CACHE_CONFIG['download_timeout']
+        
+        self.hits = 0
+        self.misses = 0
+        self.deduplicated = 0
+        
+        directory = os.path.dirname(self.index_path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(self.index_path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("""
+            CREATE TABLE IF NOT EXISTS concepts (
+                key TEXT PRIMARY KEY,
+                digest TEXT NOT NULL,
+                path TEXT NOT NULL,
+                prompt TEXT,
+                metadata TEXT,
+                created_at REAL NOT NULL
+            )
+        """)
+        self._conn.commit()
+        
+        # Requêtes en cours : clé → Future partagée par tous les demandeurs
+        self._in_flight = {}
+        self._executor = ThreadPoolExecutor(
+            max_workers=max_workers or IMAGE_CACHE_CONFIG['download_workers'],
+            thread_name_prefix='apollo-images'
+        )
+    
+    @staticmethod
+    def make_key(prompt, style=None, size=None, model=None):
+        """Empreinte du concept : même prompt/style/taille/modèle → même image"""
+        payload = json.dumps(
+            {'prompt': prompt, 'style': style, 'size': size, 'model': model},
+            sort_keys=True, ensure_ascii=False
+        )
+        return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+    
+    def lookup(self, key):
+        """Chemin local de l'image du concept, ou None"""
+        with self._lock:
+            row = self._conn.execute("SELECT path FROM concepts WHERE key = ?", (key,)).fetchone()
+        if row and os.path.exists(row[0]):
+            return row[0]
+        return None
+    
+    def get_or_create(self, key, generate_url, prompt=None, metadata=None):
+        """
+        Future du chemin local de l'image.
+        generate_url : appel (DALL·E) renvoyant l'URL de l'image, fait seulement en cas d'absence.
+        Les demandes simultanées du même concept partagent la même génération/téléchargement.
+        """
+        path = self.lookup(key)
+        if path:
+            self.hits += 1
+            future = Future()
+            future.set_result(path)
+            return future
+        
+        with self._lock:
+            future = self._in_flight.get(key)
+            if future:
+                self.deduplicated += 1
+                return future
+            
+            self.misses += 1
+            future = self._executor.submit(self._create, key, generate_url, prompt, metadata)
+            self._in_flight[key] = future
+        
+        future.add_done_callback(lambda _: self._forget(key))
+        return future
+    
+    def fetch(self, key, url, prompt=None, metadata=None):
+        """Télécharge une URL déjà connue (même déduplication que get_or_create)"""
+        return self.get_or_create(key, lambda: url, prompt, metadata)
+    
+    def _forget(self, key):
+        with self._lock:
+            self._in_flight.pop(key, None)
+    
+    def _create(self, key, generate_url, prompt, metadata):
+        url = generate_url()
+        if not url:
+            raise RuntimeError("Aucune URL d'image renvoyée")
+        
+        response = self.session.get(url, timeout=self.timeout)
+        response.raise_for_status()
+        content_type = response.headers.get('Content-Type', '').split(';')[0].strip()
+        extension = CONTENT_TYPE_EXTENSIONS.get(content_type, 'png')
+        
+        metadata = dict(metadata or {}, source_url=url, bytes=len(response.content))
+        
+        # Image quasi identique à un asset existant : on pointe dessus au lieu de stocker une copie
+        index = get_asset_index()
+        image = Image.open(io.BytesIO(response.content)) if index else None
+        existing = index.find(image) if index else None
+        if existing:
+            index.record_duplicate(existing, 'dalle')
+            digest, path = hashlib.sha256(response.content).hexdigest(), existing
+            metadata['duplicate_of'] = existing
+        else:
+            digest, path = self.blobs.put(response.content, extension)
+            if index:
+                index.add(path, image, kind='dalle')
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO concepts (key, digest, path, prompt, metadata, created_at) "
+                "VALUES (?, ?, ?, ?, ?, ?)",
+                (key, digest, path, prompt, json.dumps(metadata, ensure_ascii=False), time.time())
+            )
+            self._conn.commit()
+        return path
+    
+    def stats(self):
+        with self._lock:
+            concepts, blobs = self._conn.execute(
+                "SELECT COUNT(*), COUNT(DISTINCT digest) FROM concepts"
+            ).fetchone()
+            in_flight = len(self._in_flight)
+        return {
+            'concepts': concepts,
+            'blobs': blobs,
+            'in_flight': in_flight,
+            'hits': self.hits,
+            'misses': self.misses,
+            'deduplicated': self.deduplicated
+        }
+    
+    def close(self):
+        self._executor.shutdown(wait=True)
+        with self._lock:
+            self._conn.close()
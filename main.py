@@ -17,15 +17,19 @@ import time
 # Initialize colorama for cross-platform colored output
 init()
 
-from config import APOLLO_GYMS, OPENAI_CONFIG
+from asset_dedup import get_asset_index
+from config import OPENAI_CONFIG
+from content_repository import get_content_repository
 from content_generator import ApolloContentGenerator
+from gym_registry import get_gym_registry
+from metrics import GENERATION_METRICS, PUBLISH_METRICS
 from scheduler import ApolloScheduler
 from analytics import ApolloAnalytics
 
 class ApolloMainInterface:
     def __init__(self):
         self.content_generator = ApolloContentGenerator()
-        self.scheduler = ApolloScheduler()
+        self.scheduler = ApolloScheduler(content_generator=self.content_generator)
         self.analytics = ApolloAnalytics()
         
     def print_banner(self):
@@ -92,15 +96,16 @@ class ApolloMainInterface:
         print(f"\n{Fore.CYAN}📝 Génération d'un post personnalisé{Style.RESET_ALL}")
         
         # Sélection de salle
+        gyms = list(get_gym_registry())
         print("\nSalles disponibles:")
-        for i, gym in enumerate(APOLLO_GYMS, 1):
+        for i, gym in enumerate(gyms, 1):
             print(f"{i}. {gym['name']} - {gym['address']}")
         
         try:
-            gym_choice = int(input("Choisir une salle (1-4): ")) - 1
-            if gym_choice < 0 or gym_choice >= len(APOLLO_GYMS):
+            gym_choice = int(input(f"Choisir une salle (1-{len(gyms)}): ")) - 1
+            if gym_choice < 0 or gym_choice >= len(gyms):
                 raise ValueError
-            gym_id = APOLLO_GYMS[gym_choice]['id']
+            gym_id = gyms[gym_choice]['id']
         except (ValueError, IndexError):
             print(f"{Fore.RED}❌ Choix de salle invalide{Style.RESET_ALL}")
             return
@@ -127,17 +132,27 @@ class ApolloMainInterface:
         # Génération
         print(f"\n{Fore.YELLOW}🤖 Génération en cours...{Style.RESET_ALL}")
         
-        with tqdm(total=100, desc="Génération IA", bar_format="{l_bar}{bar}| {n_fmt}/{total_fmt}") as pbar:
-            for i in range(100):
-                time.sleep(0.02)  # Simulation du temps de traitement
-                pbar.update(1)
+        print(f"{Fore.CYAN}(Ctrl+C pour annuler){Style.RESET_ALL}\n")
         
-        content = self.content_generator.generate_post_content(
+        # Affichage du texte au fil de la génération
+        stream = self.content_generator.generate_post_content_stream(
             gym_id=gym_id,
             platform=platform,
             post_type=post_type,
             custom_prompt=custom_prompt if custom_prompt else None
         )
+        content = None
+        try:
+            for event in stream:
+                if event.get('done'):
+                    content = event['post']
+                else:
+                    print(event['delta'], end='', flush=True)
+        except KeyboardInterrupt:
+            stream.close()
+            print(f"\n{Fore.YELLOW}⏹️ Génération annulée{Style.RESET_ALL}")
+            return
+        print()
         
         if content:
             print(f"\n{Fore.GREEN}✅ Contenu généré avec succès!{Style.RESET_ALL}")
@@ -146,6 +161,13 @@ class ApolloMainInterface:
             print(f"{Fore.YELLOW}📱 Plateforme:{Style.RESET_ALL} {content['platform']}")
             print(f"{Fore.YELLOW}🎯 Type:{Style.RESET_ALL} {content['type']}")
             print(f"{Fore.YELLOW}⏰ Heure optimale:{Style.RESET_ALL} {content['optimal_time']}")
+            metrics = content['metrics']
+            details = [f"{metrics['total_ms']:.0f} ms"]
+            if metrics['ttft_ms'] is not None:
+                details.append(f"1er token {metrics['ttft_ms']:.0f} ms")
+            if metrics['tokens_per_s']:
+                details.append(f"{metrics['completion_tokens']} tokens à {metrics['tokens_per_s']:.1f}/s")
+            print(f"{Fore.YELLOW}⏱️ Génération:{Style.RESET_ALL} {' | '.join(details)} ({metrics['provider']})")
             print(f"\n{Fore.CYAN}📝 CONTENU:{Style.RESET_ALL}")
             print(f"{content['content']}")
             print(f"\n{Fore.CYAN}🏷️ HASHTAGS:{Style.RESET_ALL}")
@@ -172,7 +194,7 @@ class ApolloMainInterface:
         
         print(f"\n{Fore.YELLOW}🤖 Génération de {count} posts en cours...{Style.RESET_ALL}")
         
-        batch = self.content_generator.generate_batch_content(count=count)
+        batch = self.generate_batch_with_progress(count)
         
         if batch:
             print(f"\n{Fore.GREEN}✅ {len(batch)} posts générés avec succès!{Style.RESET_ALL}")
@@ -191,6 +213,51 @@ class ApolloMainInterface:
         else:
             print(f"{Fore.RED}❌ Échec de la génération{Style.RESET_ALL}")
     
+    def generate_batch_with_progress(self, count):
+        """Génère un lot en parallèle avec barre de progression et erreurs par post"""
+        errors = []
+        
+        with tqdm(total=count, desc="Génération IA") as pbar:
+            def on_result(result):
+                if result['error']:
+                    errors.append(result)
+                pbar.update(1)
+            
+            batch = self.content_generator.generate_batch_content(count=count, on_result=on_result)
+        
+        for result in sorted(errors, key=lambda r: r['index']):
+            request = result['request']
+            print(f"{Fore.RED}❌ Post {result['index'] + 1} (Gym {request['gym_id']} - "
+                  f"{request['platform']} - {request['post_type']}): {result['error']}{Style.RESET_ALL}")
+        
+        return batch
+    
+    def show_generated_content(self, page_size=10):
+        """Contenus enregistrés, du plus récent au plus ancien, filtrables par salle et plateforme"""
+        print(f"\n{Fore.CYAN}📚 Contenu généré{Style.RESET_ALL}")
+        
+        gym_filter = input("Filtrer par salle (ID, Entrée = toutes): ").strip()
+        platform = input("Filtrer par plateforme (Entrée = toutes): ").strip().lower() or None
+        gym_id = int(gym_filter) if gym_filter.isdigit() else None
+        
+        repository = get_content_repository()
+        page = 1
+        while True:
+            result = repository.query(gym_id=gym_id, platform=platform, page=page, page_size=page_size)
+            if not result['total']:
+                print(f"{Fore.YELLOW}ℹ️ Aucun contenu enregistré{Style.RESET_ALL}")
+                return
+            
+            print(f"\n{Fore.GREEN}✅ {result['total']} contenus - page {page}/{result['pages']}{Style.RESET_ALL}")
+            for post in result['items']:
+                print(f"\n{Fore.YELLOW}{post['generated_at'][:16]} - {post['gym']['name']} - "
+                      f"{post['platform']} - {post['type']} [{post['status']}]{Style.RESET_ALL}")
+                print(f"   {post['content'][:80]}...")
+            
+            if page >= result['pages'] or input("\nPage suivante? (o/N): ").lower() != 'o':
+                return
+            page += 1
+    
     def analytics_menu(self):
         """Menu analytics"""
         while True:
@@ -298,9 +365,10 @@ class ApolloMainInterface:
         print("2. Tester la connexion OpenAI")
         print("3. Configurer les APIs sociales")
         print("4. Voir les salles Apollo")
-        print("5. Retour au menu principal")
+        print("5. Métriques de génération")
+        print("6. Retour au menu principal")
         
-        choice = input(f"\n{Fore.CYAN}Votre choix (1-5): {Style.RESET_ALL}")
+        choice = input(f"\n{Fore.CYAN}Votre choix (1-6): {Style.RESET_ALL}")
         
         if choice == "1":
             self.check_configuration()
@@ -311,8 +379,38 @@ class ApolloMainInterface:
         elif choice == "4":
             self.show_apollo_gyms()
         elif choice == "5":
+            self.show_generation_metrics()
+            if input("Exporter en JSON ? (o/N): ").strip().lower() == 'o':
+                print(f"{Fore.GREEN}✅ Métriques exportées: {GENERATION_METRICS.export()}{Style.RESET_ALL}")
+        elif choice == "6":
             return
     
+    def show_generation_metrics(self):
+        """Histogrammes de génération depuis le lancement (attente, TTFT, tokens/s...)"""
+        print(f"\n{Fore.CYAN}⏱️ Métriques de génération{Style.RESET_ALL}")
+        
+        snapshot = GENERATION_METRICS.snapshot()
+        counters = snapshot['counters']
+        if not counters.get('generations'):
+            print(f"{Fore.YELLOW}Aucune génération depuis le lancement{Style.RESET_ALL}")
+            return
+        
+        print(f"Posts: {counters['generations']} | cache: {counters.get('cache_hits', 0)} | "
+              f"templates de secours: {counters.get('fallbacks', 0)} | "
+              f"tokens: {counters.get('prompt_tokens', 0)} prompt / {counters.get('completion_tokens', 0)} générés")
+        
+        print(f"\n{'Mesure':<16}{'Nb':>6}{'Moyenne':>10}{'p50':>10}{'p95':>10}{'Max':>10}")
+        for name, count, mean, p50, p95, maximum, unit in GENERATION_METRICS.summary_rows():
+            print(f"{name:<16}{count:>6}{mean:>10.1f}{p50:>10.0f}{p95:>10.0f}{maximum:>10.1f}  {unit}")
+        
+        # Retard des publications planifiées (scheduler lancé dans ce processus)
+        publish = PUBLISH_METRICS.snapshot()
+        lateness = publish['histograms']['lateness_s']
+        if lateness['count']:
+            print(f"\n📤 Publications: {lateness['count']} "
+                  f"(pré-générées: {publish['counters'].get('pregenerated', 0)}) | retard moyen "
+                  f"{lateness['mean']:.0f}s, p95 {lateness['p95']:.0f}s, max {lateness['max']:.0f}s")
+    
     def check_configuration(self):
         """Vérifie la configuration"""
         print(f"\n{Fore.CYAN}🔍 Vérification de la configuration{Style.RESET_ALL}")
@@ -324,6 +422,10 @@ class ApolloMainInterface:
         else:
             print(f"{Fore.RED}❌ Clé OpenAI manquante{Style.RESET_ALL}")
         
+        # Registre des salles
+        gyms = get_gym_registry()
+        print(f"{Fore.GREEN}✅ {len(gyms)} salles chargées ({gyms.source}){Style.RESET_ALL}")
+        
         # Vérification des dossiers
         required_dirs = ['data', 'data/generated_content', 'data/analytics_data']
         for dir_path in required_dirs:
@@ -333,6 +435,47 @@ class ApolloMainInterface:
                 os.makedirs(dir_path, exist_ok=True)
                 print(f"{Fore.YELLOW}📁 Dossier {dir_path} créé{Style.RESET_ALL}")
         
+        # Serveurs Ollama
+        if self.content_generator.ai_provider == 'ollama':
+            for host in self.content_generator.ollama_pool.status():
+                if host['available']:
+                    print(f"{Fore.GREEN}✅ Ollama {host['url']} ({host['in_flight']} requêtes en cours){Style.RESET_ALL}")
+                else:
+                    print(f"{Fore.RED}❌ Ollama {host['url']} écarté "
+                          f"({host['cooldown_remaining']:.0f}s restantes){Style.RESET_ALL}")
+        
+        # Disjoncteurs et requêtes couvertes
+        resilience = self.content_generator.get_resilience_stats()
+        for provider, breaker in resilience['breakers'].items():
+            if provider not in (resilience['primary'], resilience['hedge_provider']):
+                continue
+            color = Fore.GREEN if breaker['state'] == 'closed' else Fore.RED
+            p95 = resilience['latency_p95'][provider]
+            latency = f", p95 {p95:.1f}s" if p95 is not None else ""
+            print(f"{color}🛡️ {provider}: disjoncteur {breaker['state']} "
+                  f"({breaker['consecutive_failures']} échecs consécutifs{latency}){Style.RESET_ALL}")
+        if resilience['hedge_provider']:
+            hedges = resilience['hedges']
+            print(f"{Fore.CYAN}🛡️ Hedging vers {resilience['hedge_provider']}: {hedges['launched']} lancées, "
+                  f"{hedges['won']} gagnées, {hedges['failovers']} bascules{Style.RESET_ALL}")
+        
+        # Cache des complétions IA
+        cache = self.content_generator.cache
+        if cache:
+            stats = cache.stats()
+            print(f"{Fore.GREEN}✅ Cache IA: {stats['entries']} entrées, {stats['bytes'] / 1024:.0f} Ko "
+                  f"({stats['hits']} hits / {stats['misses']} misses){Style.RESET_ALL}")
+        else:
+            print(f"{Fore.YELLOW}ℹ️ Cache IA désactivé (CONTENT_CACHE_ENABLED=0){Style.RESET_ALL}")
+        
+        # Déduplication perceptuelle des visuels
+        asset_index = get_asset_index()
+        if asset_index:
+            stats = asset_index.stats()
+            print(f"{Fore.GREEN}🧬 Déduplication visuels: {stats['assets']} assets, "
+                  f"{stats['duplicates_avoided']} doublons évités, "
+                  f"{stats['bytes_saved'] / 1024:.0f} Ko économisés{Style.RESET_ALL}")
+        
         # Vérification des dépendances
         try:
             import openai, pandas, plotly, streamlit
@@ -351,7 +494,7 @@ class ApolloMainInterface:
         try:
             # Test simple
             content = self.content_generator.generate_post_content(
-                gym_id=1, platform='instagram', post_type='motivation'
+                gym_id=1, platform='instagram', post_type='motivation', bypass_cache=True
             )
             
             if content:
@@ -367,7 +510,7 @@ class ApolloMainInterface:
         """Affiche les salles Apollo"""
         print(f"\n{Fore.CYAN}🏋️ Salles Apollo Sporting Club{Style.RESET_ALL}")
         
-        for i, gym in enumerate(APOLLO_GYMS, 1):
+        for i, gym in enumerate(get_gym_registry(), 1):
             print(f"\n{Fore.YELLOW}{i}. {gym['name']}{Style.RESET_ALL}")
             print(f"   📍 {gym['address']}")
             print(f"   📞 {gym['phone']}")
@@ -479,9 +622,73 @@ def main():
     parser.add_argument('--dashboard', action='store_true', help='Lancer directement le dashboard web')
     parser.add_argument('--demo', action='store_true', help='Lancer la démo complète')
     parser.add_argument('--generate', type=int, metavar='N', help='Générer N posts et quitter')
+    parser.add_argument('--benchmark-templates', type=int, nargs='?', const=10000, metavar='N',
+                        help='Mesurer le débit de génération sans IA (templates) et quitter')
+    
+    parser.add_argument('--benchmark-prompt-eval', type=int, nargs='?', const=5, metavar='N',
+                        help="Comparer le temps d'évaluation du prompt Ollama (generate vs chat) et quitter")
+    parser.add_argument('--benchmark-rendering', type=int, nargs='?', const=500, metavar='N',
+                        help='Mesurer le débit de rendu des visuels de marque et quitter')
+    parser.add_argument('--benchmark-job-store', type=int, nargs='?', const=10000, metavar='N',
+                        help='Mesurer ajouts et redémarrage du scheduler avec N jobs persistés et quitter')
+    parser.add_argument('--benchmark-publishing', type=int, nargs='?', const=400, metavar='N',
+                        help='Mesurer le débit de publication sous quotas (API factice) et quitter')
+    parser.add_argument('--tiktok-week', type=float, nargs='?', const=0, metavar='SECONDES',
+                        help='Rendre une semaine de clips TikTok par salle (temps max optionnel) et quitter')
+    parser.add_argument('--metrics', nargs='?', const='', metavar='FICHIER',
+                        help='Avec --generate : afficher les métriques de génération et les exporter en JSON')
+    parser.add_argument('--batch-calendar', metavar='FICHIER',
+                        help='Écrire le calendrier de la semaine (requêtes batch JSONL) et quitter')
+    parser.add_argument('--batch-run', metavar='FICHIER',
+                        help='Exécuter un fichier de requêtes batch JSONL (reprend après un crash) et quitter')
+    parser.add_argument('--batch-output', metavar='FICHIER',
+                        help='Fichier de sortie JSONL du batch (défaut: <entrée>.output.jsonl)')
+    parser.add_argument('--batch-backend', choices=['local', 'openai'], default='local',
+                        help='local = Ollama, openai = API Batch OpenAI (défaut: local)')
     
     args = parser.parse_args()
     
+    if args.benchmark_prompt_eval:
+        from content_generator import benchmark_ollama_prompt_eval
+        benchmark_ollama_prompt_eval(args.benchmark_prompt_eval)
+        return
+    
+    if args.batch_calendar:
+        from batch_jobs import build_weekly_calendar
+        build_weekly_calendar(ApolloContentGenerator(ai_provider='template'), args.batch_calendar)
+        return
+    
+    if args.batch_run:
+        from batch_jobs import BatchJobRunner
+        output = args.batch_output or f"{os.path.splitext(args.batch_run)[0]}.output.jsonl"
+        BatchJobRunner(args.batch_run, output, backend=args.batch_backend).run()
+        return
+    
+    if args.benchmark_rendering:
+        from rendering import benchmark_rendering
+        benchmark_rendering(args.benchmark_rendering)
+        return
+    
+    if args.benchmark_job_store:
+        from scheduler import benchmark_job_store
+        benchmark_job_store(args.benchmark_job_store)
+        return
+    
+    if args.benchmark_publishing:
+        from publishing import benchmark_publishing
+        benchmark_publishing(args.benchmark_publishing)
+        return
+    
+    if args.tiktok_week is not None:
+        from video_generator import render_tiktok_week
+        render_tiktok_week(ApolloContentGenerator(), wall_time=args.tiktok_week or None)
+        return
+    
+    if args.benchmark_templates:
+        from template_engine import benchmark_template_generation
+        benchmark_template_generation(args.benchmark_templates)
+        return
+    
     app = ApolloMainInterface()
     
     if args.dashboard:
@@ -492,9 +699,12 @@ def main():
     elif args.generate:
         app.print_banner()
         print(f"Génération de {args.generate} posts...")
-        batch = app.content_generator.generate_batch_content(count=args.generate)
+        batch = app.generate_batch_with_progress(args.generate)
         filepath = app.content_generator.save_content_batch(batch)
         print(f"✅ {len(batch)} posts générés et sauvegardés dans {filepath}")
+        if args.metrics is not None:
+            app.show_generation_metrics()
+            print(f"📊 Métriques exportées: {GENERATION_METRICS.export(args.metrics or None)}")
     else:
         app.run()
 
@@ -0,0 +1,188 @@
+"""
+Apollo Generation Metrics
+Histogrammes en mémoire des temps et tokens de génération (attente, TTFT, tokens/s...)
+et du retard de publication par rapport au créneau prévu
+"""
+
+import bisect
+import json
+import os
+import threading
+from datetime import datetime
+
+# Bornes des buckets : millisecondes pour les durées, tokens/s pour le débit
+LATENCY_BUCKETS_MS = (5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000, 10000, 20000, 30000, 60000)
+THROUGHPUT_BUCKETS = (1, 2, 5, 10, 15, 20, 30, 50, 75, 100, 150, 250)
+LATENESS_BUCKETS_S = (1, 5, 15, 30, 60, 120, 300, 600, 900, 1800, 3600)
+
+class Histogram:
+    """Histogramme à buckets fixes (cumul, somme, min/max, percentiles approchés)"""
+    
+    def __init__(self, name, buckets, unit=''):
+        self.name = name
+        self.unit = unit
+        self.buckets = tuple(buckets)
+        self._lock = threading.Lock()
+        self.reset()
+    
+    def reset(self):
+        with self._lock:
+            self.counts = [0] * (len(self.buckets) + 1)  # dernier bucket : +Inf
+            self.count = 0
+            self.total = 0.0
+            self.min = None
+            self.max = None
+    
+    def observe(self, value):
+        if value is None:
+            return
+        with self._lock:
+            self.counts[bisect.bisect_left(self.buckets, value)] += 1
+            self.count += 1
+            self.total += value
+            self.min = value if self.min is None else min(self.min, value)
+            self.max = value if self.max is None else max(self.max, value)
+    
+    def percentile(self, p):
+        """Borne haute du bucket contenant le p-ième percentile"""
+        with self._lock:
+            if not self.count:
+                return None
+            rank = p / 100 * self.count
+            seen = 0
+            for index, count in enumerate(self.counts):
+                seen += count
+                if seen >= rank and count:
+                    return self.buckets[index] if index < len(self.buckets) else self.max
+            return self.max
+    
+    def snapshot(self):
+        p50, p95, p99 = self.percentile(50), self.percentile(95), self.percentile(99)
+        with self._lock:
+            return {
+                'unit': self.unit,
+                'count': self.count,
+                'mean': self.total / self.count if self.count else None,
+                'min': self.min,
+                'max': self.max,
+                'p50': p50,
+                'p95': p95,
+                'p99': p99,
+                'buckets': dict(zip([str(b) for b in self.buckets] + ['+Inf'], self.counts))
+            }
+
+class GenerationMetrics:
+    """Agrégat des blocs 'metrics' de chaque post généré"""
+    
+    def __init__(self):
+        self.histograms = {
+            'queue_wait_ms': Histogram('queue_wait_ms', LATENCY_BUCKETS_MS, 'ms'),
+            'ttft_ms': Histogram('ttft_ms', LATENCY_BUCKETS_MS, 'ms'),
+            'llm_ms': Histogram('llm_ms', LATENCY_BUCKETS_MS, 'ms'),
+            'total_ms': Histogram('total_ms', LATENCY_BUCKETS_MS, 'ms'),
+            'load_ms': Histogram('load_ms', LATENCY_BUCKETS_MS, 'ms'),
+            'prompt_eval_ms': Histogram('prompt_eval_ms', LATENCY_BUCKETS_MS, 'ms'),
+            'tokens_per_s': Histogram('tokens_per_s', THROUGHPUT_BUCKETS, 'tokens/s')
+        }
+        self._lock = threading.Lock()
+        self.started_at = datetime.now()
+        self.counters = {}
+    
+    def _count(self, name, amount=1):
+        with self._lock:
+            self.counters[name] = self.counters.get(name, 0) + amount
+    
+    def observe(self, metrics):
+        """Enregistre le bloc metrics d'un post"""
+        self._count('generations')
+        self._count(f"provider.{metrics.get('provider')}")
+        if metrics.get('cache_hit'):
+            self._count('cache_hits')
+        if metrics.get('fallback'):
+            self._count('fallbacks')
+        if metrics.get('hedged'):
+            self._count('hedged')
+        self._count('prompt_tokens', metrics.get('prompt_tokens') or 0)
+        self._count('completion_tokens', metrics.get('completion_tokens') or 0)
+        
+        for name, histogram in self.histograms.items():
+            histogram.observe(metrics.get(name))
+    
+    def reset(self):
+        for histogram in self.histograms.values():
+            histogram.reset()
+        with self._lock:
+            self.counters = {}
+            self.started_at = datetime.now()
+    
+    def snapshot(self):
+        with self._lock:
+            counters = dict(self.counters)
+        return {
+            'since': self.started_at.isoformat(),
+            'counters': counters,
+            'histograms': {name: h.snapshot() for name, h in self.histograms.items()}
+        }
+    
+    def summary_rows(self):
+        """Lignes (nom, nb, moyenne, p50, p95, max, unité) pour affichage CLI/dashboard"""
+        rows = []
+        for name, snap in self.snapshot()['histograms'].items():
+            if not snap['count']:
+                continue
+            rows.append((name, snap['count'], snap['mean'], snap['p50'], snap['p95'], snap['max'], snap['unit']))
+        return rows
+    
+    def export(self, path=None):
+        """Sauvegarde le snapshot en JSON (data/analytics_data par défaut)"""
+        if not path:
+            timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
+            path = f'data/analytics_data/generation_metrics_{timestamp}.json'
+        
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump(self.snapshot(), f, ensure_ascii=False, indent=2)
+        return path
+
+class PublishMetrics:
+    """Retard des publications planifiées (heure réelle - heure du créneau)"""
+    
+    def __init__(self):
+        self.lateness = Histogram('lateness_s', LATENESS_BUCKETS_S, 's')
+        self._lock = threading.Lock()
+        self.started_at = datetime.now()
+        self.counters = {}
+    
+    def _count(self, name, amount=1):
+        with self._lock:
+            self.counters[name] = self.counters.get(name, 0) + amount
+    
+    def observe(self, scheduled_for, published_at=None, pregenerated=False):
+        """Enregistre une publication réussie d'un créneau (datetime ou chaîne ISO)"""
+        if isinstance(scheduled_for, str):
+            scheduled_for = datetime.fromisoformat(scheduled_for)
+        published_at = published_at or datetime.now()
+        self._count('published')
+        self._count('pregenerated' if pregenerated else 'generated_at_slot')
+        self.lateness.observe(max(0.0, (published_at - scheduled_for).total_seconds()))
+    
+    def reset(self):
+        self.lateness.reset()
+        with self._lock:
+            self.counters = {}
+            self.started_at = datetime.now()
+    
+    def snapshot(self):
+        with self._lock:
+            counters = dict(self.counters)
+        return {
+            'since': self.started_at.isoformat(),
+            'counters': counters,
+            'histograms': {'lateness_s': self.lateness.snapshot()}
+        }
+
+# Agrégats partagés par tous les générateurs du processus (CLI, scheduler, dashboard)
+GENERATION_METRICS = GenerationMetrics()
+PUBLISH_METRICS = PublishMetrics()
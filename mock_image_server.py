@@ -0,0 +1,92 @@
+"""
+Apollo Mock Image Server
+Faux endpoint d'images compatible OpenAI pour tester le cache DALL·E sans clé ni réseau
+
+Usage: python mock_image_server.py [port] [délai_secondes]
+puis OPENAI_IMAGES_BASE_URL=http://localhost:8765/v1
+"""
+
+import hashlib
+import io
+import json
+import sys
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from PIL import Image, ImageDraw
+
+class MockImageHandler(BaseHTTPRequestHandler):
+    """POST /v1/images/generations → URL locale ; GET /images/<id>.png → image générée"""
+    
+    delay = 0.0
+    stats = {'generations': 0, 'downloads': 0}
+    stats_lock = threading.Lock()
+    
+    def log_message(self, format, *args):
+        pass
+    
+    def _send(self, status, body, content_type='application/json'):
+        self.send_response(status)
+        self.send_header('Content-Type', content_type)
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+    
+    def _count(self, name):
+        with self.stats_lock:
+            self.stats[name] += 1
+    
+    def do_POST(self):
+        if not self.path.endswith('/images/generations'):
+            self._send(404, b'{"error": "not found"}')
+            return
+        
+        length = int(self.headers.get('Content-Length', 0))
+        request = json.loads(self.rfile.read(length) or b'{}')
+        self._count('generations')
+        time.sleep(self.delay)
+        
+        image_id = hashlib.sha256(request.get('prompt', '').encode('utf-8')).hexdigest()[:16]
+        host = self.headers.get('Host', f'localhost:{self.server.server_port}')
+        body = {
+            'created': int(time.time()),
+            'data': [{'url': f"http://{host}/images/{image_id}.png", 'revised_prompt': request.get('prompt')}]
+        }
+        self._send(200, json.dumps(body).encode('utf-8'))
+    
+    def do_GET(self):
+        if self.path == '/stats':
+            with self.stats_lock:
+                self._send(200, json.dumps(self.stats).encode('utf-8'))
+            return
+        
+        if not self.path.startswith('/images/'):
+            self._send(404, b'{"error": "not found"}')
+            return
+        
+        self._count('downloads')
+        time.sleep(self.delay)
+        
+        # Image déterministe : couleur dérivée de l'identifiant
+        image_id = self.path.rsplit('/', 1)[-1].split('.')[0]
+        color = '#' + image_id[:6].ljust(6, '0')
+        img = Image.new('RGB', (256, 256), color)
+        ImageDraw.Draw(img).text((16, 120), image_id, fill='white')
+        buffer = io.BytesIO()
+        img.save(buffer, format='PNG')
+        self._send(200, buffer.getvalue(), 'image/png')
+
+def start_mock_image_server(port=8765, delay=0.0):
+    """Démarre le serveur dans un thread et le renvoie (server.shutdown() pour l'arrêter)"""
+    MockImageHandler.delay = delay
+    server = ThreadingHTTPServer(('127.0.0.1', port), MockImageHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+if __name__ == "__main__":
+    port = int(sys.argv[1]) if len(sys.argv) > 1 else 8765
+    delay = float(sys.argv[2]) if len(sys.argv) > 2 else 0.0
+    MockImageHandler.delay = delay
+    print(f"🖼️ Serveur d'images factice sur http://localhost:{port}/v1 (délai {delay}s)")
+    ThreadingHTTPServer(('127.0.0.1', port), MockImageHandler).serve_forever()
@@ -0,0 +1,143 @@
+"""
+Apollo Mock Platform Server
+Fausse API de publication des réseaux sociaux avec quotas par plateforme et par compte
+(429 + Retry-After au-delà) et dédoublonnage par en-tête Idempotency-Key,
+pour tester le débit de publication sans réseau
+
+Usage: python mock_platform_server.py [port] [délai_secondes] [accélération]
+puis APOLLO_PUBLISH_API_URL=http://localhost:8766
+"""
+
+import hashlib
+import json
+import sys
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from config import PUBLISHING_CONFIG
+from publishing import TokenBucket, scaled_config
+
+class MockPlatformHandler(BaseHTTPRequestHandler):
+    """
+    POST /<plateforme>/posts → 201, ou 429 si le quota de la plateforme ou du compte est dépassé.
+    Une clé d'idempotence déjà publiée renvoie la réponse d'origine sans nouveau post.
+    POST /<plateforme>/media (octets de l'image) → 201 {'media_id'}, hors quota de publication.
+    """
+    
+    protocol_version = 'HTTP/1.1'  # connexions keep-alive des clients de publication
+    delay = 0.0
+    config = PUBLISHING_CONFIG
+    buckets = {}
+    published = {}  # (plateforme, Idempotency-Key) → réponse du post créé
+    stats = {}
+    lock = threading.Lock()
+    
+    def log_message(self, format, *args):
+        pass
+    
+    def _send(self, status, body, headers=None):
+        payload = json.dumps(body).encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(payload)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(payload)
+    
+    def _bucket(self, key, rate_per_minute, burst):
+        with self.lock:
+            if key not in self.buckets:
+                self.buckets[key] = TokenBucket(rate_per_minute / 60, burst)
+            return self.buckets[key]
+    
+    def _count(self, platform, name):
+        with self.lock:
+            platform_stats = self.stats.setdefault(platform, {'accepted': 0, 'rejected': 0, 'replayed': 0,
+                                                              'media': 0})
+            platform_stats[name] += 1
+    
+    def _upload_media(self, platform):
+        length = int(self.headers.get('Content-Length', 0))
+        data = self.rfile.read(length)
+        if not data or not self.headers.get('Content-Type', '').startswith('image/'):
+            self._send(400, {'error': 'image attendue'})
+            return
+        self._count(platform, 'media')
+        self._send(201, {'media_id': hashlib.sha256(data).hexdigest()[:16], 'bytes': len(data)})
+    
+    def do_POST(self):
+        parts = self.path.strip('/').split('/')
+        quotas = self.config['platforms'].get(parts[0]) if len(parts) == 2 else None
+        if not quotas or parts[1] not in ('posts', 'media'):
+            self._send(404, {'error': 'not found'})
+            return
+        
+        platform = parts[0]
+        if parts[1] == 'media':
+            self._upload_media(platform)
+            return
+        length = int(self.headers.get('Content-Length', 0))
+        post = json.loads(self.rfile.read(length) or b'{}')
+        time.sleep(self.delay)
+        
+        key = self.headers.get('Idempotency-Key')
+        with self.lock:
+            replay = self.published.get((platform, key)) if key else None
+        if replay:
+            self._count(platform, 'replayed')
+            self._send(201, replay, {'Idempotent-Replayed': 'true'})
+            return
+        
+        platform_bucket = self._bucket(platform, quotas['rate_per_minute'], quotas['burst'])
+        account_bucket = self._bucket((platform, post.get('account')), quotas['account_rate_per_minute'],
+                                      quotas['account_burst'])
+        # Quota du compte vérifié d'abord : un refus ne consomme pas le quota de la plateforme
+        if not account_bucket.try_acquire():
+            bucket = account_bucket
+        elif not platform_bucket.try_acquire():
+            bucket = platform_bucket
+        else:
+            body = {'id': post.get('post_id'), 'platform': platform}
+            if key:
+                with self.lock:
+                    body = self.published.setdefault((platform, key), body)
+            self._count(platform, 'accepted')
+            self._send(201, body)
+            return
+        
+        self._count(platform, 'rejected')
+        retry_after = max(0.001, 1 / bucket.rate)
+        self._send(429, {'error': 'rate limited'}, {'Retry-After': f"{retry_after:.3f}"})
+    
+    def do_GET(self):
+        if self.path == '/stats':
+            with self.lock:
+                self._send(200, self.stats)
+            return
+        self._send(404, {'error': 'not found'})
+
+class MockPlatformServer(ThreadingHTTPServer):
+    daemon_threads = True
+    request_queue_size = 128  # rafales de connexions simultanées des tests de charge
+
+def start_mock_platform_server(port=8766, delay=0.0, config=None):
+    """Démarre le serveur dans un thread et le renvoie (port=0 : port libre, server.shutdown() pour l'arrêter)"""
+    MockPlatformHandler.delay = delay
+    MockPlatformHandler.config = config or PUBLISHING_CONFIG
+    MockPlatformHandler.buckets = {}
+    MockPlatformHandler.published = {}
+    MockPlatformHandler.stats = {}
+    server = MockPlatformServer(('127.0.0.1', port), MockPlatformHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+if __name__ == "__main__":
+    port = int(sys.argv[1]) if len(sys.argv) > 1 else 8766
+    delay = float(sys.argv[2]) if len(sys.argv) > 2 else 0.0
+    speedup = float(sys.argv[3]) if len(sys.argv) > 3 else 1.0
+    MockPlatformHandler.delay = delay
+    MockPlatformHandler.config = scaled_config(speedup)
+    print(f"📡 API de publication factice sur http://localhost:{port} (délai {delay}s, quotas ×{speedup:g})")
+    MockPlatformServer(('127.0.0.1', port), MockPlatformHandler).serve_forever()
@@ -0,0 +1,160 @@
+"""
+Apollo AI Ollama Pool
+Répartition des requêtes sur plusieurs serveurs Ollama :
+health checks en tâche de fond, envoi au serveur le moins chargé, mise à l'écart des serveurs en échec
+"""
+
+import itertools
+import threading
+import time
+from contextlib import contextmanager
+
+import requests
+
+from config import OLLAMA_CONFIG
+
+class OllamaHost:
+    """État d'un serveur Ollama du pool"""
+    
+    def __init__(self, url):
+        self.url = url.rstrip('/')
+        self.in_flight = 0
+        self.healthy = True
+        self.down_until = 0.0
+        self.failures = 0
+        self.total_requests = 0
+        self.models = []
+        self.last_check = None
+    
+    def is_available(self, now):
+        return self.healthy and now >= self.down_until
+    
+    def to_dict(self, now=None):
+        now = now or time.monotonic()
+        return {
+            'url': self.url,
+            'available': self.is_available(now),
+            'in_flight': self.in_flight,
+            'total_requests': self.total_requests,
+            'failures': self.failures,
+            'cooldown_remaining': max(0.0, self.down_until - now),
+            'models': list(self.models)
+        }
+
+class OllamaBackendPool:
+    def __init__(self, urls=None, session=None, probe_interval=None, cooldown=None):
+        self.hosts = [OllamaHost(url) for url in (urls or OLLAMA_CONFIG['urls'])]
+        self.session = session or requests
+        self.probe_interval = probe_interval or OLLAMA_CONFIG['probe_interval']
+        self.cooldown = cooldown or OLLAMA_CONFIG['host_cooldown']
+        
+        self._lock = threading.Lock()
+        self._round_robin = itertools.count()
+        self._stop_event = threading.Event()
+        self._probe_thread = None
+    
+    def __len__(self):
+        return len(self.hosts)
+    
+    # -------------------------------------------------------------------------
+    # Health checks
+    # -------------------------------------------------------------------------
+    
+    def start(self):
+        """Lance les health checks périodiques (/api/tags) en tâche de fond"""
+        if self._probe_thread and self._probe_thread.is_alive():
+            return
+        self._stop_event.clear()
+        self._probe_thread = threading.Thread(
+            target=self._probe_loop, name='ollama-pool-probe', daemon=True
+        )
+        self._probe_thread.start()
+    
+    def stop(self):
+        self._stop_event.set()
+        if self._probe_thread:
+            self._probe_thread.join(timeout=5)
+            self._probe_thread = None
+    
+    def close(self):
+        """Arrête les health checks : à appeler quand le générateur propriétaire est abandonné"""
+        self.stop()
+    
+    def _probe_loop(self):
+        while not self._stop_event.is_set():
+            self.probe_all()
+            self._stop_event.wait(self.probe_interval)
+    
+    def probe_all(self):
+        for host in self.hosts:
+            self.probe(host)
+    
+    def probe(self, host):
+        """Vérifie un serveur et met à jour son état"""
+        try:
+            response = self.session.get(
+                f'{host.url}/api/tags', timeout=(OLLAMA_CONFIG['connect_timeout'], 5)
+            )
+            ok = response.status_code == 200
+            models = [m['name'] for m in response.json().get('models', [])] if ok else []
+        except Exception:
+            ok, models = False, []
+        
+        now = time.monotonic()
+        with self._lock:
+            host.last_check = now
+            if ok:
+                host.healthy = True
+                host.down_until = 0.0
+                host.models = models
+            else:
+                host.healthy = False
+                host.down_until = now + self.cooldown
+        return ok
+    
+    # -------------------------------------------------------------------------
+    # Répartition
+    # -------------------------------------------------------------------------
+    
+    def acquire(self):
+        """Réserve le serveur disponible avec le moins de requêtes en cours"""
+        with self._lock:
+            now = time.monotonic()
+            candidates = [host for host in self.hosts if host.is_available(now)]
+            if not candidates:
+                raise requests.exceptions.ConnectionError("Aucun serveur Ollama disponible")
+            
+            least = min(host.in_flight for host in candidates)
+            tied = [host for host in candidates if host.in_flight == least]
+            host = tied[next(self._round_robin) % len(tied)]
+            host.in_flight += 1
+            host.total_requests += 1
+            return host
+    
+    def release(self, host, failed=False):
+        with self._lock:
+            host.in_flight -= 1
+            if failed:
+                host.failures += 1
+                host.down_until = time.monotonic() + self.cooldown
+    
+    @contextmanager
+    def lease(self):
+        """
+        with pool.lease() as host: ... — le serveur est écarté pendant
+        le cooldown si la connexion échoue ou expire
+        """
+        host = self.acquire()
+        failed = False
+        try:
+            yield host
+        except (requests.exceptions.ConnectionError, requests.exceptions.Timeout):
+            failed = True
+            raise
+        finally:
+            self.release(host, failed)
+    
+    def status(self):
+        now = time.monotonic()
+        with self._lock:
+            return [host.to_dict(now) for host in self.hosts]
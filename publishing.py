@@ -0,0 +1,433 @@
+"""
+Apollo Publishing
+Publication vers les plateformes sous quotas : seaux à jetons par plateforme et par compte,
+files par compte et pool de workers borné par plateforme, client HTTP et benchmark de débit
+"""
+
+import copy
+import threading
+import time
+from collections import OrderedDict, deque
+from concurrent.futures import Future, ThreadPoolExecutor
+
+import requests
+
+from config import PUBLISHING_CONFIG
+
+class RateLimitedError(Exception):
+    """Réponse 429 de la plateforme (retry_after en secondes si fourni)"""
+    
+    def __init__(self, retry_after=None):
+        super().__init__(f"Quota de publication dépassé (Retry-After: {retry_after})")
+        self.retry_after = retry_after
+
+class PublishQueueFullError(RuntimeError):
+    """File de publication de la plateforme pleine au-delà de queue_timeout"""
+
+class TokenBucket:
+    """
+    Seau à jetons par réservation : chaque appel prend un jeton tout de suite
+    (solde éventuellement négatif) et renvoie l'attente avant de pouvoir l'utiliser.
+    Les appelants sont servis dans l'ordre, sans boucle d'attente active.
+    """
+    
+    def __init__(self, rate, capacity=None):
+        self.rate = float(rate)  # jetons par seconde
+        self.capacity = float(capacity or max(1.0, rate))
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+        self._lock = threading.Lock()
+    
+    def _refill(self, now):
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+    
+    def reserve(self, tokens=1):
+        """Réserve des jetons et renvoie l'attente (secondes) avant leur disponibilité"""
+        with self._lock:
+            self._refill(time.monotonic())
+            self.tokens -= tokens
+            return 0.0 if self.tokens >= 0 else -self.tokens / self.rate
+    
+    def try_acquire(self, tokens=1):
+        """Prend des jetons seulement s'ils sont disponibles immédiatement"""
+        with self._lock:
+            self._refill(time.monotonic())
+            if self.tokens < tokens:
+                return False
+            self.tokens -= tokens
+            return True
+    
+    def wait_time(self, tokens=1):
+        """Attente (secondes) avant que des jetons soient disponibles, sans les prendre"""
+        with self._lock:
+            self._refill(time.monotonic())
+            return max(0.0, (tokens - self.tokens) / self.rate)
+    
+    def refund(self, tokens=1):
+        """Rend des jetons pris pour un envoi finalement non parti"""
+        with self._lock:
+            self._refill(time.monotonic())
+            self.tokens = min(self.capacity, self.tokens + tokens)
+    
+    def penalize(self, seconds):
+        """Suspend le seau (réponse 429) : plus aucun jeton avant seconds"""
+        with self._lock:
+            self._refill(time.monotonic())
+            self.tokens = min(self.tokens, 0.0) - seconds * self.rate
+
+class PlatformPublisher:
+    """
+    Publications d'une plateforme : une file par compte, servies à tour de rôle par un thread
+    de répartition qui ne confie un post aux workers qu'une fois les jetons du compte puis
+    de la plateforme obtenus. Un compte limité attend dans sa file sans occuper de worker.
+    """
+    
+    def __init__(self, platform, send, rate_per_minute, burst=None, account_rate_per_minute=None,
+                 account_burst=None, workers=2, max_queue=None, queue_timeout=None, rate_limit_retries=None):
+        self.platform = platform
+        self.send = send
+        self.bucket = TokenBucket(rate_per_minute / 60, burst)
+        self.account_rate = (account_rate_per_minute or 0) / 60
+        self.account_burst = account_burst
+        self.queue_timeout = PUBLISHING_CONFIG['queue_timeout'] if queue_timeout is None else queue_timeout
+        self.rate_limit_retries = (PUBLISHING_CONFIG['rate_limit_retries']
+                                   if rate_limit_retries is None else rate_limit_retries)
+        max_queue = PUBLISHING_CONFIG['max_queue'] if max_queue is None else max_queue
+        
+        self._accounts = {}
+        self._lock = threading.Lock()
+        self._slots = threading.BoundedSemaphore(workers + max_queue)
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix=f'apollo-publish-{platform}')
+        self._pending = OrderedDict()  # compte → deque de (content, future, tentative, mise en file)
+        self._ready = threading.Condition()
+        self._dispatcher = None
+        self._sending = 0       # posts confiés aux workers (un 429 peut les remettre en file)
+        self._closed = False
+        self._discard = False   # arrêt sans attente : plus aucun envoi
+        self.stats = {'submitted': 0, 'published': 0, 'failed': 0, 'rate_limited': 0, 'queue_full': 0,
+                      'throttled_s': 0.0}
+    
+    def _count(self, name, amount=1):
+        with self._lock:
+            self.stats[name] += amount
+    
+    def account_bucket(self, account):
+        """Seau du compte (une salle = un compte par plateforme), créé au premier usage ; None sans quota de compte"""
+        if account is None or not self.account_rate:
+            return None
+        with self._lock:
+            if account not in self._accounts:
+                self._accounts[account] = TokenBucket(self.account_rate, self.account_burst)
+            return self._accounts[account]
+    
+    def submit(self, content, account=None):
+        """Met la publication dans la file de son compte et renvoie un Future (True si publiée)"""
+        if not self._slots.acquire(timeout=self.queue_timeout):
+            self._count('queue_full')
+            raise PublishQueueFullError(f"File de publication {self.platform} pleine")
+        
+        future = Future()
+        future.add_done_callback(lambda _: self._slots.release())
+        with self._ready:
+            if self._closed:
+                self._slots.release()
+                raise RuntimeError(f"Publication {self.platform} arrêtée")
+            if self._dispatcher is None:
+                self._dispatcher = threading.Thread(target=self._dispatch, daemon=True,
+                                                    name=f'apollo-publish-{self.platform}-dispatch')
+                self._dispatcher.start()
+            self._pending.setdefault(account, deque()).append((content, future, 0, time.monotonic()))
+            self._ready.notify()
+        self._count('submitted')
+        return future
+    
+    def _next_ready(self):
+        """
+        Prochain post dont le compte puis la plateforme ont un jeton (jetons pris), comptes servis
+        à tour de rôle ; sinon (None, attente avant le prochain jeton). Appelé sous self._ready.
+        """
+        platform_wait = self.bucket.wait_time()
+        if platform_wait > 0:
+            return None, platform_wait
+        
+        account_wait = None
+        for account in list(self._pending):
+            bucket = self.account_bucket(account)
+            wait = bucket.wait_time() if bucket else 0.0
+            if wait > 0:
+                account_wait = wait if account_wait is None else min(account_wait, wait)
+                continue
+            # Jeton de plateforme pris seulement une fois le compte prêt
+            if not self.bucket.try_acquire():
+                return None, self.bucket.wait_time()
+            if bucket and not bucket.try_acquire():
+                self.bucket.refund()
+                continue
+            
+            queue = self._pending.pop(account)
+            item = queue.popleft()
+            if queue:
+                self._pending[account] = queue  # en fin de tour
+            return (account,) + item, 0.0
+        return None, account_wait or 0.0
+    
+    def _dispatch(self):
+        while True:
+            with self._ready:
+                while not self._pending:
+                    if self._closed and not self._sending:
+                        return
+                    self._ready.wait()
+                item, wait = self._next_ready()
+                if item is None:
+                    # Réveillé par un nouveau post ou une remise en file avant l'échéance
+                    self._ready.wait(wait)
+                    continue
+                
+                account, content, future, attempt, queued_at = item
+                # Un post remis en file après un 429 est déjà en cours
+                if attempt == 0 and not future.set_running_or_notify_cancel():
+                    continue
+                self._sending += 1
+            
+            self._count('throttled_s', time.monotonic() - queued_at)
+            try:
+                self._executor.submit(self._publish, content, account, future, attempt)
+            except RuntimeError as e:
+                self._done_sending()
+                future.set_exception(e)
+    
+    def _done_sending(self):
+        with self._ready:
+            self._sending -= 1
+            self._ready.notify()
+    
+    def _requeue(self, content, account, future, attempt):
+        """Remet un post refusé (429) en tête de la file de son compte, sans bloquer le worker"""
+        with self._ready:
+            if self._discard:
+                future.set_result(False)
+                return
+            self._pending.setdefault(account, deque()).appendleft((content, future, attempt, time.monotonic()))
+            self._pending.move_to_end(account, last=False)
+            self._ready.notify()
+    
+    def _publish(self, content, account, future, attempt):
+        try:
+            self._send(content, account, future, attempt)
+        finally:
+            self._done_sending()
+    
+    def _send(self, content, account, future, attempt):
+        try:
+            published = bool(self.send(content))
+        except RateLimitedError as e:
+            # Quota côté plateforme plus strict que prévu : pause des seaux concernés, puis remise en file
+            self._count('rate_limited')
+            pause = e.retry_after or 1 / self.bucket.rate
+            for bucket in (self.bucket, self.account_bucket(account)):
+                if bucket:
+                    bucket.penalize(pause)
+            if attempt < self.rate_limit_retries:
+                self._requeue(content, account, future, attempt + 1)
+                return
+            published = False
+        except Exception as e:
+            self._count('failed')
+            future.set_exception(e)
+            return
+        self._count('published' if published else 'failed')
+        future.set_result(published)
+    
+    def shutdown(self, wait=True):
+        """Arrête la publication : wait=True termine d'abord les posts en file, sinon ils sont annulés"""
+        with self._ready:
+            self._closed = True
+            if not wait:
+                self._discard = True
+                for queue in self._pending.values():
+                    for _, future, _, _ in queue:
+                        # Déjà en cours (remis en file après un 429) : non annulable, résolu en échec
+                        if not future.cancel():
+                            future.set_result(False)
+                self._pending.clear()
+            self._ready.notify_all()
+            dispatcher = self._dispatcher
+        if dispatcher and wait:
+            dispatcher.join()
+        self._executor.shutdown(wait=wait)
+
+class HttpPlatformClient:
+    """
+    Envoi d'un post à l'API HTTP de publication : visuel éventuel via POST <base>/<plateforme>/media,
+    puis POST <base>/<plateforme>/posts avec le media_id obtenu
+    """
+    
+    def __init__(self, base_url, platform, timeout=None):
+        self.url = f"{base_url.rstrip('/')}/{platform}/posts"
+        self.media_url = f"{base_url.rstrip('/')}/{platform}/media"
+        self.timeout = timeout or PUBLISHING_CONFIG['timeout']
+        self._local = threading.local()
+    
+    def _session(self):
+        # Une session (pool de connexions keep-alive) par thread de publication
+        if not hasattr(self._local, 'session'):
+            self._local.session = requests.Session()
+        return self._local.session
+    
+    @staticmethod
+    def _check_rate_limit(response):
+        if response.status_code == 429:
+            retry_after = response.headers.get('Retry-After')
+            raise RateLimitedError(float(retry_after) if retry_after else None)
+    
+    def upload_media(self, media, account, key=None):
+        """Envoie le visuel encodé (octets bruts) et renvoie son media_id, None en cas d'échec"""
+        headers = {'Content-Type': media['mime_type'], 'X-Account': str(account)}
+        if key:
+            headers['Idempotency-Key'] = f"{key}:media"
+        response = self._session().post(self.media_url, data=media['buffer'].getvalue(), headers=headers,
+                                        timeout=self.timeout)
+        self._check_rate_limit(response)
+        return response.json().get('media_id') if response.ok else None
+    
+    def __call__(self, content):
+        # Même clé à chaque tentative : la plateforme ignore les doublons (envoi réussi mais réponse perdue)
+        key = content.get('idempotency_key') or content.get('post_id')
+        headers = {'Idempotency-Key': str(key)} if key else {}
+        payload = {
+            'account': content['gym']['id'],
+            'post_id': content.get('post_id'),
+            'type': content.get('type'),
+            'content': content['content']
+        }
+        if content.get('media'):
+            payload['media_id'] = self.upload_media(content['media'], payload['account'], key)
+            if not payload['media_id']:
+                return False
+        response = self._session().post(self.url, timeout=self.timeout, headers=headers, json=payload)
+        self._check_rate_limit(response)
+        return response.ok
+
+class PublishingGateway:
+    """Point d'entrée des publications : une file et des quotas par plateforme"""
+    
+    def __init__(self, senders=None, config=None):
+        """senders : {plateforme: callable(content) → bool} ; par défaut client HTTP sur api_base_url"""
+        self.config = config or PUBLISHING_CONFIG
+        if senders is None:
+            senders = {
+                platform: HttpPlatformClient(self.config['api_base_url'], platform, self.config['timeout'])
+                for platform in self.config['platforms']
+            }
+        
+        self.publishers = {}
+        for platform, send in senders.items():
+            quotas = self.config['platforms'].get(platform)
+            if not quotas:
+                continue
+            self.publishers[platform] = PlatformPublisher(
+                platform, send, max_queue=self.config['max_queue'], queue_timeout=self.config['queue_timeout'],
+                rate_limit_retries=self.config['rate_limit_retries'], **quotas
+            )
+    
+    def __contains__(self, platform):
+        return platform in self.publishers
+    
+    def submit(self, content):
+        """Publication asynchrone (compte = salle du post) ; renvoie un Future"""
+        return self.publishers[content['platform']].submit(content, account=content['gym']['id'])
+    
+    def publish(self, content, timeout=None):
+        """Publication en attendant son tour dans la file de la plateforme"""
+        return self.submit(content).result(timeout)
+    
+    def stats(self):
+        return {platform: dict(publisher.stats) for platform, publisher in self.publishers.items()}
+    
+    def shutdown(self, wait=True):
+        for publisher in self.publishers.values():
+            publisher.shutdown(wait)
+
+def scaled_config(speedup, config=None):
+    """Copie de la config avec des quotas multipliés (benchmarks en accéléré)"""
+    config = copy.deepcopy(config or PUBLISHING_CONFIG)
+    for quotas in config['platforms'].values():
+        quotas['rate_per_minute'] *= speedup
+        quotas['account_rate_per_minute'] *= speedup
+    return config
+
+def benchmark_publishing(n=400, speedup=60, accounts=50):
+    """
+    Charge le serveur de plateformes factice avec n publications, sans limiteur puis
+    via PublishingGateway ; quotas du serveur et du client = PUBLISHING_CONFIG × speedup
+    """
+    from mock_platform_server import start_mock_platform_server
+    
+    config = scaled_config(speedup)
+    server = start_mock_platform_server(port=0, config=config)
+    config['api_base_url'] = f"http://127.0.0.1:{server.server_port}"
+    platforms = list(config['platforms'])
+    
+    def make_posts(prefix):
+        # Clés d'idempotence distinctes par passe : sinon le serveur rejoue les posts de la précédente
+        return [
+            {'gym': {'id': i % accounts}, 'platform': platforms[i % len(platforms)], 'type': 'benchmark',
+             'post_id': f"{prefix}-{i}", 'content': f"Publication de test #{i}"}
+            for i in range(n)
+        ]
+    
+    quota = sum(q['rate_per_minute'] for q in config['platforms'].values()) / 60
+    print(f"📤 Benchmark publication: {n} posts, {len(platforms)} plateformes, {accounts} comptes "
+          f"(quota cumulé {quota:.0f} posts/s)")
+    results = {}
+    
+    try:
+        # Sans limiteur : tout part en parallèle, la plateforme renvoie des 429
+        clients = {platform: HttpPlatformClient(config['api_base_url'], platform) for platform in platforms}
+        
+        def send_direct(post):
+            try:
+                return clients[post['platform']](post)
+            except RateLimitedError:
+                return False
+        
+        start = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=32) as executor:
+            accepted = sum(executor.map(send_direct, make_posts('direct')))
+        elapsed = time.perf_counter() - start
+        results['direct'] = {'accepted': accepted, 'rejected': n - accepted, 'elapsed_s': elapsed}
+        print(f"   Sans limiteur: {accepted}/{n} acceptés, {n - accepted} rejetés (429) en {elapsed:.1f}s")
+        
+        # Via la passerelle : quotas respectés côté client
+        # (seaux du serveur vidés par la première passe : on les laisse se remplir)
+        time.sleep(max(max(q['burst'] / q['rate_per_minute'], q['account_burst'] / q['account_rate_per_minute']) * 60
+                       for q in config['platforms'].values()))
+        gateway = PublishingGateway(config=config)
+        posts = make_posts('gateway')
+        start = time.perf_counter()
+        futures = [gateway.submit(post) for post in posts]
+        published = sum(future.result() for future in futures)
+        elapsed = time.perf_counter() - start
+        gateway.shutdown()
+        rate_limited = sum(s['rate_limited'] for s in gateway.stats().values())
+        results['gateway'] = {'published': published, 'rate_limited': rate_limited, 'elapsed_s': elapsed,
+                              'per_s': published / elapsed}
+        print(f"   Avec limiteur: {published}/{n} publiés en {elapsed:.1f}s "
+              f"({published / elapsed:.1f} posts/s), {rate_limited} réponses 429")
+        for platform, stats in gateway.stats().items():
+            print(f"     {platform}: {stats['published']} publiés, "
+                  f"attente en file (quotas) cumulée {stats['throttled_s']:.1f}s")
+        
+        # Rejeu des mêmes clés d'idempotence (réponses perdues) : aucun doublon côté plateforme
+        replay = posts[:max(1, n // 10)]
+        with ThreadPoolExecutor(max_workers=8) as executor:
+            list(executor.map(send_direct, replay))
+        with server.RequestHandlerClass.lock:
+            replayed = sum(s['replayed'] for s in server.RequestHandlerClass.stats.values())
+        results['replayed'] = replayed
+        print(f"   Rejeu de {len(replay)} posts (mêmes clés): {replayed} réponses rejouées, aucun doublon publié")
+    finally:
+        server.shutdown()
+    return results
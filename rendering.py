@@ -0,0 +1,295 @@
+"""
+Apollo Rendering
+Visuels de marque : polices et fonds pré-rendus en cache, fichiers adressés par contenu,
+rendu en lot sur un pool de processus
+"""
+
+import hashlib
+import io
+import json
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+from functools import lru_cache
+
+from PIL import Image, ImageDraw, ImageFont, ImageOps
+
+from config import APOLLO_BRAND, CONTENT_CONFIG, RENDER_CONFIG
+from asset_dedup import get_asset_index
+
+IMAGE_MIME_TYPES = {'JPEG': 'image/jpeg', 'WEBP': 'image/webp', 'PNG': 'image/png'}
+
+# À incrémenter quand le rendu change : les anciens fichiers ne sont plus réutilisés
+RENDER_VERSION = 1
+
+@lru_cache(maxsize=32)
+def get_font(size=None, family='primary'):
+    """Police de marque si installée, sinon première police candidate disponible"""
+    size = size or RENDER_CONFIG['font_size']
+    brand_font = APOLLO_BRAND['fonts'].get(family, family)
+    candidates = [f"{brand_font}-Bold.ttf", f"{brand_font}.ttf"] + RENDER_CONFIG['font_candidates']
+    
+    for candidate in candidates:
+        try:
+            return ImageFont.truetype(candidate, size)
+        except OSError:
+            continue
+    
+    try:
+        return ImageFont.load_default(size)
+    except TypeError:
+        # Pillow < 10.1 : police bitmap sans taille
+        return ImageFont.load_default()
+
+@lru_cache(maxsize=64)
+def get_background(color, size):
+    """Fond de marque pré-rendu (couleur + bandeau accent), copié avant chaque dessin"""
+    width, height = size
+    background = Image.new('RGB', size, color)
+    draw = ImageDraw.Draw(background)
+    band = max(4, height // 90)
+    draw.rectangle((0, height - band, width, height), fill=APOLLO_BRAND['colors']['accent'])
+    return background
+
+def _wrap_text(draw, text, font, max_width):
+    """Découpe le texte en lignes tenant dans max_width pixels"""
+    lines = []
+    for paragraph in text.split('\n'):
+        current = ''
+        for word in paragraph.split():
+            candidate = f"{current} {word}".strip()
+            if current and draw.textlength(candidate, font=font) > max_width:
+                lines.append(current)
+                current = word
+            else:
+                current = candidate
+        lines.append(current)
+    return '\n'.join(lines)
+
+def render_branded_image(text, background_color=None, size=None, text_area=None, background=None):
+    """
+    Image de marque (PIL) : texte centré sur le fond de la couleur demandée.
+    text_area : (largeur, hauteur) centrale où le texte doit tenir (police réduite si besoin)
+    background : image de fond (photo de stock...) recadrée et teintée aux couleurs de la marque
+    """
+    background_color = background_color or APOLLO_BRAND['colors']['primary']
+    size = tuple(size or RENDER_CONFIG['canvas_size'])
+    width, height = size
+    area_width, area_height = text_area or size
+    
+    if background is not None:
+        photo = ImageOps.fit(background.convert('RGB'), size, method=Image.Resampling.BILINEAR)
+        img = Image.blend(photo, get_background(background_color, size), RENDER_CONFIG['background_tint'])
+    else:
+        img = get_background(background_color, size).copy()
+    draw = ImageDraw.Draw(img)
+    font_size = max(16, RENDER_CONFIG['font_size'] * min(size) // 1080)
+    
+    while True:
+        font = get_font(font_size)
+        wrapped = _wrap_text(draw, text, font, area_width * RENDER_CONFIG['text_width_ratio'])
+        left, top, right, bottom = draw.multiline_textbbox((0, 0), wrapped, font=font, align='center')
+        if bottom - top <= area_height * 0.9 or font_size <= 16:
+            break
+        font_size = max(16, int(font_size * 0.85))
+    text = wrapped
+    
+    x = (width - (right - left)) // 2 - left
+    y = (height - (bottom - top)) // 2 - top
+    draw.multiline_text((x, y), text, fill=RENDER_CONFIG['text_color'], font=font, align='center')
+    return img
+
+def image_key(text, background_color=None, size=None):
+    """Empreinte du visuel : même texte/couleur/taille → même fichier"""
+    payload = json.dumps({
+        'text': text,
+        'color': background_color or APOLLO_BRAND['colors']['primary'],
+        'size': list(size or RENDER_CONFIG['canvas_size']),
+        'version': RENDER_VERSION
+    }, sort_keys=True, ensure_ascii=False)
+    return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+def image_path(key, output_dir=None, extension='png'):
+    """Chemin adressé par contenu : <output_dir>/<h[:2]>/<h>.png"""
+    return os.path.join(output_dir or RENDER_CONFIG['output_dir'], key[:2], f"{key}.{extension}")
+
+def render_to_file(text, background_color=None, size=None, output_dir=None):
+    """Rend le visuel s'il n'existe pas déjà (même à l'identique perceptuel) et renvoie son chemin"""
+    key = image_key(text, background_color, size)
+    path = image_path(key, output_dir)
+    if os.path.exists(path):
+        return path
+    
+    index = get_asset_index()
+    if index:
+        alias = index.resolve_alias(key)
+        if alias:
+            return alias
+    
+    img = render_branded_image(text, background_color, size)
+    
+    # Visuel quasi identique déjà stocké : ni encodage ni nouveau fichier
+    if index:
+        existing = index.find(img)
+        if existing:
+            index.record_duplicate(existing, 'branded', key)
+            return existing
+    
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    # Écriture atomique : deux rendus concurrents du même visuel ne se corrompent pas
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    img.save(tmp_path, format='PNG')
+    os.replace(tmp_path, path)
+    if index:
+        index.add(path, img, kind='branded')
+    return path
+
+def _render_job(job):
+    return render_to_file(*job)
+
+def _warm_worker():
+    """Préchauffe polices et fonds de marque dans chaque processus du pool"""
+    get_font()
+    for color in APOLLO_BRAND['colors'].values():
+        get_background(color, tuple(RENDER_CONFIG['canvas_size']))
+
+def render_batch(items, max_workers=None, output_dir=None):
+    """
+    Rend un lot de visuels sur un pool de processus.
+    items : textes ou tuples (texte, couleur[, taille]) ; renvoie les chemins dans l'ordre.
+    """
+    jobs = []
+    for item in items:
+        text, color, size = (item, None, None) if isinstance(item, str) else (tuple(item) + (None, None))[:3]
+        jobs.append((text, color, size, output_dir))
+    
+    if not jobs:
+        return []
+    
+    workers = min(max_workers or RENDER_CONFIG['workers'], len(jobs))
+    if workers <= 1:
+        return [_render_job(job) for job in jobs]
+    
+    chunksize = max(1, len(jobs) // (workers * 4))
+    with ProcessPoolExecutor(max_workers=workers, initializer=_warm_worker) as executor:
+        return list(executor.map(_render_job, jobs, chunksize=chunksize))
+
+def master_size(platforms=None):
+    """Taille du rendu unique : la plus grande largeur et hauteur des plateformes visées"""
+    sizes = [CONTENT_CONFIG['platforms'][p]['image_size'] for p in platforms or image_platforms()]
+    return max(w for w, _ in sizes), max(h for _, h in sizes)
+
+def image_platforms():
+    return [p for p, config in CONTENT_CONFIG['platforms'].items() if 'image_size' in config]
+
+def safe_text_area(size, platforms=None):
+    """Zone centrale du rendu conservée par le recadrage de toutes les plateformes"""
+    width, height = size
+    area_width, area_height = width, height
+    for platform in platforms or image_platforms():
+        target_w, target_h = CONTENT_CONFIG['platforms'][platform]['image_size']
+        scale = max(target_w / width, target_h / height)  # ImageOps.fit : recadrage centré
+        area_width = min(area_width, target_w / scale)
+        area_height = min(area_height, target_h / scale)
+    return int(area_width), int(area_height)
+
+def encode_image(img, image_format='JPEG', max_bytes=None):
+    """
+    Encode en mémoire en cherchant la meilleure qualité sous max_bytes (recherche dichotomique).
+    Renvoie (BytesIO, qualité) ; qualité minimale si la cible est inatteignable.
+    """
+    def encode(quality):
+        buffer = io.BytesIO()
+        options = {'optimize': True} if image_format == 'JPEG' else {'method': 4}
+        img.save(buffer, format=image_format, quality=quality, **options)
+        return buffer
+    
+    low, high = RENDER_CONFIG['min_quality'], RENDER_CONFIG['max_quality']
+    best = encode(high)
+    if not max_bytes or best.getbuffer().nbytes <= max_bytes:
+        best.seek(0)
+        return best, high
+    
+    best, best_quality = None, low
+    while low <= high:
+        quality = (low + high) // 2
+        buffer = encode(quality)
+        if buffer.getbuffer().nbytes <= max_bytes:
+            best, best_quality = buffer, quality
+            low = quality + 1
+        else:
+            high = quality - 1
+    
+    if best is None:
+        best = encode(best_quality)
+    best.seek(0)
+    return best, best_quality
+
+def render_platform_variants(text, background_color=None, platforms=None):
+    """
+    Rend le visuel une seule fois à la taille maximale puis dérive chaque plateforme
+    par recadrage/redimensionnement, encodée en mémoire sous sa taille cible.
+    Renvoie {plateforme: {'buffer', 'format', 'mime_type', 'size', 'bytes', 'quality', 'within_target'}}.
+    """
+    platforms = [p for p in platforms or image_platforms() if 'image_size' in CONTENT_CONFIG['platforms'][p]]
+    if not platforms:
+        return {}
+    
+    size = master_size(platforms)
+    master = render_branded_image(text, background_color, size, safe_text_area(size, platforms))
+    
+    variants = {}
+    for platform in platforms:
+        config = CONTENT_CONFIG['platforms'][platform]
+        target = tuple(config['image_size'])
+        image = master if target == size else ImageOps.fit(master, target, method=Image.Resampling.BILINEAR)
+        image_format = config.get('image_format', 'JPEG')
+        buffer, quality = encode_image(image, image_format, config.get('max_image_bytes'))
+        variants[platform] = {
+            'buffer': buffer,
+            'format': image_format,
+            'mime_type': IMAGE_MIME_TYPES[image_format],
+            'size': target,
+            'bytes': buffer.getbuffer().nbytes,
+            'quality': quality,
+            'within_target': buffer.getbuffer().nbytes <= config.get('max_image_bytes', float('inf'))
+        }
+    return variants
+
+def benchmark_rendering(n=500, max_workers=None, output_dir='data/images/benchmark'):
+    """Mesure le débit de rendu (visuels/minute), séquentiel puis en pool de processus"""
+    colors = list(APOLLO_BRAND['colors'].values())
+    items = [(f"Apollo Sporting Club\nVisuel #{i}", colors[i % len(colors)]) for i in range(n)]
+    
+    print(f"🎨 Benchmark rendu: {n} visuels")
+    results = {}
+    
+    start = time.perf_counter()
+    for text, color in items[:max(1, n // 10)]:
+        render_branded_image(text, color).save(os.devnull, format='PNG')
+    elapsed = time.perf_counter() - start
+    results['sequential_per_min'] = max(1, n // 10) / elapsed * 60
+    print(f"   Séquentiel (sans écriture): {results['sequential_per_min']:.0f} visuels/min")
+    
+    start = time.perf_counter()
+    render_batch(items, max_workers, output_dir)
+    elapsed = time.perf_counter() - start
+    results['pool_per_min'] = n / elapsed * 60
+    print(f"   Pool de processus: {results['pool_per_min']:.0f} visuels/min ({elapsed:.1f}s)")
+    
+    start = time.perf_counter()
+    render_batch(items, max_workers, output_dir)
+    elapsed = time.perf_counter() - start
+    results['cached_per_min'] = n / elapsed * 60
+    print(f"   Déjà rendus (adressage par contenu): {results['cached_per_min']:.0f} visuels/min")
+    
+    # Déclinaisons plateformes en mémoire (un rendu, N encodages)
+    count = max(1, n // 10)
+    start = time.perf_counter()
+    for text, color in items[:count]:
+        variants = render_platform_variants(text, color)
+    elapsed = time.perf_counter() - start
+    results['variants_per_min'] = count / elapsed * 60
+    sizes = ', '.join(f"{p} {v['bytes'] // 1024} Ko (q{v['quality']})" for p, v in variants.items())
+    print(f"   Déclinaisons plateformes: {results['variants_per_min']:.0f} visuels/min [{sizes}]")
+    return results
@@ -0,0 +1,98 @@
+"""
+Apollo AI Resilience
+Disjoncteur par provider IA et suivi des latences pour les requêtes couvertes (hedging)
+"""
+
+import threading
+import time
+from collections import deque
+
+class CircuitBreaker:
+    """
+    Disjoncteur classique : fermé → ouvert après N échecs consécutifs,
+    puis semi-ouvert après reset_timeout (une seule requête d'essai)
+    """
+    CLOSED = 'closed'
+    OPEN = 'open'
+    HALF_OPEN = 'half_open'
+    
+    def __init__(self, name, failure_threshold=5, reset_timeout=60):
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        
+        self.state = self.CLOSED
+        self.consecutive_failures = 0
+        self.opened_at = None
+        self.trips = 0
+        self._probe_in_flight = False
+        self._lock = threading.Lock()
+    
+    def allow_request(self):
+        """Indique si une requête peut partir vers ce provider"""
+        with self._lock:
+            if self.state == self.CLOSED:
+                return True
+            
+            if self.state == self.OPEN:
+                if time.monotonic() - self.opened_at < self.reset_timeout:
+                    return False
+                self.state = self.HALF_OPEN
+                self._probe_in_flight = False
+            
+            # Semi-ouvert : une seule requête d'essai à la fois
+            if self._probe_in_flight:
+                return False
+            self._probe_in_flight = True
+            return True
+    
+    def record_success(self):
+        with self._lock:
+            self.state = self.CLOSED
+            self.consecutive_failures = 0
+            self._probe_in_flight = False
+    
+    def record_failure(self):
+        with self._lock:
+            self.consecutive_failures += 1
+            self._probe_in_flight = False
+            if self.state == self.HALF_OPEN or self.consecutive_failures >= self.failure_threshold:
+                if self.state != self.OPEN:
+                    self.trips += 1
+                self.state = self.OPEN
+                self.opened_at = time.monotonic()
+    
+    def release(self):
+        """Requête abandonnée sans verdict (ex: streaming annulé)"""
+        with self._lock:
+            self._probe_in_flight = False
+    
+    def snapshot(self):
+        with self._lock:
+            return {
+                'state': self.state,
+                'consecutive_failures': self.consecutive_failures,
+                'trips': self.trips
+            }
+
+class LatencyTracker:
+    """Fenêtre glissante des dernières latences (secondes) d'un provider"""
+    
+    def __init__(self, window=200):
+        self._samples = deque(maxlen=window)
+        self._lock = threading.Lock()
+    
+    def observe(self, seconds):
+        with self._lock:
+            self._samples.append(seconds)
+    
+    def __len__(self):
+        return len(self._samples)
+    
+    def percentile(self, p):
+        with self._lock:
+            samples = sorted(self._samples)
+        if not samples:
+            return None
+        index = min(len(samples) - 1, int(round(p / 100 * (len(samples) - 1))))
+        return samples[index]
@@ -4,75 +4,404 @@ Automatisation intelligente des publications et des workflows marketing
 """
 
 import schedule
+import os
+import random
+import tempfile
 import time
 import json
 from datetime import datetime, timedelta
-from threading import Thread
+from threading import Event, Lock, Thread
 import requests
 from apscheduler.schedulers.background import BackgroundScheduler
 from apscheduler.triggers.cron import CronTrigger
+from apscheduler.executors.pool import ThreadPoolExecutor
+from apscheduler.jobstores.memory import MemoryJobStore
+from apscheduler.jobstores.sqlalchemy import SQLAlchemyJobStore
+from sqlalchemy import event, select
 
 from config import (
-    APOLLO_GYMS, AUTOMATION_CONFIG, SOCIAL_MEDIA_CONFIG,
-    CONTENT_CONFIG
+    AUTOMATION_CONFIG, SOCIAL_MEDIA_CONFIG,
+    CONTENT_CONFIG, SCHEDULER_CONFIG, PUBLISHING_CONFIG
 )
 from content_generator import ApolloContentGenerator
+from content_repository import get_content_repository
+from content_store import get_content_log
+from gym_registry import UnknownGymError
+from metrics import PUBLISH_METRICS
+from publishing import PublishingGateway
+
+DAY_MAPPING = {
+    'monday': 0, 'tuesday': 1, 'wednesday': 2,
+    'thursday': 3, 'friday': 4, 'saturday': 5, 'sunday': 6
+}
+
+def _sqlite_pragmas(connection, _):
+    cursor = connection.cursor()
+    cursor.execute("PRAGMA journal_mode=WAL")
+    cursor.execute("PRAGMA synchronous=NORMAL")
+    cursor.close()
+
+def build_job_store(url=None):
+    """Job store SQL persistant (créé au démarrage du scheduler)"""
+    url = url or SCHEDULER_CONFIG['jobstore_url']
+    jobstore = SQLAlchemyJobStore(url=url, tablename=SCHEDULER_CONFIG['jobstore_table'])
+    if url.startswith('sqlite:///'):
+        directory = os.path.dirname(url[len('sqlite:///'):])
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        # WAL : un commit par job ajouté sans fsync bloquant à chaque fois
+        event.listen(jobstore.engine, 'connect', _sqlite_pragmas)
+    return jobstore
+
+def build_background_scheduler(jobstore, workers=10):
+    """
+    Jobs persistés dans le store 'default' (fonctions de module uniquement) ;
+    jobs récurrents internes recréés à chaque démarrage dans le store 'memory'
+    """
+    return BackgroundScheduler(
+        jobstores={'default': jobstore, 'memory': MemoryJobStore()},
+        executors={'default': ThreadPoolExecutor(workers)},
+        job_defaults={
+            'coalesce': SCHEDULER_CONFIG['coalesce'],
+            'misfire_grace_time': SCHEDULER_CONFIG['misfire_grace_time'],
+            'max_instances': SCHEDULER_CONFIG['max_instances']
+        }
+    )
+
+def stored_job_ids(jobstore):
+    """IDs des jobs persistés, sans désérialiser les jobs"""
+    with jobstore.engine.connect() as connection:
+        return {row[0] for row in connection.execute(select(jobstore.jobs_t.c.id))}
+
+# Scheduler en cours d'exécution : cible des jobs persistés
+_active_scheduler = None
+
+def slot_occurrences(start, end, posting_schedule=None):
+    """Créneaux du planning compris dans [start, end[ : liste triée de (datetime, plateforme, type)"""
+    posting_schedule = posting_schedule or AUTOMATION_CONFIG['posting_schedule']
+    occurrences = []
+    day = start.replace(hour=0, minute=0, second=0, microsecond=0)
+    while day < end:
+        for day_name, posts in posting_schedule.items():
+            if DAY_MAPPING[day_name] != day.weekday():
+                continue
+            for post_config in posts:
+                hour, minute = post_config['time'].split(':')
+                slot = day.replace(hour=int(hour), minute=int(minute))
+                if start <= slot < end:
+                    occurrences.append((slot, post_config['platform'], post_config['type']))
+        day += timedelta(days=1)
+    return sorted(occurrences)
+
+def run_posting_slot(platform, post_type):
+    """Job persistant : un créneau du planning, publié pour toutes les salles"""
+    if _active_scheduler is None:
+        print(f"⚠️ Aucun scheduler actif pour le créneau {platform} - {post_type}")
+        return
+    _active_scheduler.post_slot(platform, post_type)
+
+def run_auto_post(gym_id, platform, post_type, custom_prompt=None):
+    """Job persistant : post personnalisé"""
+    if _active_scheduler is None:
+        print(f"⚠️ Aucun scheduler actif pour le post {platform} - Gym {gym_id}")
+        return
+    _active_scheduler.auto_post(gym_id, platform, post_type, custom_prompt)
+
+def run_retry_publish(post_id, attempt):
+    """Job persistant : nouvelle tentative de publication d'un post déjà généré"""
+    if _active_scheduler is None:
+        print(f"⚠️ Aucun scheduler actif pour la tentative {attempt} du post {post_id}")
+        return
+    _active_scheduler.retry_publish(post_id, attempt)
+
+def retry_delay(attempt):
+    """Backoff exponentiel avec gigue complète : délai aléatoire dans [0, min(max, base × 2^(n-1))] (secondes)"""
+    ceiling = min(SCHEDULER_CONFIG['retry_max_minutes'], SCHEDULER_CONFIG['retry_base_minutes'] * 2 ** (attempt - 1))
+    return random.uniform(0, ceiling * 60)
 
 class ApolloScheduler:
-    def __init__(self):
-        self.scheduler = BackgroundScheduler()
-        self.content_generator = ApolloContentGenerator()
-        self.scheduled_posts = []
+    def __init__(self, jobstore_url=None, content_generator=None):
+        # Générateur partagé possible (CLI, dashboard) : fermé par stop() seulement s'il est créé ici
+        self._owns_generator = content_generator is None
+        self.content_generator = content_generator or ApolloContentGenerator()
+        # Assez de threads pour occuper tous les serveurs IA disponibles
+        workers = max(10, self.content_generator.get_concurrency_limit())
+        self.jobstore = build_job_store(jobstore_url)
+        self.scheduler = build_background_scheduler(self.jobstore, workers)
+        self.content_repository = get_content_repository()
+        # Quotas et workers par plateforme : API HTTP si configurée, sinon méthodes publish_*
+        senders = None if PUBLISHING_CONFIG['api_base_url'] else {
+            'instagram': self.publish_instagram,
+            'facebook': self.publish_facebook,
+            'linkedin': self.publish_linkedin,
+            'tiktok': self.publish_tiktok
+        }
+        self.publisher = PublishingGateway(senders)
+        self._sent_keys = set()  # clés d'idempotence reçues par les envois simulés
+        self._sent_lock = Lock()
+        # Posts de créneau en cours de génération (pré-génération ou créneau) : (créneau, plateforme, type, salle) → Event
+        self._inflight = {}
+        self._inflight_lock = Lock()
         self.auto_responses_active = True
         self.lead_workflows_active = True
         
     def start(self):
-        """Démarre le scheduler"""
+        """Démarre le scheduler (les jobs persistés reprennent là où ils en étaient)"""
+        global _active_scheduler
+        _active_scheduler = self
+        
+        # En pause le temps d'aligner le planning sur le store, puis exécution
+        # des jobs manqués pendant l'arrêt (regroupés, dans la limite de misfire_grace_time)
+        self.scheduler.start(paused=True)
         self.setup_automatic_posting()
+        self.setup_pregeneration()
         self.setup_lead_workflows()
         self.setup_performance_monitoring()
-        
-        self.scheduler.start()
+        self.scheduler.resume()
         print("🚀 Apollo Scheduler démarré!")
         
     def stop(self):
         """Arrête le scheduler"""
-        self.scheduler.shutdown()
+        if self.scheduler.running:
+            self.scheduler.shutdown()
+        self.publisher.shutdown()
+        if self._owns_generator:
+            self.content_generator.close()
         print("⏹️ Apollo Scheduler arrêté!")
     
     def setup_automatic_posting(self):
-        """Configure la publication automatique selon le planning"""
+        """
+        Un job par créneau du planning, quel que soit le nombre de salles.
+        Seuls les jobs absents du store sont créés et ceux qui ne figurent plus
+        au planning supprimés (redémarrage instantané)
+        """
         posting_schedule = AUTOMATION_CONFIG['posting_schedule']
         
+        # L'ID décrit entièrement le job : un changement de planning donne un nouvel ID
+        wanted = {}
         for day, posts in posting_schedule.items():
             for post_config in posts:
-                # Planification pour chaque salle Apollo
-                for gym in APOLLO_GYMS:
-                    job_id = f"{day}_{post_config['time']}_{gym['id']}_{post_config['platform']}"
-                    
-                    # Conversion du jour en format cron
-                    day_mapping = {
-                        'monday': 0, 'tuesday': 1, 'wednesday': 2,
-                        'thursday': 3, 'friday': 4, 'saturday': 5, 'sunday': 6
-                    }
-                    
-                    hour, minute = post_config['time'].split(':')
-                    
-                    self.scheduler.add_job(
-                        func=self.auto_post,
-                        trigger=CronTrigger(
-                            day_of_week=day_mapping[day],
-                            hour=int(hour),
-                            minute=int(minute)
-                        ),
-                        args=[gym['id'], post_config['platform'], post_config['type']],
-                        id=job_id,
-                        replace_existing=True
-                    )
-        
-        print(f"📅 {len(self.scheduler.get_jobs())} publications automatiques programmées")
-    
-    def auto_post(self, gym_id, platform, post_type):
+                job_id = f"slot_{day}_{post_config['time']}_{post_config['platform']}_{post_config['type']}"
+                wanted[job_id] = (day, post_config)
+        
+        stored = stored_job_ids(self.jobstore)
+        for job_id in stored:
+            # Anciens jobs par salle ('post_') et créneaux retirés du planning
+            if job_id.startswith(('post_', 'slot_')) and job_id not in wanted:
+                self.scheduler.remove_job(job_id, jobstore='default')
+        
+        added = 0
+        for job_id, (day, post_config) in wanted.items():
+            if job_id in stored:
+                continue
+            hour, minute = post_config['time'].split(':')
+            self.scheduler.add_job(
+                func=run_posting_slot,
+                trigger=CronTrigger(
+                    day_of_week=DAY_MAPPING[day],
+                    hour=int(hour),
+                    minute=int(minute)
+                ),
+                args=[post_config['platform'], post_config['type']],
+                id=job_id,
+                jobstore='default',
+                replace_existing=True
+            )
+            added += 1
+        
+        print(f"📅 {len(wanted)} créneaux de publication programmés pour "
+              f"{len(self.content_generator.gyms)} salles ({added} nouveaux)")
+    
+    def setup_pregeneration(self):
+        """
+        Remplit régulièrement la file des posts prêts pour les créneaux à venir.
+        Premier passage après pregeneration_start_delay_minutes : les créneaux proches
+        sont couverts par la génération à la volée, les posts déjà en base sont ignorés.
+        """
+        delay = timedelta(minutes=SCHEDULER_CONFIG['pregeneration_start_delay_minutes'])
+        self.scheduler.add_job(
+            func=self.pregenerate_upcoming_posts,
+            trigger='interval',
+            minutes=SCHEDULER_CONFIG['pregeneration_interval_minutes'],
+            next_run_time=datetime.now() + delay,
+            id='pregenerate_posts',
+            jobstore='memory',
+            replace_existing=True
+        )
+    
+    def _begin_inflight(self, keys):
+        """Marque des posts de créneau comme en cours de génération ; renvoie ceux qui ne l'étaient pas déjà"""
+        with self._inflight_lock:
+            fresh = [key for key in keys if key not in self._inflight]
+            for key in fresh:
+                self._inflight[key] = Event()
+        return fresh
+    
+    def _end_inflight(self, key):
+        with self._inflight_lock:
+            event = self._inflight.pop(key, None)
+        if event:
+            event.set()
+    
+    def wait_for_inflight(self, keys, timeout=None):
+        """Attend la fin des générations en cours de ces posts de créneau ; False si le délai expire"""
+        with self._inflight_lock:
+            events = [self._inflight[key] for key in keys if key in self._inflight]
+        if not events:
+            return True
+        deadline = time.monotonic() + (timeout or SCHEDULER_CONFIG['pregeneration_wait_seconds'])
+        return all(event.wait(max(0.0, deadline - time.monotonic())) for event in events)
+    
+    def expire_stale_posts(self):
+        """Expire les posts prêts de créneaux passés qui n'ont jamais été publiés"""
+        before = datetime.now() - timedelta(minutes=SCHEDULER_CONFIG['pregeneration_expiry_minutes'])
+        expired = self.content_repository.expire_stale(before)
+        if expired:
+            print(f"🧹 {expired} posts pré-générés jamais publiés expirés")
+        return expired
+    
+    def pregenerate_upcoming_posts(self, hours=None):
+        """
+        Génère à l'avance (statut 'ready') les posts des créneaux des prochaines heures
+        qui n'en ont pas encore : la génération ne bloque plus l'heure de publication
+        """
+        hours = hours or SCHEDULER_CONFIG['pregeneration_hours']
+        now = datetime.now()
+        gym_ids = self.content_generator.gyms.ids()
+        self.expire_stale_posts()
+        
+        keys = []
+        for slot, platform, post_type in slot_occurrences(now, now + timedelta(hours=hours)):
+            # Marqués en cours avant de vérifier la base : un créneau qui démarre attendra ces posts
+            fresh = self._begin_inflight([(slot.isoformat(), platform, post_type, gym_id) for gym_id in gym_ids])
+            covered = {post['gym']['id'] for post in self.content_repository.slot_posts(platform, post_type, slot)}
+            for key in fresh:
+                if key[3] in covered:
+                    self._end_inflight(key)
+                else:
+                    keys.append(key)
+        
+        if not keys:
+            return 0
+        
+        print(f"🌙 Pré-génération: {len(keys)} posts pour les {hours} prochaines heures")
+        batch_requests = [
+            {'gym_id': gym_id, 'platform': platform, 'post_type': post_type, 'bypass_cache': True}
+            for _, platform, post_type, gym_id in keys
+        ]
+        ready = 0
+        try:
+            for result in self.content_generator.iter_batch_content(batch_requests, SCHEDULER_CONFIG['fanout_workers']):
+                key = keys[result['index']]
+                content = result['content']
+                if not content:
+                    print(f"❌ Échec pré-génération (Gym {result['request']['gym_id']}): {result['error']}")
+                    self._end_inflight(key)
+                    continue
+                content['scheduled_for'] = key[0]
+                self.content_repository.add(content, status='ready')
+                self._end_inflight(key)
+                if content['platform'] == 'tiktok':
+                    self.render_video(content)
+                ready += 1
+        finally:
+            for key in keys:
+                self._end_inflight(key)
+        
+        print(f"✅ Pré-génération: {ready}/{len(keys)} posts prêts")
+        return ready
+    
+    def render_video(self, content):
+        """
+        Rendu en arrière-plan du clip TikTok d'un post pré-généré : la pré-génération
+        n'attend pas ffmpeg, le chemin est ajouté au post enregistré une fois le clip prêt
+        """
+        post_id = content['post_id']
+        
+        def attach(future):
+            if not future.cancelled() and not future.exception() and future.result():
+                self.content_repository.attach(post_id, video_path=future.result())
+        
+        self.content_generator.submit_tiktok_video(content).add_done_callback(attach)
+    
+    def current_slot(self, platform, post_type):
+        """Heure prévue du créneau en cours d'exécution (le job peut partir en retard)"""
+        now = datetime.now()
+        grace = timedelta(seconds=SCHEDULER_CONFIG['misfire_grace_time'] + 60)
+        slots = [slot for slot, slot_platform, slot_type in slot_occurrences(now - grace, now + timedelta(minutes=1))
+                 if (slot_platform, slot_type) == (platform, post_type)]
+        return slots[-1] if slots else now.replace(second=0, microsecond=0)
+    
+    def post_slot(self, platform, post_type, gym_ids=None, scheduled_for=None):
+        """
+        Publie un créneau pour toutes les salles : d'abord les posts pré-générés,
+        puis ceux des salles sans post prêt (génération en lot à concurrence bornée).
+        Publications espacées de publish_stagger_seconds.
+        """
+        scheduled_for = scheduled_for or self.current_slot(platform, post_type)
+        gym_ids = gym_ids or self.content_generator.gyms.ids()
+        slot_keys = [(scheduled_for.isoformat(), platform, post_type, gym_id) for gym_id in gym_ids]
+        
+        # Pré-génération de ce créneau en cours : on attend ses posts plutôt que de les générer une seconde fois
+        if not self.wait_for_inflight(slot_keys):
+            print(f"⏱️ Pré-génération du créneau {platform} - {post_type} toujours en cours: "
+                  f"ses posts seront publiés s'ils arrivent avant la fin du créneau")
+        
+        # Posts prêts réservés atomiquement : une autre exécution du créneau ne les publiera pas
+        claimed = {post['gym']['id']: post
+                   for post in self.content_repository.claim_ready(platform, post_type, scheduled_for, gym_ids)}
+        ready = [claimed[gym_id] for gym_id in gym_ids if gym_id in claimed]
+        # Salles déjà traitées pour ce créneau (redémarrage en cours de créneau) : ignorées
+        covered = {post['gym']['id'] for post in self.content_repository.slot_posts(platform, post_type, scheduled_for)}
+        missing_keys = self._begin_inflight([key for key in slot_keys if key[3] not in covered])
+        missing = [key[3] for key in missing_keys]
+        print(f"🤖 Créneau {platform} - {post_type} ({scheduled_for:%H:%M}): "
+              f"{len(ready)} posts prêts, {len(missing)} à générer")
+        
+        stagger = SCHEDULER_CONFIG['publish_stagger_seconds']
+        next_publish = time.monotonic()
+        published = 0
+        
+        def publish(content):
+            nonlocal next_publish, published
+            # Étalement des appels aux API des plateformes
+            delay = next_publish - time.monotonic()
+            if delay > 0:
+                time.sleep(delay)
+            next_publish = time.monotonic() + stagger
+            published += self.publish_generated(content)
+        
+        for content in ready:
+            publish(content)
+        
+        batch_requests = [
+            {'gym_id': gym_id, 'platform': platform, 'post_type': post_type, 'bypass_cache': True}
+            for gym_id in missing
+        ]
+        try:
+            for result in self.content_generator.iter_batch_content(batch_requests, SCHEDULER_CONFIG['fanout_workers']):
+                key = missing_keys[result['index']]
+                if not result['content']:
+                    print(f"❌ Échec génération contenu (Gym {result['request']['gym_id']}): {result['error']}")
+                    self._end_inflight(key)
+                    continue
+                result['content']['scheduled_for'] = scheduled_for.isoformat()
+                try:
+                    publish(result['content'])
+                finally:
+                    self._end_inflight(key)
+        finally:
+            for key in missing_keys:
+                self._end_inflight(key)
+        
+        # Posts pré-générés arrivés pendant le créneau (attente expirée) : publiés aussi
+        for content in self.content_repository.claim_ready(platform, post_type, scheduled_for, gym_ids):
+            publish(content)
+        
+        print(f"✅ Créneau {platform} - {post_type}: {published}/{len(ready) + len(missing)} posts publiés")
+        return published
+    
+    def auto_post(self, gym_id, platform, post_type, custom_prompt=None):
         """Génère et publie automatiquement un post"""
         print(f"🤖 Publication automatique: {platform} - {post_type} - Gym {gym_id}")
         
@@ -80,52 +409,131 @@ class ApolloScheduler:
         content = self.content_generator.generate_post_content(
             gym_id=gym_id,
             platform=platform,
-            post_type=post_type
+            post_type=post_type,
+            custom_prompt=custom_prompt,
+            bypass_cache=True  # jamais le texte d'un post déjà publié
         )
         
         if not content:
             print("❌ Échec génération contenu")
             return
         
+        self.publish_generated(content)
+    
+    def publish_generated(self, content, attempt=1):
+        """
+        Enregistre et publie un post déjà généré ; en cas d'échec, nouvelle tentative
+        du même contenu programmée avec backoff. La clé d'idempotence (post_id)
+        accompagne chaque envoi : un post déjà publié n'est jamais renvoyé.
+        """
+        platform = content['platform']
+        pregenerated = content.get('status') in ('ready', 'claimed')
+        idempotency_key = content.setdefault('idempotency_key', content['post_id'])
+        
+        # TikTok : le clip n'est rendu qu'en pré-génération, jamais sur le chemin de publication
+        if platform == 'tiktok' and not content.get('video_path'):
+            print(f"⚠️ Clip TikTok non prêt pour {content['post_id']}: publication du texte seul")
+        self.content_repository.add(content)
+        
+        previous = self.content_repository.begin_publish(idempotency_key, content['post_id'], platform)
+        if previous == 'published':
+            print(f"↩️ Post {content['post_id']} déjà publié sur {platform}: envoi ignoré")
+            self.content_repository.update_status(content['post_id'], 'published')
+            return True
+        if previous == 'pending':
+            # Autre tentative en cours (bail non expiré) : on repassera, elle aura publié ou expiré
+            print(f"⏳ Post {content['post_id']} déjà en cours de publication sur {platform}: envoi reporté")
+            self.schedule_retry(content['post_id'], attempt)
+            return False
+        if previous == 'stale':
+            print(f"♻️ Tentative interrompue du post {content['post_id']} reprise")
+        
         # Publication sur la plateforme
         success = self.publish_content(content)
+        self.content_repository.finish_publish(idempotency_key, 'published' if success else 'failed')
         
         if success:
             print(f"✅ Post publié avec succès sur {platform}")
+            self.content_repository.update_status(content['post_id'], 'published')
             self.log_posted_content(content)
+            if content.get('scheduled_for'):
+                PUBLISH_METRICS.observe(content['scheduled_for'], pregenerated=pregenerated)
         else:
             print(f"❌ Échec publication sur {platform}")
-            # Programmer une nouvelle tentative dans 30 minutes
-            retry_time = datetime.now() + timedelta(minutes=30)
-            self.scheduler.add_job(
-                func=self.auto_post,
-                trigger='date',
-                run_date=retry_time,
-                args=[gym_id, platform, post_type],
-                id=f"retry_{gym_id}_{platform}_{int(time.time())}"
-            )
+            self.content_repository.update_status(content['post_id'], 'failed')
+            self.schedule_retry(content['post_id'], attempt)
+        return success
+    
+    def schedule_retry(self, post_id, attempt):
+        """
+        Programme la tentative suivante (job persisté, un seul par post) ;
+        renvoie sa date, ou None une fois retry_max_attempts atteint
+        """
+        max_attempts = SCHEDULER_CONFIG['retry_max_attempts']
+        if attempt >= max_attempts:
+            print(f"🛑 Post {post_id} abandonné après {attempt} tentatives")
+            return None
+        
+        run_date = datetime.now() + timedelta(seconds=retry_delay(attempt))
+        self.scheduler.add_job(
+            func=run_retry_publish,
+            trigger='date',
+            run_date=run_date,
+            args=[post_id, attempt + 1],
+            id=f"retry_{post_id}",
+            jobstore='default',
+            replace_existing=True
+        )
+        print(f"🔁 Tentative {attempt + 1}/{max_attempts} du post {post_id} programmée à {run_date:%H:%M:%S}")
+        return run_date
+    
+    def retry_publish(self, post_id, attempt):
+        """Republie le contenu enregistré d'un post en échec (sans nouvelle génération)"""
+        content = self.content_repository.get(post_id)
+        if content is None:
+            print(f"❌ Post {post_id} introuvable: nouvelle tentative annulée")
+            return False
+        if content['status'] == 'published':
+            return True
+        
+        print(f"🔁 Tentative {attempt}: {content['platform']} - {content['gym']['name']} ({post_id})")
+        return self.publish_generated(content, attempt)
     
     def publish_content(self, content):
-        """Publie le contenu sur la plateforme spécifiée"""
+        """Publie le contenu sur la plateforme spécifiée (file et quotas de la plateforme)"""
         platform = content['platform']
         
         try:
-            if platform == 'instagram':
-                return self.publish_instagram(content)
-            elif platform == 'facebook':
-                return self.publish_facebook(content)
-            elif platform == 'linkedin':
-                return self.publish_linkedin(content)
-            elif platform == 'tiktok':
-                return self.publish_tiktok(content)
-            else:
+            if platform not in self.publisher:
                 print(f"⚠️ Plateforme non supportée: {platform}")
                 return False
-                
+            
+            # Visuel à la taille et au poids cibles de la plateforme, joint à l'envoi (jamais stocké)
+            media = self.content_generator.create_post_media(content)
+            if media:
+                content = {**content, 'media': media}
+            return self.publisher.publish(content)
+            
         except Exception as e:
             print(f"❌ Erreur publication {platform}: {e}")
             return False
     
+    def simulated_send(self, content):
+        """
+        Fin d'un envoi simulé : la clé d'idempotence accompagne la requête comme avec une vraie API,
+        et une clé déjà reçue n'est pas republiée (réponse d'origine rejouée, comme les plateformes)
+        """
+        key = content.get('idempotency_key') or content.get('post_id')
+        with self._sent_lock:
+            replayed = key in self._sent_keys
+            self._sent_keys.add(key)
+        print(f"   Idempotency-Key: {key}" + (" (déjà reçue: pas de doublon)" if replayed else ""))
+        media = content.get('media')
+        if media and not replayed:
+            width, height = media['size']
+            print(f"   Visuel: {width}x{height} {media['format']} ({media['bytes'] // 1024} Ko)")
+        return True
+    
     def publish_instagram(self, content):
         """Publication sur Instagram"""
         # Simulation d'API Instagram (en production, utiliser l'API officielle)
@@ -147,7 +555,7 @@ class ApolloScheduler:
             pass
         """
         
-        return True  # Simulation de succès
+        return self.simulated_send(content)  # Simulation de succès
     
     def publish_facebook(self, content):
         """Publication sur Facebook"""
@@ -162,41 +570,33 @@ class ApolloScheduler:
                         message=content['content'])
         """
         
-        return True
+        return self.simulated_send(content)
     
     def publish_linkedin(self, content):
         """Publication sur LinkedIn"""
         print(f"💼 Publication LinkedIn pour {content['gym']['name']}")
-        return True
+        return self.simulated_send(content)
     
     def publish_tiktok(self, content):
         """Publication sur TikTok"""
         print(f"🎵 Publication TikTok pour {content['gym']['name']}")
-        return True
+        if content.get('video_path'):
+            print(f"   Vidéo: {content['video_path']}")
+        return self.simulated_send(content)
     
     def schedule_custom_post(self, gym_id, platform, post_type, publish_time, custom_prompt=None):
-        """Planifie un post personnalisé"""
-        job_id = f"custom_{gym_id}_{platform}_{int(time.time())}"
+        """Planifie un post personnalisé (persisté dans le job store)"""
+        job_id = f"custom_{gym_id}_{platform}_{time.time_ns()}"
         
         self.scheduler.add_job(
-            func=self.auto_post,
+            func=run_auto_post,
             trigger='date',
             run_date=publish_time,
-            args=[gym_id, platform, post_type],
-            id=job_id
+            args=[gym_id, platform, post_type, custom_prompt],
+            id=job_id,
+            jobstore='default'
         )
         
-        scheduled_post = {
-            'id': job_id,
-            'gym_id': gym_id,
-            'platform': platform,
-            'type': post_type,
-            'scheduled_time': publish_time.isoformat(),
-            'custom_prompt': custom_prompt,
-            'status': 'scheduled'
-        }
-        
-        self.scheduled_posts.append(scheduled_post)
         print(f"📅 Post programmé: {publish_time} - {platform} - Gym {gym_id}")
         
         return job_id
@@ -208,7 +608,9 @@ class ApolloScheduler:
             func=self.process_new_leads,
             trigger='interval',
             minutes=15,
-            id='lead_processing'
+            id='lead_processing',
+            jobstore='memory',
+            replace_existing=True
         )
         
         # Suivi des prospects inactifs
@@ -216,7 +618,9 @@ class ApolloScheduler:
             func=self.follow_up_inactive_leads,
             trigger='interval',
             hours=24,
-            id='inactive_leads_followup'
+            id='inactive_leads_followup',
+            jobstore='memory',
+            replace_existing=True
         )
         
         # Analyse des commentaires pour leads potentiels
@@ -224,7 +628,9 @@ class ApolloScheduler:
             func=self.analyze_social_comments,
             trigger='interval',
             hours=2,
-            id='comment_analysis'
+            id='comment_analysis',
+            jobstore='memory',
+            replace_existing=True
         )
     
     def process_new_leads(self):
@@ -281,14 +687,18 @@ class ApolloScheduler:
         self.scheduler.add_job(
             func=self.analyze_daily_performance,
             trigger=CronTrigger(hour=8, minute=0),
-            id='daily_performance'
+            id='daily_performance',
+            jobstore='memory',
+            replace_existing=True
         )
         
         # Rapport hebdomadaire
         self.scheduler.add_job(
             func=self.generate_weekly_report,
             trigger=CronTrigger(day_of_week=0, hour=9, minute=0),
-            id='weekly_report'
+            id='weekly_report',
+            jobstore='memory',
+            replace_existing=True
         )
     
     def analyze_daily_performance(self):
@@ -316,7 +726,9 @@ class ApolloScheduler:
             func=self.monitor_social_mentions,
             trigger='interval',
             minutes=30,
-            id='social_monitoring'
+            id='social_monitoring',
+            jobstore='memory',
+            replace_existing=True
         )
     
     def monitor_social_mentions(self):
@@ -331,7 +743,11 @@ class ApolloScheduler:
         
         for mention in mentions:
             if self.should_auto_respond(mention):
-                response = self.generate_auto_response(mention)
+                try:
+                    response = self.generate_auto_response(mention)
+                except UnknownGymError as e:
+                    print(f"⚠️ Mention ignorée: {e}")
+                    continue
                 self.send_auto_response(mention, response)
     
     def should_auto_respond(self, mention):
@@ -351,7 +767,7 @@ class ApolloScheduler:
         """Génère une réponse automatique personnalisée"""
         content = mention.get('content', '').lower()
         gym_id = mention.get('gym_id', 1)
-        gym = next((g for g in APOLLO_GYMS if g['id'] == gym_id), APOLLO_GYMS[0])
+        gym = self.content_generator.get_gym_by_id(gym_id)
         
         responses = AUTOMATION_CONFIG['auto_responses']['keywords']
         
@@ -388,28 +804,96 @@ class ApolloScheduler:
             'timestamp': datetime.now().isoformat(),
             'platform': content['platform'],
             'gym': content['gym']['name'],
+            'gym_id': content['gym']['id'],
             'type': content['type'],
             'content_preview': content['content'][:100]
         }
         
-        # En production, sauvegarder en base de données
-        print(f"📝 Log: {log_entry}")
+        # Journal JSONL des publications (écriture groupée)
+        get_content_log('posted').append(log_entry)
+        print(f"📝 Log: {content['platform']} - {content['gym']['name']} - {content['type']}")
     
     def get_scheduled_posts(self):
-        """Retourne la liste des posts programmés"""
-        return self.scheduled_posts
+        """Posts personnalisés programmés, lus depuis le job store"""
+        posts = []
+        for job in self.scheduler.get_jobs():
+            if not job.id.startswith('custom_'):
+                continue
+            gym_id, platform, post_type, custom_prompt = job.args
+            run_time = getattr(job, 'next_run_time', None) or job.trigger.run_date
+            posts.append({
+                'id': job.id,
+                'gym_id': gym_id,
+                'platform': platform,
+                'type': post_type,
+                'scheduled_time': run_time.isoformat(),
+                'custom_prompt': custom_prompt,
+                'status': 'scheduled'
+            })
+        return sorted(posts, key=lambda post: post['scheduled_time'])
     
     def cancel_scheduled_post(self, job_id):
         """Annule un post programmé"""
         try:
             self.scheduler.remove_job(job_id)
-            self.scheduled_posts = [p for p in self.scheduled_posts if p['id'] != job_id]
             print(f"🗑️ Post annulé: {job_id}")
             return True
         except:
             print(f"❌ Impossible d'annuler le post: {job_id}")
             return False
 
+# =============================================================================
+# BENCHMARK
+# =============================================================================
+
+def benchmark_job_store(n=10000, jobstore_url=None):
+    """Débit d'ajout de jobs persistés puis temps de redémarrage avec n jobs en store"""
+    print("📅 Apollo Scheduler - BENCHMARK JOB STORE")
+    print("=" * 50)
+    
+    if jobstore_url is None:
+        directory = tempfile.mkdtemp(prefix='apollo_jobs_')
+        jobstore_url = f"sqlite:///{os.path.join(directory, 'jobs.sqlite3')}"
+    
+    # Ajouts : jobs datés comme ceux de schedule_custom_post
+    scheduler = build_background_scheduler(build_job_store(jobstore_url))
+    scheduler.start(paused=True)
+    start_date = datetime.now() + timedelta(days=1)
+    started = time.perf_counter()
+    for i in range(n):
+        scheduler.add_job(
+            func=run_auto_post,
+            trigger='date',
+            run_date=start_date + timedelta(minutes=i),
+            args=[1, 'instagram', 'motivation', None],
+            id=f"custom_bench_{i}"
+        )
+    add_elapsed = time.perf_counter() - started
+    scheduler.shutdown(wait=False)
+    print(f"➕ {n} jobs ajoutés en {add_elapsed:.2f}s → {n / add_elapsed:,.0f} jobs/s")
+    
+    # Redémarrage : ouverture du store + alignement d'un planning déjà présent
+    started = time.perf_counter()
+    jobstore = build_job_store(jobstore_url)
+    scheduler = build_background_scheduler(jobstore)
+    scheduler.start(paused=True)
+    stored = stored_job_ids(jobstore)
+    startup_elapsed = time.perf_counter() - started
+    print(f"🚀 Redémarrage avec {len(stored)} jobs en store: {startup_elapsed * 1000:.0f} ms")
+    
+    started = time.perf_counter()
+    next_run = jobstore.get_next_run_time()
+    due = jobstore.get_due_jobs(start_date + timedelta(minutes=60))
+    lookup_elapsed = time.perf_counter() - started
+    scheduler.shutdown(wait=False)
+    print(f"⏱️ Prochain job ({next_run:%d/%m %H:%M}) et {len(due)} jobs dus: {lookup_elapsed * 1000:.0f} ms")
+    
+    return {
+        'adds_per_second': n / add_elapsed,
+        'startup_ms': startup_elapsed * 1000,
+        'due_lookup_ms': lookup_elapsed * 1000
+    }
+
 # =============================================================================
 # FONCTIONS DE DÉMONSTRATION
 # =============================================================================
@@ -0,0 +1,179 @@
+"""
+Apollo AI Template Engine
+Génération instantanée de posts (sans LLM) à partir de POST_TEMPLATES
+et de pools de valeurs pré-calculés par salle ; les hashtags et le pied de post
+(adresse, téléphone) sont ajoutés par la mise en forme plateforme
+"""
+
+import random
+import string
+import time
+
+from config import CONTENT_CONFIG, POST_TEMPLATES, POST_TEMPLATES_SHORT, TEMPLATE_SLOT_BANKS
+from gym_registry import get_gym_registry
+
+class TemplatePostGenerator:
+    def __init__(self, gyms=None, templates=None, slot_banks=None, short_templates=None):
+        self.templates = templates or POST_TEMPLATES
+        self.short_templates = POST_TEMPLATES_SHORT if short_templates is None else short_templates
+        self.slot_banks = slot_banks or TEMPLATE_SLOT_BANKS
+        
+        # Groupes de slots liés (ex: titre + contenu d'un conseil)
+        self._groups = {
+            name: tuple(entries) for name, entries in self.slot_banks.get('groups', {}).items()
+        }
+        group_fields = {
+            field: name for name, entries in self._groups.items() for field in entries[0]
+        }
+        
+        self._group_fields = group_fields
+        self._compiled = self._compile(self.templates)
+        self._compiled_short = self._compile(self.short_templates)
+        
+        self._slot_pools = {}
+        self._max_lengths = {}  # salle → {template: longueur maximale une fois rempli}
+        self.refresh(gyms or get_gym_registry())
+    
+    def _compile(self, templates):
+        """Templates pré-analysés : (texte, slots indépendants, groupes de slots)"""
+        formatter = string.Formatter()
+        compiled = {}
+        for post_type, entries in templates.items():
+            parsed = []
+            for template in entries:
+                fields = {field for _, field, _, _ in formatter.parse(template) if field}
+                groups = tuple(sorted({self._group_fields[f] for f in fields if f in self._group_fields}))
+                slots = tuple(sorted(f for f in fields if f not in self._group_fields))
+                parsed.append((template, slots, groups))
+            compiled[post_type] = tuple(parsed)
+        return compiled
+    
+    def _max_length(self, template, pools):
+        """Longueur du template rempli avec les valeurs les plus longues de la salle"""
+        length = 0
+        fields = []
+        for literal, field, _, _ in string.Formatter().parse(template):
+            length += len(literal)
+            if field:
+                fields.append(field)
+        for field in fields:
+            if field in pools:
+                length += max(len(value) for value in pools[field])
+        # Champs d'un même groupe : la combinaison la plus longue
+        for group in {self._group_fields[f] for f in fields if f in self._group_fields}:
+            length += max(
+                sum(len(entry[f]) for f in fields if self._group_fields.get(f) == group)
+                for entry in self._groups[group]
+            )
+        return length
+    
+    def refresh(self, gyms):
+        """(Re)calcule les pools de valeurs de chaque salle"""
+        shared = {
+            name: tuple(values) for name, values in self.slot_banks.items() if name != 'groups'
+        }
+        
+        for gym in gyms:
+            hours = gym['opening_hours']
+            weekday_hours = hours.get('monday') or "nous consulter"
+            weekend_hours = (f"samedi {hours['saturday']}, dimanche {hours['sunday']}"
+                             if hours.get('saturday') and hours.get('sunday') else "nous consulter")
+            pools = dict(shared)
+            pools.update({
+                # Les templates écrivent déjà "Apollo {gym_name}"
+                'gym_name': (gym['name'].replace('Apollo ', '', 1),),
+                'address': (gym['address'],),
+                'phone': (gym['phone'],),
+                'coach_name': tuple(gym['coaches']),
+                'activity': tuple(f"un cours de {s.lower()}" for s in gym['specialties']),
+                'specialties': (', '.join(gym['specialties']),),
+                'weekday_hours': (weekday_hours,),
+                'weekend_hours': (weekend_hours,)
+            })
+            self._slot_pools[gym['id']] = pools
+            self._max_lengths[gym['id']] = {
+                template: self._max_length(template, pools)
+                for compiled in (self._compiled, self._compiled_short)
+                for entries in compiled.values()
+                for template, _, _ in entries
+            }
+    
+    def supports(self, post_type):
+        """Indique si un template dédié existe pour ce type de post"""
+        return post_type in self._compiled
+    
+    def _candidates(self, gym_id, post_type, max_chars):
+        """
+        Templates complets qui tiennent dans max_chars, sinon versions courtes qui y tiennent,
+        sinon le plus court de tous (tronqué ensuite par la mise en forme plateforme)
+        """
+        entries = self._compiled[post_type]
+        if max_chars is None:
+            return entries
+        lengths = self._max_lengths[gym_id]
+        short = self._compiled_short.get(post_type, ())
+        for candidates in (entries, short):
+            fitting = tuple(entry for entry in candidates if lengths[entry[0]] <= max_chars)
+            if fitting:
+                return fitting
+        return (min(entries + short, key=lambda entry: lengths[entry[0]]),)
+    
+    def render(self, gym_id, post_type, max_chars=None):
+        """
+        Remplit un template tiré au hasard pour la salle et le type de post (None si aucun template).
+        max_chars : longueur maximale du texte, le template est choisi pour ne pas être tronqué
+        """
+        if not self.supports(post_type):
+            return None
+        pools = self._slot_pools[gym_id]
+        template, slots, groups = random.choice(self._candidates(gym_id, post_type, max_chars))
+        
+        values = {slot: random.choice(pools[slot]) for slot in slots}
+        for group in groups:
+            values.update(random.choice(self._groups[group]))
+        
+        return template.format_map(values)
+
+# =============================================================================
+# BENCHMARK
+# =============================================================================
+
+def benchmark_template_generation(n=10000):
+    """Mesure le débit de génération par templates (posts par seconde)"""
+    print("⚡ Apollo Template Engine - BENCHMARK")
+    print("=" * 50)
+    
+    engine = TemplatePostGenerator()
+    gym_ids = get_gym_registry().ids()
+    post_types = CONTENT_CONFIG['post_types']
+    
+    start = time.perf_counter()
+    for i in range(n):
+        engine.render(gym_ids[i % len(gym_ids)], post_types[i % len(post_types)])
+    elapsed = time.perf_counter() - start
+    
+    render_rate = n / elapsed
+    print(f"📝 Rendu seul: {n} posts en {elapsed:.3f}s "
+          f"→ {render_rate:,.0f} posts/s ({elapsed / n * 1e6:.1f} µs/post)")
+    
+    # Chemin complet : template + mise en forme plateforme + hashtags + métadonnées
+    from content_generator import ApolloContentGenerator
+    generator = ApolloContentGenerator(ai_provider='template')
+    platforms = list(CONTENT_CONFIG['platforms'].keys())
+    
+    full_n = max(n // 10, 1)
+    start = time.perf_counter()
+    for i in range(full_n):
+        generator.generate_post_content(
+            gym_ids[i % len(gym_ids)], platforms[i % len(platforms)], post_types[i % len(post_types)]
+        )
+    elapsed = time.perf_counter() - start
+    
+    full_rate = full_n / elapsed
+    print(f"📦 generate_post_content: {full_n} posts en {elapsed:.3f}s "
+          f"→ {full_rate:,.0f} posts/s ({elapsed / full_n * 1e6:.1f} µs/post)")
+    
+    return {'render_per_second': render_rate, 'generate_per_second': full_rate}
+
+if __name__ == "__main__":
+    benchmark_template_generation()
@@ -0,0 +1,136 @@
+"""
+Vérifications de la publication concurrente : registre d'idempotence (bail des tentatives),
+réservation des posts d'un créneau et remise en file après un 429
+"""
+
+import os
+import tempfile
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from content_repository import ContentRepository
+from publishing import PlatformPublisher, RateLimitedError
+
+SLOT = '2025-09-01T18:00:00'
+
+def make_post(index, gym_id=1):
+    return {
+        'post_id': f'post-{index}',
+        'gym': {'id': gym_id, 'name': f'Apollo {gym_id}'},
+        'platform': 'instagram',
+        'type': 'motivation',
+        'content': f'Post {index}',
+        'scheduled_for': SLOT
+    }
+
+def run_together(calls):
+    """Lance les appels en même temps (barrière) et renvoie leurs résultats dans l'ordre"""
+    barrier = threading.Barrier(len(calls))
+
+    def run(call):
+        barrier.wait()
+        return call()
+
+    with ThreadPoolExecutor(max_workers=len(calls)) as executor:
+        return list(executor.map(run, calls))
+
+def test_begin_publish_single_winner():
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, 'content.db')
+        # Une connexion par appelant, comme deux processus sur la même base
+        repositories = [ContentRepository(path) for _ in range(4)]
+        results = run_together([
+            lambda repository=repository: repository.begin_publish('key-1', 'post-1', 'instagram')
+            for repository in repositories
+        ])
+        assert results.count(None) == 1, results
+        assert results.count('pending') == 3, results
+        assert repositories[0].ledger_entry('key-1')['attempts'] == 1
+        for repository in repositories:
+            repository.close()
+
+def test_begin_publish_stale_lease():
+    with tempfile.TemporaryDirectory() as directory:
+        repository = ContentRepository(os.path.join(directory, 'content.db'))
+        assert repository.begin_publish('key-1', 'post-1', 'instagram', lease_seconds=60) is None
+        # Tentative récente : non reprise
+        assert repository.begin_publish('key-1', 'post-1', 'instagram', lease_seconds=60) == 'pending'
+        # Tentative plus ancienne que le bail : reprise une seule fois
+        with repository._conn:
+            repository._conn.execute(
+                "UPDATE publish_ledger SET updated_at = '2000-01-01T00:00:00' WHERE idempotency_key = 'key-1'"
+            )
+        assert repository.begin_publish('key-1', 'post-1', 'instagram', lease_seconds=60) == 'stale'
+        assert repository.begin_publish('key-1', 'post-1', 'instagram', lease_seconds=60) == 'pending'
+        assert repository.ledger_entry('key-1')['attempts'] == 2
+
+        repository.finish_publish('key-1', 'published')
+        assert repository.begin_publish('key-1', 'post-1', 'instagram', lease_seconds=60) == 'published'
+        repository.close()
+
+def test_claim_ready_no_double_claim():
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, 'content.db')
+        repositories = [ContentRepository(path) for _ in range(4)]
+        posts = [make_post(index, gym_id=index % 5 + 1) for index in range(20)]
+        repositories[0].add_many(posts, status='ready')
+
+        results = run_together([
+            lambda repository=repository: repository.claim_ready('instagram', 'motivation', SLOT)
+            for repository in repositories
+        ])
+        claimed = [post['post_id'] for result in results for post in result]
+        assert len(claimed) == len(set(claimed)) == len(posts), results
+        assert repositories[0].claim_ready('instagram', 'motivation', SLOT) == []
+        assert repositories[0].count(status='claimed') == len(posts)
+        for repository in repositories:
+            repository.close()
+
+def test_rate_limited_post_requeued():
+    sent = []
+    refused = set()
+    lock = threading.Lock()
+
+    def send(content):
+        with lock:
+            # Premier envoi de chaque post pair refusé (429) : remis en tête de la file du compte
+            if content['index'] % 2 == 0 and content['index'] not in refused:
+                refused.add(content['index'])
+                raise RateLimitedError(retry_after=0.01)
+            sent.append((content['account'], content['index']))
+        return True
+
+    publisher = PlatformPublisher('instagram', send, rate_per_minute=60000, burst=100,
+                                  account_rate_per_minute=60000, account_burst=100, workers=1,
+                                  max_queue=100, rate_limit_retries=2)
+    futures = [publisher.submit({'account': index % 3, 'index': index}, account=index % 3)
+               for index in range(30)]
+    assert all(future.result(timeout=10) for future in futures)
+    publisher.shutdown()
+
+    # Chaque post refusé est renvoyé une seule fois : ni perdu, ni publié deux fois
+    indexes = [index for _, index in sent]
+    assert sorted(indexes) == list(range(30)), sent
+    assert publisher.stats['rate_limited'] == 15
+    assert publisher.stats['published'] == 30
+
+def test_rate_limited_post_gives_up_after_retries():
+    calls = []
+
+    def send(content):
+        calls.append(content['index'])
+        raise RateLimitedError(retry_after=0.01)
+
+    publisher = PlatformPublisher('instagram', send, rate_per_minute=60000, burst=100,
+                                  account_rate_per_minute=60000, account_burst=100, workers=1,
+                                  max_queue=10, rate_limit_retries=2)
+    assert publisher.submit({'index': 0}, account=0).result(timeout=10) is False
+    publisher.shutdown()
+    assert calls == [0, 0, 0]
+
+if __name__ == '__main__':
+    for check in (test_begin_publish_single_winner, test_begin_publish_stale_lease,
+                  test_claim_ready_no_double_claim, test_rate_limited_post_requeued,
+                  test_rate_limited_post_gives_up_after_retries):
+        check()
+        print(f"✅ {check.__name__}")
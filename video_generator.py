@@ -0,0 +1,331 @@
+"""
+Apollo Video Generator
+Clips TikTok : scènes texte sur fond de marque ou photo de stock, rendues sur un pool
+de processus, scènes et fonds sonores mis en cache
+"""
+
+import hashlib
+import json
+import os
+import re
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, ThreadPoolExecutor, wait
+
+from PIL import Image
+
+from config import APOLLO_BRAND, CONTENT_CONFIG, VIDEO_CONFIG
+from gym_registry import get_gym_registry
+from rendering import render_branded_image
+
+# À incrémenter quand le rendu des scènes change : le cache est alors ignoré
+VIDEO_VERSION = 1
+
+SCENE_COLORS = ('primary', 'dark', 'secondary')
+IMAGE_EXTENSIONS = ('.png', '.jpg', '.jpeg', '.webp')
+AUDIO_EXTENSIONS = ('.mp3', '.m4a', '.wav', '.ogg')
+
+def _moviepy():
+    """Import paresseux : moviepy (et ffmpeg) ne servent qu'au rendu vidéo"""
+    try:
+        import moviepy.editor as mpy
+    except ImportError:
+        raise RuntimeError("moviepy n'est pas installé (pip install moviepy)")
+    return mpy
+
+def _digest(payload):
+    return hashlib.sha256(json.dumps(payload, sort_keys=True, ensure_ascii=False).encode('utf-8')).hexdigest()
+
+def _list_files(directory, extensions):
+    if not directory or not os.path.isdir(directory):
+        return []
+    return sorted(
+        os.path.join(directory, name) for name in os.listdir(directory)
+        if name.lower().endswith(extensions)
+    )
+
+def _pick(items, seed):
+    """Choix déterministe (même texte → même photo / même musique)"""
+    if not items:
+        return None
+    return items[int(_digest(seed)[:8], 16) % len(items)]
+
+def _temp_path(path):
+    """Fichier temporaire gardant l'extension (ffmpeg en déduit le format)"""
+    root, extension = os.path.splitext(path)
+    return f"{root}.{os.getpid()}.tmp{extension}"
+
+def build_scenes(text, gym, max_scenes=None):
+    """Découpe le post en scènes courtes : phrases clés puis signature de la salle"""
+    max_scenes = max_scenes or VIDEO_CONFIG['max_scenes']
+    body = re.sub(r'#\w+', '', text)
+    # Emojis et symboles retirés : la police de marque ne les affiche pas
+    body = re.sub(r"[^\w\s.,!?;:'’%€&()+-]", '', body)
+    sentences = [s.strip() for s in re.split(r'(?<=[.!?])\s+|\n+', body) if len(s.strip()) > 3]
+    
+    scenes = sentences[:max_scenes - 1] or [gym['name']]
+    scenes.append(f"Apollo Sporting Club\n{gym['name']}")
+    return scenes
+
+def _render_scene_clip(job):
+    """Clip vidéo d'une scène (image fixe avec fondus), réutilisé s'il est déjà en cache"""
+    if os.path.exists(job['path']):
+        return job['path']
+    
+    import numpy as np
+    mpy = _moviepy()
+    
+    background = Image.open(job['stock']) if job['stock'] else None
+    frame = render_branded_image(job['text'], job['color'], job['size'], background=background)
+    
+    clip = mpy.ImageClip(np.asarray(frame)).set_duration(job['duration'])
+    clip = clip.fx(mpy.vfx.fadein, VIDEO_CONFIG['fade']).fx(mpy.vfx.fadeout, VIDEO_CONFIG['fade'])
+    
+    os.makedirs(os.path.dirname(job['path']), exist_ok=True)
+    tmp_path = _temp_path(job['path'])
+    clip.write_videofile(
+        tmp_path, fps=VIDEO_CONFIG['fps'], codec=VIDEO_CONFIG['codec'],
+        preset=VIDEO_CONFIG['preset'], audio=False, threads=1, logger=None
+    )
+    clip.close()
+    os.replace(tmp_path, job['path'])
+    return job['path']
+
+def _prepare_audio_bed(source, duration, path):
+    """Fond sonore coupé (ou bouclé) à la durée du clip avec fondu, mis en cache"""
+    if os.path.exists(path):
+        return path
+    
+    mpy = _moviepy()
+    audio = mpy.AudioFileClip(source)
+    if audio.duration < duration:
+        audio = mpy.afx.audio_loop(audio, duration=duration)
+    else:
+        audio = audio.subclip(0, duration)
+    audio = audio.fx(mpy.afx.audio_fadeout, min(1.0, duration / 4))
+    
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp_path = _temp_path(path)
+    audio.write_audiofile(tmp_path, fps=44100, codec=VIDEO_CONFIG['audio_codec'], logger=None)
+    audio.close()
+    os.replace(tmp_path, path)
+    return path
+
+def _assemble_clip(job):
+    """Assemble les scènes en cache et le fond sonore en un clip final"""
+    if os.path.exists(job['path']):
+        return job['path']
+    
+    mpy = _moviepy()
+    scenes = [mpy.VideoFileClip(path) for path in job['scenes']]
+    video = mpy.concatenate_videoclips(scenes, method='chain')
+    
+    audio = None
+    if job['audio_source']:
+        bed = _prepare_audio_bed(job['audio_source'], video.duration, job['audio_path'])
+        audio = mpy.AudioFileClip(bed)
+        video = video.set_audio(audio)
+    
+    os.makedirs(os.path.dirname(job['path']), exist_ok=True)
+    tmp_path = _temp_path(job['path'])
+    video.write_videofile(
+        tmp_path, fps=VIDEO_CONFIG['fps'], codec=VIDEO_CONFIG['codec'],
+        audio_codec=VIDEO_CONFIG['audio_codec'], preset=VIDEO_CONFIG['preset'],
+        threads=1, logger=None
+    )
+    for clip in scenes + [audio, video]:
+        if clip is not None:
+            clip.close()
+    os.replace(tmp_path, job['path'])
+    return job['path']
+
+class TikTokVideoGenerator:
+    """
+    Planifie et rend des clips TikTok à partir des posts générés,
+    sur un pool de processus unique créé au premier rendu (libéré par close())
+    """
+    
+    def __init__(self, output_dir=None, cache_dir=None, max_workers=None):
+        self.output_dir = output_dir or VIDEO_CONFIG['output_dir']
+        self.cache_dir = cache_dir or VIDEO_CONFIG['cache_dir']
+        self.max_workers = max_workers or VIDEO_CONFIG['workers']
+        
+        tiktok = CONTENT_CONFIG['platforms']['tiktok']
+        self.size = tuple(tiktok['video_size'])
+        self.max_duration = tiktok['video_duration']
+        
+        self.stock_frames = _list_files(VIDEO_CONFIG['stock_frames_dir'], IMAGE_EXTENSIONS)
+        self.audio_beds = _list_files(VIDEO_CONFIG['audio_beds_dir'], AUDIO_EXTENSIONS)
+        
+        self._executor = None
+        self._renders = None  # thread coordonnant les rendus asynchrones (submit_post)
+        self._lock = threading.Lock()
+    
+    def _pool(self):
+        with self._lock:
+            if self._executor is None:
+                self._executor = ProcessPoolExecutor(max_workers=self.max_workers)
+            return self._executor
+    
+    def submit_post(self, post):
+        """Rend le clip d'un post en arrière-plan ; renvoie un Future de son chemin (None si échec)"""
+        with self._lock:
+            if self._renders is None:
+                self._renders = ThreadPoolExecutor(max_workers=1, thread_name_prefix='apollo-video')
+            return self._renders.submit(self.render_post, post)
+    
+    def close(self):
+        """Arrête les rendus en attente et le pool de processus"""
+        with self._lock:
+            renders, executor = self._renders, self._executor
+            self._renders = self._executor = None
+        if renders:
+            renders.shutdown(wait=False, cancel_futures=True)
+        if executor:
+            executor.shutdown(wait=False, cancel_futures=True)
+    
+    def plan_video(self, post):
+        """Jobs de scènes + job d'assemblage d'un post (chemins adressés par contenu)"""
+        gym = post['gym']
+        scenes = build_scenes(post['content'], gym)
+        duration = min(VIDEO_CONFIG['scene_duration'], self.max_duration / len(scenes))
+        
+        scene_jobs = []
+        for index, text in enumerate(scenes):
+            color = APOLLO_BRAND['colors'][SCENE_COLORS[index % len(SCENE_COLORS)]]
+            # Une scène sur deux sur photo de stock quand il y en a
+            stock = _pick(self.stock_frames, text) if index % 2 else None
+            key = _digest({
+                'text': text, 'color': color, 'size': self.size, 'stock': stock,
+                'duration': duration, 'fps': VIDEO_CONFIG['fps'], 'version': VIDEO_VERSION
+            })
+            scene_jobs.append({
+                'text': text, 'color': color, 'size': self.size, 'stock': stock, 'duration': duration,
+                'path': os.path.join(self.cache_dir, 'scenes', key[:2], f"{key}.mp4")
+            })
+        
+        audio_source = _pick(self.audio_beds, gym['name'])
+        total_duration = round(duration * len(scenes), 2)
+        audio_key = _digest({'source': audio_source, 'duration': total_duration}) if audio_source else None
+        key = _digest({'scenes': [job['path'] for job in scene_jobs], 'audio': audio_source})
+        
+        return {
+            'post': post,
+            'scenes': scene_jobs,
+            'assembly': {
+                'scenes': [job['path'] for job in scene_jobs],
+                'audio_source': audio_source,
+                'audio_path': os.path.join(self.cache_dir, 'audio', f"{audio_key}.m4a") if audio_key else None,
+                'path': os.path.join(self.output_dir, key[:2], f"{key}.mp4")
+            }
+        }
+    
+    def render_post(self, post):
+        """Rend le clip d'un post et renvoie son chemin (None si échec)"""
+        try:
+            result = self.render_batch([post])[0]
+        except RuntimeError as e:
+            print(f"⚠️ Vidéo TikTok indisponible: {e}")
+            return None
+        if result['error']:
+            print(f"❌ Erreur vidéo TikTok: {result['error']}")
+        return result['path']
+    
+    def render_batch(self, posts, wall_time=None):
+        """
+        Rend les clips d'un lot sur un pool de processus dans un temps borné.
+        Les scènes communes ne sont rendues qu'une fois ; les clips non terminés
+        à l'échéance sont marqués 'deferred' (relancer le lot les reprendra).
+        Renvoie [{'post', 'path', 'status', 'error'}] dans l'ordre des posts.
+        """
+        _moviepy()
+        deadline = time.monotonic() + (wall_time or VIDEO_CONFIG['batch_wall_time'])
+        plans = [self.plan_video(post) for post in posts]
+        results = [
+            {'post': plan['post'], 'path': None, 'status': 'deferred', 'error': None}
+            for plan in plans
+        ]
+        
+        waiting = []
+        for index, plan in enumerate(plans):
+            if os.path.exists(plan['assembly']['path']):
+                results[index].update(path=plan['assembly']['path'], status='cached')
+            else:
+                waiting.append(index)
+        if not waiting:
+            return results
+        
+        executor = self._pool()
+        scene_futures, assembly_futures = {}, {}
+        try:
+            # 1. Scènes (dédupliquées entre clips), 2. assemblage dès que les scènes d'un clip sont prêtes
+            for index in waiting:
+                for job in plans[index]['scenes']:
+                    if job['path'] not in scene_futures and not os.path.exists(job['path']):
+                        scene_futures[job['path']] = executor.submit(_render_scene_clip, job)
+            
+            while True:
+                for index in list(waiting):
+                    futures = [scene_futures.get(job['path']) for job in plans[index]['scenes']]
+                    futures = [future for future in futures if future is not None]
+                    if not all(future.done() for future in futures):
+                        continue
+                    waiting.remove(index)
+                    failed = next((f for f in futures if f.exception()), None)
+                    if failed:
+                        results[index].update(status='failed', error=str(failed.exception()))
+                    else:
+                        assembly_futures[index] = executor.submit(_assemble_clip, plans[index]['assembly'])
+                
+                running = [f for f in list(scene_futures.values()) + list(assembly_futures.values()) if not f.done()]
+                if not running:
+                    break
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    print("⏱️ Temps imparti écoulé : clips restants reportés")
+                    break
+                wait(running, timeout=remaining, return_when=FIRST_COMPLETED)
+        finally:
+            # Les rendus déjà lancés se terminent en arrière-plan (ils alimentent le cache), les autres sont annulés
+            for future in list(scene_futures.values()) + list(assembly_futures.values()):
+                future.cancel()
+        
+        for index, future in assembly_futures.items():
+            if not future.done() or future.cancelled():
+                continue
+            if future.exception():
+                results[index].update(status='failed', error=str(future.exception()))
+            else:
+                results[index].update(path=future.result(), status='rendered')
+        return results
+
+def render_tiktok_week(generator, gym_ids=None, days=7, wall_time=None):
+    """Une semaine de clips TikTok par salle, rendus en parallèle dans un temps borné"""
+    gym_ids = gym_ids or get_gym_registry().ids()
+    post_types = CONTENT_CONFIG['post_types']
+    
+    start = time.perf_counter()
+    batch_requests = [
+        {'gym_id': gym_id, 'platform': 'tiktok', 'post_type': post_types[(day + gym_index) % len(post_types)],
+         'bypass_cache': True}
+        for gym_index, gym_id in enumerate(gym_ids)
+        for day in range(days)
+    ]
+    posts = [result['content'] for result in generator.run_batch(batch_requests) if result['content']]
+    print(f"📝 {len(posts)} posts TikTok générés en {time.perf_counter() - start:.1f}s")
+    
+    video_generator = TikTokVideoGenerator()
+    try:
+        results = video_generator.render_batch(posts, wall_time)
+    finally:
+        video_generator.close()
+    elapsed = time.perf_counter() - start
+    
+    summary = {}
+    for result in results:
+        summary[result['status']] = summary.get(result['status'], 0) + 1
+    print(f"🎬 Clips TikTok en {elapsed:.0f}s: " + ', '.join(f"{count} {status}" for status, count in summary.items()))
+    for result in results:
+        if result['error']:
+            print(f"   ❌ {result['post']['gym']['name']}: {result['error']}")
+    return results